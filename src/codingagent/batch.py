@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from codingagent.config import Config
+from codingagent.packages.fs.atomic import atomic_write
+
+# characters of a failed worker's stderr kept in its result
+STDERR_TAIL = 4000
+
+@dataclass
+class BatchTask:
+    id: str
+    prompt: str
+    cwd: str
+    max_turns: Optional[int] = None
+    timeout: Optional[float] = None
+
+def parse_task(number: int, body: dict, default_cwd: str) -> BatchTask:
+    """A task from one line of the tasks file.
+
+    {"prompt": ...} or {"query": ...} is the query, {"title": ..., "body": ...} (the format of
+    requests.jsonl) is joined into one. "id" (or "request_id"), "cwd" (relative to `default_cwd`),
+    "max_turns" and "timeout" are optional.
+    """
+    prompt = body.get("prompt") or body.get("query") or "\n\n".join(
+        part for part in (body.get("title"), body.get("body")) if part
+    )
+    if not prompt:
+        raise ValueError(f"line {number}: task has no prompt")
+
+    cwd = os.path.abspath(os.path.join(default_cwd, os.path.expanduser(body.get("cwd") or default_cwd)))
+    if not os.path.isdir(cwd):
+        raise ValueError(f"line {number}: cwd {cwd} is not a directory")
+
+    return BatchTask(
+        id=str(body.get("id") or body.get("request_id") or f"task-{number}"),
+        prompt=prompt,
+        cwd=cwd,
+        max_turns=body.get("max_turns"),
+        timeout=body.get("timeout"),
+    )
+
+def load_tasks(path: str) -> list[BatchTask]:
+    tasks = []
+    # relative task directories are relative to the tasks file
+    default_cwd = os.path.dirname(os.path.abspath(path))
+    with open(path, "r") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            tasks.append(parse_task(number, json.loads(line), default_cwd))
+
+    ids = [task.id for task in tasks]
+    duplicates = sorted({task_id for task_id in ids if ids.count(task_id) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate task ids: {', '.join(duplicates)}")
+    return tasks
+
+def finished_ids(output_path: str) -> set[str]:
+    """Ids of the tasks that already succeeded in an earlier run writing to `output_path`."""
+    finished = set()
+    try:
+        with open(output_path, "r") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # a line cut off by a crash
+                if result.get("status") == "ok":
+                    finished.add(result.get("id"))
+    except FileNotFoundError:
+        pass
+    return finished
+
+def agent_command() -> list[str]:
+    """The command line starting another agent process."""
+    # Nuitka sets __compiled__, sys.executable is then the app binary itself which has no -m
+    if "__compiled__" in globals():
+        program = sys.argv[0]
+        if os.sep not in program:
+            program = shutil.which(program) or program
+        # workers run in the directory of their task
+        return [os.path.abspath(program)]
+    return [sys.executable, "-m", "codingagent.main"]
+
+def prepare_indexes(roots: list[str], config: Config):
+    """Builds the symbol and semantic indexes of every task directory once, before any worker starts.
+
+    Workers then load the indexes rather than each walking, parsing and embedding the same
+    tree, and they do not index in the background, so only this process writes to an index.
+    """
+    from codingagent.packages.semantic import embedder, indexer
+    from codingagent.packages.symbols.index import SymbolIndex
+
+    embedder.configure(config.embedding_api_url)
+    for root in roots:
+        print(f"indexing {root}", file=sys.stderr)
+        SymbolIndex(root).build()
+        if config.embedding_api_url and config.semantic_index:
+            try:
+                indexer.build(root, config.embedding_api_url, config.embedding_batch_size, config.embedding_concurrency)
+            except Exception as e:
+                # tasks still run, semantic_search reports the index as empty
+                print(f"semantic index of {root} failed: {e}", file=sys.stderr)
+
+async def run_task(task: BatchTask, config_path: str, config: Config, semaphore: asyncio.Semaphore) -> dict:
+    """Runs `task` in its own agent process, its cwd and process wide caches are its own."""
+    async with semaphore:
+        started = time.time()
+        timeout = task.timeout or config.batch_task_timeout
+        fd, result_path = tempfile.mkstemp(prefix="codingagent-batch-", suffix=".json")
+        os.close(fd)
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *agent_command(),
+                "--config", config_path,
+                "--batch-worker", result_path,
+                cwd=task.cwd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                env=env,
+            )
+            status = None
+            try:
+                _, stderr = await asyncio.wait_for(proc.communicate(json.dumps(asdict(task)).encode("utf-8")), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                _, stderr = await proc.communicate()
+                status = "timeout"
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                raise
+
+            try:
+                with open(result_path, "r") as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                result = {"status": "error", "error": f"agent exited with status {proc.returncode}"}
+            if status is not None:
+                result["status"] = status
+                result["error"] = f"timed out after {timeout}s"
+            if result.get("status") != "ok":
+                result["stderr"] = stderr.decode("utf-8", errors="replace")[-STDERR_TAIL:]
+        finally:
+            os.unlink(result_path)
+
+        return {
+            "id": task.id,
+            "cwd": task.cwd,
+            "prompt": task.prompt,
+            **result,
+            "wall_seconds": round(time.time() - started, 3),
+        }
+
+async def run_batch(tasks_path: str, output_path: str, config_path: str, config: Config, concurrency: int) -> int:
+    """Runs every task of `tasks_path` not yet finished in `output_path`, appending one result line per task.
+
+    Results are written as tasks finish, so the output can be followed while the batch runs
+    and an interrupted batch picks up where it stopped.
+    """
+    tasks = load_tasks(tasks_path)
+    finished = finished_ids(output_path)
+    pending = [task for task in tasks if task.id not in finished]
+    print(f"{len(pending)} of {len(tasks)} tasks to run, {concurrency} at a time, results in {output_path}", file=sys.stderr)
+
+    await asyncio.to_thread(prepare_indexes, sorted({task.cwd for task in pending}), config)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    failures = 0
+    with open(output_path, "a") as out:
+        runs = [run_task(task, config_path, config, semaphore) for task in pending]
+        for done, run in enumerate(asyncio.as_completed(runs), start=1):
+            result = await run
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            if result["status"] != "ok":
+                failures += 1
+            print(f"[{done}/{len(pending)}] {result['id']} {result['status']} {result['wall_seconds']:.1f}s", file=sys.stderr)
+    return 1 if failures else 0
+
+async def run_worker(config: Config, result_path: str) -> int:
+    """Runs the task on stdin with a headless App in the current directory and writes its result."""
+    from codingagent.main import App, build_worker_pool, configure_tracing, connect_tools, shutdown
+    from codingagent.packages.semantic import embedder
+
+    task = BatchTask(**json.loads(sys.stdin.read()))
+    embedder.configure(config.embedding_api_url)
+    configure_tracing(config)
+    worker_pool = build_worker_pool(config)
+    started = time.time()
+    result = {"started_at": started}
+    app = None
+    try:
+        async with AsyncExitStack() as stack:
+            mcp_client_index, tools = await connect_tools(config, stack, worker_pool)
+            app = App(
+                mcp_client_index,
+                tools,
+                config,
+                headless=True,
+                max_turns=task.max_turns or config.batch_max_turns,
+            )
+            await app.init()
+            await app.run(task.prompt)
+            result["status"] = "ok"
+            result["answer"] = app.final_report()
+    except Exception as e:
+        result["status"] = "error"
+        # App.inference wraps the failure, the cause is the interesting part
+        result["error"] = f"{e}: {e.__context__}" if e.__context__ is not None else str(e)
+    finally:
+        result["seconds"] = round(time.time() - started, 3)
+        if app is not None:
+            result["turns"] = app.turns
+            result["tool_calls"] = sum(1 for message in app.messages if message["role"] == "tool")
+            result["transcript"] = app.messages
+        atomic_write(result_path, json.dumps(result, default=str).encode("utf-8"))
+        await shutdown(worker_pool)
+    return 0 if result["status"] == "ok" else 1
@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from codingagent.bench import scenarios, tool_bench
+
+DEFAULT_SIZES = "1000,100000,1000000"
+
+# relative change of a metric reported as a regression by compare
+DEFAULT_THRESHOLD = 0.10
+
+def meta() -> dict:
+    """What a result was measured on, so results of different commits and machines are told apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+def run_tools_child(files: int, repeat: int) -> dict:
+    """Runs the tool benchmarks of one repository size in a fresh process, so its peak RSS is its own."""
+    fd, output = tempfile.mkstemp(prefix="codingagent-bench-", suffix=".json")
+    os.close(fd)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-m", "codingagent.bench", "tools-worker", str(files), "--repeat", str(repeat), "--output", output],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        if proc.returncode != 0:
+            return {"files": files, "error": f"benchmark exited with status {proc.returncode}", "stderr": proc.stderr[-4000:]}
+        with open(output, "r") as f:
+            return json.load(f)
+    finally:
+        os.unlink(output)
+
+def _metrics(body, prefix: str = "") -> dict[str, float]:
+    """Flattens the timings and memory figures of a result into {"a.b.c_ms": value}."""
+    metrics = {}
+    if isinstance(body, dict):
+        for key, value in body.items():
+            metrics.update(_metrics(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(body, (int, float)) and not isinstance(body, bool) and prefix.endswith(("_ms", "_mb")):
+        metrics[prefix] = float(body)
+    return metrics
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    with open(before_path, "r") as f:
+        before = json.load(f)
+    with open(after_path, "r") as f:
+        after = json.load(f)
+
+    print(f"before: {before.get('meta', {}).get('commit', '')[:12]}  after: {after.get('meta', {}).get('commit', '')[:12]}")
+    old, new = _metrics(before.get("results", {})), _metrics(after.get("results", {}))
+    regressions = 0
+    width = max((len(key) for key in old.keys() & new.keys()), default=10)
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] == 0:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        flag = ""
+        # sub-millisecond timings are mostly noise
+        if change > threshold and new[key] - old[key] > 1:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold and old[key] - new[key] > 1:
+            flag = "  improved"
+        print(f"{key:<{width}}  {old[key]:>12.3f}  {new[key]:>12.3f}  {change:+8.1%}{flag}")
+    for key in sorted(old.keys() - new.keys()):
+        print(f"{key:<{width}}  only in {before_path}")
+    for key in sorted(new.keys() - old.keys()):
+        print(f"{key:<{width}}  only in {after_path}")
+    print(f"{regressions} regression(s) over {threshold:.0%}")
+    return 1 if regressions else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m codingagent.bench",
+        description="Offline benchmarks of the builtin tools and of whole agent sessions against a fake Ollama server",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help in (
+        ("tools", "time every builtin tool on synthetic repositories"),
+        ("e2e", "run scripted sessions against a fake model server"),
+        ("all", "both of the above"),
+    ):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--sizes", default=DEFAULT_SIZES, help=f"files per synthetic repository for the tool benchmarks (default {DEFAULT_SIZES})")
+        command.add_argument("--repeat", type=int, default=tool_bench.DEFAULT_REPEAT, help="timed calls per tool, runs per scenario for e2e")
+        command.add_argument("--files", type=int, default=scenarios.DEFAULT_FILES, help="files of the repository the e2e scenarios work in")
+        command.add_argument("--scenarios", default="", help=f"comma separated subset of {', '.join(scenarios.SCENARIOS)}")
+        command.add_argument("--tokens-per-second", type=float, default=scenarios.TOKENS_PER_SECOND)
+        command.add_argument("--first-token-latency", type=float, default=scenarios.FIRST_TOKEN_LATENCY)
+        command.add_argument("--output", default="", help="JSON file the results are written to, stdout by default")
+
+    command = commands.add_parser("compare", help="compare two result files, e.g. of two commits")
+    command.add_argument("before")
+    command.add_argument("after")
+    command.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative slowdown reported as a regression")
+
+    # child processes, one per repository size or scenario run
+    command = commands.add_parser("tools-worker")
+    command.add_argument("files", type=int)
+    command.add_argument("--repeat", type=int, default=tool_bench.DEFAULT_REPEAT)
+    command.add_argument("--output", required=True)
+    command = commands.add_parser("scenario-worker")
+    command.add_argument("name")
+    command.add_argument("--repo", required=True)
+    command.add_argument("--url", required=True)
+    command.add_argument("--output", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        return compare(args.before, args.after, args.threshold)
+    if args.command == "tools-worker":
+        with open(args.output, "w") as f:
+            json.dump(tool_bench.run(args.files, args.repeat), f)
+        return 0
+    if args.command == "scenario-worker":
+        return scenarios.run_worker(args.name, args.repo, args.url, args.output)
+
+    results = {}
+    if args.command in ("tools", "all"):
+        results["tools"] = {}
+        for files in (int(size) for size in args.sizes.split(",") if size):
+            print(f"tools: {files} files", file=sys.stderr)
+            results["tools"][str(files)] = run_tools_child(files, args.repeat)
+    if args.command in ("e2e", "all"):
+        print(f"e2e: {args.files} files", file=sys.stderr)
+        results["e2e"] = scenarios.run(
+            args.files,
+            [name for name in args.scenarios.split(",") if name] or None,
+            args.repeat,
+            tokens_per_second=args.tokens_per_second,
+            first_token_latency=args.first_token_latency,
+        )
+
+    report = json.dumps({"meta": meta(), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
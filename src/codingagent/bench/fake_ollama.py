@@ -0,0 +1,195 @@
+import argparse
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_TOKENS_PER_SECOND = 50.0
+DEFAULT_FIRST_TOKEN_LATENCY = 0.2
+
+# a token is a word with its trailing whitespace, close enough for timing
+TOKEN = re.compile(r"\S+\s*|\s+")
+
+@dataclass
+class Step:
+    """One scripted model turn: streamed text, then tool calls as {"name": ..., "arguments": {...}}."""
+    content: str = ""
+    tool_calls: list[dict] = field(default_factory=list)
+
+def load_script(path: str) -> list[Step]:
+    with open(path, "r") as f:
+        return [Step(**step) for step in json.load(f)]
+
+def _created_at() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000000000Z", time.gmtime())
+
+class FakeOllama:
+    """Local stand-in for an Ollama server's /api/chat endpoint that replays a script.
+
+    The step replayed for a request is chosen by the number of assistant messages in its
+    history, so concurrent conversations (sub-agents, batch tasks) each walk the script from
+    the start. Text is streamed a token at a time at `tokens_per_second` after a first token
+    latency; the final chunk carries the token counts and durations Ollama reports.
+    Non-streaming requests (context compaction) get the step's content in one response.
+    """
+
+    def __init__(
+        self,
+        steps: list[Step],
+        tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+        first_token_latency: float = DEFAULT_FIRST_TOKEN_LATENCY,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.steps = steps or [Step("Done.")]
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def step_for(self, messages: list[dict]) -> Step:
+        turn = sum(1 for message in messages if message.get("role") == "assistant")
+        return self.steps[min(turn, len(self.steps) - 1)]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._json({"version": "0.0.0-fake"})
+                elif self.path == "/api/tags":
+                    self._json({"models": []})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if self.path != "/api/chat":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.requests += 1
+                fake.reply(self, body)
+
+        return Handler
+
+    def _chunk(self, model: str, message: dict, done: bool = False, **extra) -> bytes:
+        chunk = {"model": model, "created_at": _created_at(), "message": message, "done": done, **extra}
+        return (json.dumps(chunk) + "\n").encode("utf-8")
+
+    def reply(self, handler: BaseHTTPRequestHandler, body: dict):
+        started = time.perf_counter_ns()
+        model = body.get("model", "fake")
+        messages = body.get("messages", [])
+        step = self.step_for(messages)
+        tokens = TOKEN.findall(step.content)
+        tool_calls = [
+            {"function": {"name": call["name"], "arguments": call.get("arguments", {})}}
+            for call in step.tool_calls
+        ]
+        # about four characters per token, like the real tokenizer on english and code
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+
+        time.sleep(self.first_token_latency)
+        if not body.get("stream", True):
+            time.sleep(len(tokens) / self.tokens_per_second)
+            handler._json({
+                "model": model,
+                "created_at": _created_at(),
+                "message": {"role": "assistant", "content": step.content},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(tokens),
+            })
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def send(data: bytes):
+            handler.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            handler.wfile.flush()
+
+        eval_started = time.perf_counter_ns()
+        interval = 1 / self.tokens_per_second
+        try:
+            for token in tokens:
+                send(self._chunk(model, {"role": "assistant", "content": token}))
+                time.sleep(interval)
+            for call in tool_calls:
+                send(self._chunk(model, {"role": "assistant", "content": "", "tool_calls": [call]}))
+            finished = time.perf_counter_ns()
+            send(self._chunk(
+                model,
+                {"role": "assistant", "content": ""},
+                done=True,
+                done_reason="stop",
+                total_duration=finished - started,
+                load_duration=0,
+                prompt_eval_count=prompt_tokens,
+                prompt_eval_duration=eval_started - started,
+                eval_count=len(tokens) + len(tool_calls),
+                eval_duration=finished - eval_started,
+            ))
+            handler.wfile.write(b"0\r\n\r\n")
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # the client cancelled the generation
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a scripted conversation as an Ollama /api/chat server")
+    parser.add_argument("script", help="JSON list of steps: {\"content\": ..., \"tool_calls\": [{\"name\": ..., \"arguments\": {...}}]}")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND)
+    parser.add_argument("--first-token-latency", type=float, default=DEFAULT_FIRST_TOKEN_LATENCY)
+    args = parser.parse_args()
+
+    fake = FakeOllama(load_script(args.script), args.tokens_per_second, args.first_token_latency, port=args.port)
+    print(f"serving {len(fake.steps)} steps on {fake.url}", flush=True)
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from typing import Callable, Optional
+
+from codingagent.bench import synthetic_repo
+from codingagent.bench.fake_ollama import FakeOllama, Step
+from codingagent.bench.tool_bench import peak_rss_mb
+
+# the model is not what is measured, a fast one keeps the agent's own overhead visible
+TOKENS_PER_SECOND = 500.0
+FIRST_TOKEN_LATENCY = 0.02
+
+# files of the repository the scenarios work in
+DEFAULT_FILES = 1000
+
+SCRATCH = "bench_e2e.py"
+
+LONG_ANSWER = " ".join(f"Step {i}: the handler validates the request and forwards it." for i in range(100))
+
+def _call(tool: str, **arguments) -> dict:
+    return {"name": tool, "arguments": arguments}
+
+def read_edit(root: str) -> list[Step]:
+    scratch = os.path.join(root, SCRATCH)
+    return [
+        Step("Let me look at the file first.", [_call("read_file", file_path=scratch)]),
+        Step("Now the change.", [_call("edit_tool", file_path=scratch, old_string="value = 0\n", new_string="value = 1\n")]),
+        Step("", [_call("read_file", file_path=scratch)]),
+        Step("I changed the initial value to 1."),
+    ]
+
+def search(root: str) -> list[Step]:
+    return [
+        Step("Searching for open work.", [_call("grep", pattern=r"TODO\(bench\)", path=root, glob="*.py")]),
+        Step("", [_call("glob_tool", root_directory=os.path.join(root, "src", "d00"), pattern="*.go")]),
+        Step("", [_call("find_symbol", name="handler_40"), _call("find_symbol", name="Handler40", references="true")]),
+        Step("", [_call("repo_map", path=os.path.join(root, "src", "d00"))]),
+        Step("The open work is in the handlers listed above."),
+    ]
+
+def parallel_reads(root: str) -> list[Step]:
+    reads = [_call("read_file", file_path=synthetic_repo.file_path(root, i)) for i in range(0, 32, 4)]
+    return [
+        Step("Reading the modules side by side.", reads),
+        Step("", [_call("ls", path=os.path.dirname(synthetic_repo.file_path(root, 0)))]),
+        Step("All eight modules follow the same structure."),
+    ]
+
+def large_output(root: str) -> list[Step]:
+    # the grep output is over the inline limit, it is stored as the process' first result
+    return [
+        Step("Listing every handler.", [_call("grep", pattern="def handle", path=root)]),
+        Step("", [_call("tool_result", handle="result-1", offset="200", limit="200")]),
+        Step("", [_call("tool_result", handle="result-1", pattern="module_4[0-9]\\.py")]),
+        Step("Every Python module defines one handler."),
+    ]
+
+def long_answer(root: str) -> list[Step]:
+    return [Step(LONG_ANSWER)]
+
+SCENARIOS: dict[str, Callable[[str], list[Step]]] = {
+    "read_edit": read_edit,
+    "search": search,
+    "parallel_reads": parallel_reads,
+    "large_output": large_output,
+    "long_answer": long_answer,
+}
+
+def _prepare(root: str):
+    with open(os.path.join(root, SCRATCH), "w") as f:
+        f.write(synthetic_repo.file_content(0) + "value = 0\n")
+
+async def run_agent(name: str, root: str, url: str) -> dict:
+    """Runs scenario `name` with a headless App against the fake server at `url`, in this process."""
+    from codingagent.config import Config
+    from codingagent.main import App, build_worker_pool, connect_tools, shutdown
+
+    class TimedApp(App):
+        """Records the time spent streaming each response and running each round of tool calls."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.timings: list[dict] = []
+
+        async def stream_response(self, tools=None):
+            started = time.perf_counter()
+            response, tool_calls = await super().stream_response(tools)
+            self.timings.append({"model_ms": (time.perf_counter() - started) * 1000, "tool_ms": 0.0, "tool_calls": len(tool_calls)})
+            return response, tool_calls
+
+        async def call_tools(self, tools):
+            started = time.perf_counter()
+            await super().call_tools(tools)
+            self.timings[-1]["tool_ms"] = (time.perf_counter() - started) * 1000
+
+    os.chdir(root)
+    _prepare(root)
+    config = Config(url, "fake", 32768, user_mcp_servers=[])
+    worker_pool = build_worker_pool(config)
+    started = time.perf_counter()
+    try:
+        async with AsyncExitStack() as stack:
+            mcp_client_index, tools = await connect_tools(config, stack, worker_pool)
+            app = TimedApp(mcp_client_index, tools, config, headless=True)
+            await app.init()
+            ready = time.perf_counter()
+            await app.run(f"bench scenario {name}")
+            finished = time.perf_counter()
+    finally:
+        await shutdown(worker_pool)
+
+    errors = [
+        message["content"] for message in app.messages
+        if message["role"] == "tool" and (message["content"].startswith("Error:") or message["content"].startswith('{"error"'))
+    ]
+    turns = [
+        {key: round(value, 3) if isinstance(value, float) else value for key, value in timing.items()}
+        for timing in app.timings
+    ]
+    return {
+        "startup_ms": round((ready - started) * 1000, 3),
+        "total_ms": round((finished - ready) * 1000, 3),
+        "turns": turns,
+        "turn_ms": [round(turn["model_ms"] + turn["tool_ms"], 3) for turn in turns],
+        "tool_ms": round(sum(turn["tool_ms"] for turn in turns), 3),
+        "model_ms": round(sum(turn["model_ms"] for turn in turns), 3),
+        "tool_errors": errors,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def run_worker(name: str, root: str, url: str, output: str) -> int:
+    result = asyncio.run(run_agent(name, root, url))
+    with open(output, "w") as f:
+        json.dump(result, f)
+    return 0
+
+def run_scenario(
+    name: str,
+    root: str,
+    tokens_per_second: float = TOKENS_PER_SECOND,
+    first_token_latency: float = FIRST_TOKEN_LATENCY,
+) -> dict:
+    """Runs scenario `name` in a fresh agent process so its peak RSS and caches are its own.
+
+    The fake server runs in this process, the agent does not share its interpreter with it.
+    """
+    steps = SCENARIOS[name](root)
+    fake = FakeOllama(steps, tokens_per_second, first_token_latency).start()
+    fd, output = tempfile.mkstemp(prefix="codingagent-bench-", suffix=".json")
+    os.close(fd)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-m", "codingagent.bench", "scenario-worker", name, "--repo", root, "--url", fake.url, "--output", output],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        if proc.returncode != 0:
+            return {"error": f"agent exited with status {proc.returncode}", "stderr": proc.stderr[-4000:]}
+        with open(output, "r") as f:
+            result = json.load(f)
+    finally:
+        fake.stop()
+        os.unlink(output)
+
+    result["model_requests"] = fake.requests
+    return result
+
+def run(files: int = DEFAULT_FILES, names: Optional[list[str]] = None, repeat: int = 1, **fake_options) -> dict:
+    root = synthetic_repo.generate(files, progress=True)
+    results = {}
+    for name in names or SCENARIOS:
+        runs = [run_scenario(name, root, **fake_options) for _ in range(max(1, repeat))]
+        completed = sorted((run for run in runs if "error" not in run), key=lambda run: run["total_ms"])
+        if not completed:
+            results[name] = runs[0]
+            continue
+        # the median run stands for the scenario, the spread shows how noisy it was
+        result = completed[len(completed) // 2]
+        result["total_ms_runs"] = [run["total_ms"] for run in runs if "error" not in run]
+        results[name] = result
+    return {"files": files, "repo": root, "scenarios": results}
@@ -0,0 +1,126 @@
+import os
+import sys
+from typing import Optional
+
+from codingagent.packages.fs.cache import cache_dir
+
+# files per directory and subdirectories per directory
+FANOUT = 32
+
+COMPLETE_MARKER = ".bench-complete"
+
+# one in this many files contains the grep target
+NEEDLE_EVERY = 100
+NEEDLE = "TODO(bench)"
+
+PYTHON = '''import os
+
+VALUE_{i} = {i}
+
+class Handler{i}:
+    """Handles request kind {i}."""
+
+    def handle(self, request):
+        # {note}
+        return handler_{i}(request) + VALUE_{i}
+
+def handler_{i}(request):
+    value = len(request)
+    for part in request:
+        value += hash(part) % {modulo}
+    return value
+'''
+
+GO = '''package pkg{d}
+
+// Service{i} serves request kind {i}. {note}
+type Service{i} struct {{
+\tname string
+}}
+
+func (s *Service{i}) Serve(request string) int {{
+\treturn len(request) + {i}
+}}
+
+func NewService{i}() *Service{i} {{
+\treturn &Service{i}{{name: "service-{i}"}}
+}}
+'''
+
+TYPESCRIPT = '''// {note}
+export interface Props{i} {{
+  id: number;
+  label: string;
+}}
+
+export class Widget{i} {{
+  constructor(private props: Props{i}) {{}}
+
+  render(): string {{
+    return `${{this.props.label}}-{i}`;
+  }}
+}}
+
+export const makeWidget{i} = (label: string) => new Widget{i}({{ id: {i}, label }});
+'''
+
+MARKDOWN = '''# Component {i}
+
+Notes for component {i}. {note}
+
+- owner: team-{d}
+- status: stable
+'''
+
+TEMPLATES = [(".py", PYTHON), (".go", GO), (".ts", TYPESCRIPT), (".md", MARKDOWN)]
+
+def file_path(root: str, i: int) -> str:
+    """Path of the i-th file: directories nest FANOUT wide so no directory gets too large."""
+    directory = i // FANOUT
+    parts = []
+    while True:
+        parts.append(f"d{directory % FANOUT:02d}")
+        directory //= FANOUT
+        if directory == 0:
+            break
+    extension = TEMPLATES[i % len(TEMPLATES)][0]
+    return os.path.join(root, "src", *reversed(parts), f"module_{i}{extension}")
+
+def file_content(i: int) -> str:
+    note = NEEDLE + " revisit this" if i % NEEDLE_EVERY == 0 else "stable"
+    template = TEMPLATES[i % len(TEMPLATES)][1]
+    return template.format(i=i, d=i // FANOUT, note=note, modulo=i % 97 + 3)
+
+def generate(files: int, root: Optional[str] = None, progress: bool = False) -> str:
+    """Creates (once) a repository of `files` source files plus an ignored build directory.
+
+    Repositories are kept in the cache directory and reused by later runs, generating the
+    million file one takes minutes.
+    """
+    root = root or cache_dir("bench", f"repo-{files}")
+    marker = os.path.join(root, COMPLETE_MARKER)
+    if os.path.exists(marker):
+        return root
+
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("build/\n*.log\n")
+    os.makedirs(os.path.join(root, "build"), exist_ok=True)
+    for i in range(FANOUT):
+        with open(os.path.join(root, "build", f"artifact_{i}.py"), "w") as f:
+            f.write(file_content(i))
+
+    created = set()
+    for i in range(files):
+        path = file_path(root, i)
+        directory = os.path.dirname(path)
+        if directory not in created:
+            os.makedirs(directory, exist_ok=True)
+            created.add(directory)
+        with open(path, "w") as f:
+            f.write(file_content(i))
+        if progress and i and i % 50_000 == 0:
+            print(f"  generated {i}/{files} files", file=sys.stderr)
+
+    with open(marker, "w") as f:
+        f.write(str(files))
+    return root
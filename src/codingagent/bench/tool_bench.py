@@ -0,0 +1,143 @@
+import os
+import re
+import resource
+import statistics
+import time
+from typing import Callable
+
+from codingagent.bench import synthetic_repo
+
+DEFAULT_REPEAT = 5
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _text(result) -> str:
+    return "".join(getattr(block, "text", "") for block in result.content)
+
+def measure(call: Callable[[], object], repeat: int) -> dict:
+    """Milliseconds of the first call (cold caches) and of `repeat` further calls."""
+    started = time.perf_counter()
+    result = call()
+    first = (time.perf_counter() - started) * 1000
+    if getattr(result, "isError", False):
+        raise RuntimeError(_text(result))
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return {
+        "first_ms": round(first, 3),
+        "min_ms": round(times[0], 3),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+        "output_chars": len(_text(result)),
+    }
+
+def _wait(event, what: str, timeout: float = 3600) -> float:
+    started = time.perf_counter()
+    if not event.wait(timeout):
+        raise TimeoutError(f"{what} not ready after {timeout}s")
+    return round((time.perf_counter() - started) * 1000, 3)
+
+def tool_cases(root: str) -> list[tuple[str, Callable[[], object]]]:
+    """(name, call) of every builtin tool that runs offline, against the synthetic repo at `root`.
+
+    git and semantic_search are left out: the synthetic repo is no git checkout and semantic
+    search needs an embedding endpoint.
+    """
+    from codingagent.packages.context.read_snapshots import ReadSnapshots, use_snapshots
+    from codingagent.packages.context.result_store import result_store
+    from codingagent.packages.tools.edit import edit_tool
+    from codingagent.packages.tools.find_symbol import find_symbol
+    from codingagent.packages.tools.glob_tool import glob_tool
+    from codingagent.packages.tools.grep import grep
+    from codingagent.packages.tools.ls import ls
+    from codingagent.packages.tools.read import read_file
+    from codingagent.packages.tools.repo_map import repo_map
+    from codingagent.packages.tools.tool_result import tool_result
+    from codingagent.packages.tools.write import write_tool
+
+    target = synthetic_repo.file_path(root, 42)
+    scratch = os.path.join(root, "bench_scratch.py")
+    edited = os.path.join(root, "bench_edit.py")
+    # write_tool creates the scratch file, overwriting one of an earlier run would need a read first
+    if os.path.exists(scratch):
+        os.unlink(scratch)
+    with open(edited, "w") as f:
+        f.write(synthetic_repo.file_content(0) + "value = 0\n")
+
+    # read_file diffs a re-read against this conversation's earlier read
+    snapshots = ReadSnapshots()
+    use_snapshots(snapshots)
+
+    def read_again():
+        return read_file(target)
+
+    def read_cold():
+        snapshots.clear()
+        return read_file(target)
+
+    edits = {"value": 0}
+
+    def edit():
+        current = edits["value"]
+        edits["value"] += 1
+        return edit_tool(edited, f"value = {current}\n", f"value = {current + 1}\n")
+
+    handle = result_store.put("grep", "\n".join(f"line {i} " + "x" * 60 for i in range(100_000))).handle
+    read_file(edited)
+
+    return [
+        ("ls", lambda: ls(os.path.join(root, "src"))),
+        ("glob_tool", lambda: glob_tool(root, "**/*.py")),
+        ("grep", lambda: grep(re.escape(synthetic_repo.NEEDLE), root)),
+        ("grep_glob", lambda: grep("def handle", root, "*.py")),
+        ("read_file", read_cold),
+        ("read_file_reread", read_again),
+        ("write_tool", lambda: write_tool(scratch, synthetic_repo.file_content(7))),
+        ("edit_tool", edit),
+        ("tool_result_page", lambda: tool_result(handle, 50_000, 200)),
+        ("tool_result_search", lambda: tool_result(handle, pattern="line 9999[0-9]")),
+        ("find_symbol", lambda: find_symbol("handler_42")),
+        ("find_symbol_references", lambda: find_symbol("Handler40", references=True, path="src/d00")),
+        ("repo_map", lambda: repo_map(os.path.join(root, "src", "d00"))),
+    ]
+
+def run(files: int, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Benchmarks the builtin tools on a synthetic repo of `files` files, as a session would see them.
+
+    The inventory and the symbol index are built first (their build times are reported) so
+    the tools answer from memory like they do after App.init.
+    """
+    from codingagent.packages.fs import inventory
+    from codingagent.packages.symbols import index as symbol_index
+
+    started = time.perf_counter()
+    root = synthetic_repo.generate(files, progress=True)
+    generate_ms = round((time.perf_counter() - started) * 1000, 3)
+    os.chdir(root)
+
+    inventory_ms = _wait(inventory.start(root).ready, "inventory")
+    symbols_ms = _wait(symbol_index.start(root).ready, "symbol index")
+
+    results = {}
+    for name, call in tool_cases(root):
+        try:
+            results[name] = measure(call, repeat)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+
+    return {
+        "files": files,
+        "repo": root,
+        "generate_ms": generate_ms,
+        "inventory_build_ms": inventory_ms,
+        "symbol_index_build_ms": symbols_ms,
+        "tools": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
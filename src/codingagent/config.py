@@ -1,18 +1,20 @@
 import json
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from typing import Any, Callable
 
-from rich.console import Console
-from rich.pretty import Pretty
-
-from prompt_toolkit import prompt
-
 from codingagent.packages.tools import (
+    edit,
+    find_symbol,
     ls,
     glob_tool,
     git,
+    grep,
     read,
+    repo_map,
+    semantic_search,
+    sub_agent,
+    tool_result,
     write,
 )
 
@@ -22,6 +24,55 @@ class Config:
     model_id: str
     context_size: int
     user_mcp_servers: list[dict]
+    # "ollama" sends requests to inference_api_url, "llama_cpp" runs the GGUF model at llama_model_path in process
+    inference_backend: str = "ollama"
+    # more servers serving model_id next to inference_api_url, each conversation is routed to the least busy
+    # healthy one and they are probed every inference_health_interval seconds
+    inference_api_urls: list[str] = field(default_factory=list)
+    inference_health_interval: float = 10
+    llama_model_path: str = ""
+    # 0 lets llama.cpp pick the thread count, gpu layers stay 0 on CPU only machines
+    llama_threads: int = 0
+    llama_gpu_layers: int = 0
+    # bytes of KV state kept for conversations that lost the context to another one (sub-agents), 0 disables
+    llama_state_cache_bytes: int = 2 * 1024 * 1024 * 1024
+    # the KV state is saved on exit and restored by the next session in the same directory
+    llama_persist_state: bool = True
+    max_parallel_tools: int = 8
+    pipeline_tool_calls: bool = True
+    # tokens of history sent per request before it gets compacted, 0 uses 3/4 of context_size
+    context_budget: int = 0
+    # worker pool for builtin tools, tools named in process_tools run in separate processes
+    tool_threads: int = 8
+    tool_processes: int = 0
+    process_tools: list[str] = field(default_factory=list)
+    # seconds before a builtin tool call is abandoned, per tool overrides in tool_timeouts
+    tool_timeout: float = 120
+    tool_timeouts: dict[str, float] = field(default_factory=dict)
+    # connect to mcp servers with a cached tool catalog only when one of their tools is called
+    lazy_mcp_servers: bool = False
+    # characters of tool output added to the history as is, larger outputs are stored and previewed
+    tool_result_inline_limit: int = 8000
+    # sub-agents running at once, their token budget (0 uses 1/4 of context_size) and rounds of tool calls
+    max_sub_agents: int = 4
+    sub_agent_context_budget: int = 0
+    sub_agent_max_turns: int = 20
+    # text-embeddings-inference /embed endpoint used by semantic_search, empty disables it
+    embedding_api_url: str = ""
+    # the working directory is indexed in the background when an embedding endpoint is set
+    semantic_index: bool = True
+    embedding_batch_size: int = 32
+    embedding_concurrency: int = 4
+    # --batch: tasks running at once, seconds before a task is killed and rounds of tool calls per task
+    batch_concurrency: int = 4
+    batch_task_timeout: float = 3600
+    batch_max_turns: int = 50
+    # latency spans of model requests and tool calls, shown by /stats and appended to a rotating
+    # JSONL file (trace_path, by default in the cache directory)
+    tracing: bool = True
+    trace_path: str = ""
+    trace_max_bytes: int = 10 * 1024 * 1024
+    trace_backups: int = 3
 
 @dataclass
 class ConfigArgs:
@@ -32,11 +83,25 @@ class ConfigArgs:
 BUILTIN_TOOLS: list[Callable[..., Any]] = [
     ls.ls,
     glob_tool.glob_tool,
+    grep.grep,
     git.git,
     read.read_file,
     write.write_tool, 
+    edit.edit_tool,
+    tool_result.tool_result,
+    sub_agent.sub_agent_launch,
+    semantic_search.semantic_search,
+    find_symbol.find_symbol,
+    repo_map.repo_map,
 ]
 
+def builtin_tools(config: Config) -> list[Callable[..., Any]]:
+    """The builtin tools offered to the model, semantic_search only when an embedding endpoint is configured."""
+    return [
+        tool for tool in BUILTIN_TOOLS
+        if tool is not semantic_search.semantic_search or config.embedding_api_url
+    ]
+
 DEFAULT_CONFIG = Config(
     "http://localhost:9090",
     "hf.co/unsloth/Qwen3-8B-GGUF:Q4_K_M",
@@ -68,6 +133,10 @@ def load_config(config_path: str, args: ConfigArgs) -> Config:
         exit(1)
         
     if args.mcp_command:
+        from prompt_toolkit import prompt
+        from rich.console import Console
+        from rich.pretty import Pretty
+
         while True:
             try:
                 user_result = prompt("Paste configuration (alt+enter to submit): ", multiline=True, vi_mode=True)
@@ -1,14 +1,15 @@
 import asyncio
 import os
 import argparse
+import importlib
 import json
-from contextlib import AsyncExitStack
-from typing import Dict 
+import re
+import sys
+import threading
+from contextlib import AsyncExitStack, nullcontext
+from typing import Dict, Optional
 from pathlib import Path
 
-from ollama import Client
-from mcp.types import TextContent
-from fastmcp.exceptions import ToolError
 from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.console import Console
@@ -20,40 +21,121 @@ from prompt_toolkit.completion import NestedCompleter
 from prompt_toolkit.patch_stdout import patch_stdout
 
 from codingagent.config import (
-    BUILTIN_TOOLS, 
     Config, 
     ConfigArgs, 
+    builtin_tools,
     load_config,
 )
-from codingagent.packages.prompts import system_prompt
+from codingagent.packages.prompts import system_prompt, compact_prompt, sub_agent_prompt
+from codingagent.packages.context.manager import ContextManager
+from codingagent.packages.context.read_snapshots import ReadSnapshots, use_snapshots
+from codingagent.packages.context.result_store import result_store
+from codingagent.packages.fs import inventory
+from codingagent.packages.inference.backend import InferenceBackend, close_backends, create_backend
+from codingagent.packages.inference.stream import StreamRenderer, interrupt_handler
 from codingagent.packages.tool_client import (
     mcp_client,
     builtin_mcp_client,
 )
+from codingagent.packages.tool_client.scheduler import ToolScheduler
+from codingagent.packages.tool_client.worker_pool import WorkerPool
+from codingagent.packages.semantic import embedder
+from codingagent.packages.tools import sub_agent
+from codingagent.packages.tracing.tracer import tracer
+
+# imported in the background after startup, see App.init
+PRELOAD_MODULES = ("ollama", "mcp.types")
+
+def preload_modules():
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
 
 completer = NestedCompleter.from_nested_dict({
     "/exit": None,
     "/plan": None,
+    "/stats": None,
 })
 
 class App:
-    def __init__(self, mcp_client_index: Dict[str, mcp_client.MCPClient], tools: list, config: Config):
-        self.is_sub_agent = False
-        self.model_client = Client(host=config.inference_api_url)
+    def __init__(
+        self,
+        mcp_client_index: Dict[str, mcp_client.MCPClient],
+        tools: list,
+        config: Config,
+        is_sub_agent: bool = False,
+        headless: bool = False,
+        max_turns: Optional[int] = None,
+    ):
+        self.is_sub_agent = is_sub_agent
+        # sub-agents and batch tasks answer a single query without a terminal
+        self.headless = headless or is_sub_agent
+        self._model_client = None
         self.mcp_client_index: Dict[str, mcp_client.MCPClient] = mcp_client_index
         self.mcp_tool_client_index: Dict[str, str] = {}
         self.tools = tools
-        self.console = Console()
-        self.session = PromptSession()
-        self.error_console = Console(stderr=True)
+        # sub-agents work in the background, only their final report is shown (by the parent)
+        self.console = Console(quiet=self.headless)
+        self.session = PromptSession() if not self.headless else None
+        self.error_console = Console(stderr=True, quiet=self.headless)
         self.config = config
+        self.interrupted = False
+        # rounds of tool calls before the model has to answer, unlimited for the interactive agent
+        self.max_turns = config.sub_agent_max_turns if is_sub_agent else max_turns
+        self.turns = 0
+        self.scheduler = ToolScheduler(self.mcp_client_index, config.max_parallel_tools)
+        if is_sub_agent:
+            budget = config.sub_agent_context_budget or config.context_size // 4
+        else:
+            budget = config.context_budget or config.context_size * 3 // 4
+        self.context = ContextManager(
+            budget,
+            self.summarize,
+            self.scheduler.is_read_only,
+        )
+        # what read_file returned per file, so re-reads can return only the changes
+        self.read_snapshots = ReadSnapshots()
+        system_content = system_prompt.SYSTEM_PROMPT.format(directory=os.getcwd())
+        if is_sub_agent:
+            system_content += sub_agent_prompt.SUB_AGENT_PROMPT
         self.messages= [{
             "role": "system",
-            "content": system_prompt.SYSTEM_PROMPT.format(directory=os.getcwd()), 
+            "content": system_content, 
         }]
 
+    @property
+    def model_client(self) -> InferenceBackend:
+        # created on the first request, the ollama client and a local model are slow to load
+        if self._model_client is None:
+            self._model_client = create_backend(self.config)
+        return self._model_client
+
     async def init(self):
         if not self.is_sub_agent:
+            # index the working directory in the background so file tools can answer from memory
+            inventory.start(os.getcwd())
+
+            # definitions for find_symbol and repo_map, only files changed since the last session are parsed
+            from codingagent.packages.symbols import index as symbol_index
+            symbol_index.start(os.getcwd())
+
+            # embed changed files for semantic_search, reusing the vectors of unchanged chunks; a batch
+            # worker searches the index its coordinator built, workers indexing the same tree would clash
+            if self.config.embedding_api_url and self.config.semantic_index and not self.headless:
+                from codingagent.packages.semantic import indexer
+                indexer.start(
+                    os.getcwd(),
+                    self.config.embedding_api_url,
+                    self.config.embedding_batch_size,
+                    self.config.embedding_concurrency,
+                )
+
+            # load the inference client while the user types the first prompt
+            threading.Thread(target=preload_modules, name="preload", daemon=True).start()
+
+        if not self.headless:
             self.console.print(Panel(f"[magenta bold]⛛[/magenta bold]   Hi 👋, I'm [magenta u]M3L[/magenta u]\n\n[#9ca0b0]Your friendly AI coding agent, ready to help all your software engineering needs\n\ncwd: {os.getcwd()}[/#9ca0b0]", border_style="bold magenta", width=60))
             self.console.print("")
             self.console.print("[bold red u]Ensure gcloud proxy is running[/bold red u]")
@@ -61,12 +143,13 @@ class App:
             self.console.print(Markdown("--- Tips ---"))
             self.console.print("[#303446]1.[/#303446] [#9ca0b0]Add \\think to your prompt to enable extended thinking (great for complex tasks!)[/#9ca0b0]")
             self.console.print("[#303446]2.[/#303446] [#9ca0b0]Type /exit to end session[/#9ca0b0]")
+            self.console.print("[#303446]3.[/#303446] [#9ca0b0]Press Ctrl-C to stop a response that is being generated[/#9ca0b0]")
             self.console.print("")
 
     async def run(self, query: str = ""):
         while True:
             # wait for the user query
-            if not self.is_sub_agent:
+            if not self.headless:
                 with patch_stdout():
                     query = await self.session.prompt_async("> ", completer=completer, vi_mode=True) 
 
@@ -77,6 +160,13 @@ class App:
             if query == "/plan":
                 break
 
+            if query == "/stats":
+                from codingagent.packages.tracing.stats import render_stats
+                pool = getattr(self._model_client, "pool", None)
+                endpoints = pool.status() if pool is not None else []
+                self.console.print(render_stats(tracer.summary(), self.pool_metrics(), endpoints))
+                continue
+
             # add nothink by default 
             should_think = True
             if "\\think" not in query:
@@ -91,99 +181,203 @@ class App:
 
             # run inference on history
             await self.inference(should_think)
+
+            # a sub-agent or batch task answers a single query
+            if self.headless:
+                break
         pass 
+
+    def pool_metrics(self) -> dict:
+        """Load of the worker pools running the builtin tools."""
+        metrics = {}
+        for client in set(self.mcp_client_index.values()):
+            worker_pool = getattr(client, "worker_pool", None)
+            if worker_pool is not None:
+                metrics.update(worker_pool.metrics())
+        return metrics
+
+    def final_report(self) -> str:
+        for message in reversed(self.messages):
+            if message["role"] == "assistant" and message["content"].strip():
+                return message["content"].strip()
+        return "The agent finished without a report."
     
-    def stream_response(self):
+    async def stream_response(self, tools: Optional[list] = None):
         thinking = False
-        response = []
-        thoughts = []
         tool_calls = []
-        for part in self.model_client.chat(self.config.model_id, messages=self.messages, stream=True, think=False, tools=self.tools, options={'num_ctx': self.config.context_size}):
-            if part.message.tool_calls is not None and len(part.message.tool_calls) > 0:
-                tool_calls.extend({
-                    "name": call.function.name, 
-                    "args": call.function.arguments
-                } for call in part.message.tool_calls)
-            else:
-                if part.message.content:
-                    if part.message.content == "<think>":
-                        thinking = True
-                        continue
-                    elif part.message.content == "</think>":
-                        thinking = False
-                        continue
-
-                    # display thoughts in slate
-                    if thinking:
-                        thoughts.append(part.message.content)
-                        self.console.print(Text("".join(part.message.content), style="#9ca0b0"), end="")
+        # the last chunk carries the server's token counts and timings
+        final = None
+        stream = None
+        with tracer.span("generate", model=self.config.model_id, sub_agent=self.is_sub_agent) as span, StreamRenderer(self.console) as renderer:
+            try:
+                stream = await self.model_client.chat(self.config.model_id, messages=self.messages, stream=True, think=False, tools=self.tools if tools is None else tools, options={'num_ctx': self.config.context_size})
+                async for part in stream:
+                    if part.done:
+                        final = part
+                    if part.message.tool_calls is not None and len(part.message.tool_calls) > 0:
+                        renderer.mark_first_token()
+                        for call in part.message.tool_calls:
+                            tool_call = {
+                                "name": call.function.name, 
+                                "args": call.function.arguments
+                            }
+                            tool_calls.append(tool_call)
+
+                            # start the call right away so tool I/O overlaps with the rest of the generation
+                            if self.config.pipeline_tool_calls:
+                                self.submit_tool_call(tool_call)
                     else:
-                        # collect part of response so we can add it to context later (don't collect thinking)
-                        response.append(part.message.content)
-
-        return response, tool_calls
+                        if part.message.content:
+                            if part.message.content == "<think>":
+                                thinking = True
+                                continue
+                            elif part.message.content == "</think>":
+                                thinking = False
+                                continue
+
+                            # display thoughts in slate
+                            if thinking:
+                                renderer.add_thought(part.message.content)
+                            else:
+                                # collect part of response so we can add it to context later (don't collect thinking)
+                                renderer.add_response(part.message.content)
+            except asyncio.CancelledError:
+                # Ctrl-C only stops this generation, keep what we have so far
+                if not self.interrupted:
+                    raise
+            finally:
+                span.set(**generation_stats(renderer, final), tool_calls=len(tool_calls), interrupted=self.interrupted)
+                # an interrupted stream stops generating now rather than when it is garbage collected
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+        if self.interrupted:
+            self.console.print("[#9ca0b0]generation interrupted[/#9ca0b0]")
+            self.scheduler.cancel()
+            # cancelled reads may have recorded content that never made it into the history
+            self.read_snapshots.clear()
+            tool_calls = []
+        elif renderer.ttft is not None:
+            timing = f"time to first token {renderer.ttft:.2f}s"
+            if final is not None and final.eval_count and final.eval_duration:
+                timing += f", {final.eval_count / (final.eval_duration / 1e9):.1f} tokens/s"
+            self.console.print(f"[#9ca0b0]{timing}[/#9ca0b0]")
+
+        return renderer.response, tool_calls
     
+    def submit_tool_call(self, tool_call):
+        self.console.print(Markdown(f"- Calling tool `{tool_call['name']}` with args `{tool_call['args']}`"))
+        self.scheduler.submit(tool_call)
+
     async def call_tools(self, tools):
-        with self.console.status("[bold green]Calling tools...") as status:
-            for tool_call in tools:
-                self.console.print(Markdown(f"- Calling tool `{tool_call['name']}` with args `{tool_call['args']}`"))
-                # determine client we can use to interact with the server
-                try:
-                    client = self.mcp_client_index[tool_call["name"]]
-                except KeyError:
-                    raise ValueError(f"can not find client for tool {tool_call["name"]}")
-
-                # call tool and collect result
-                try:
-
-                    # call tool
-                    tool_result_content = await client.call_tool(
-                        tool_call["name"], 
-                        tool_call["args"]
-                    )
-
-                    # collect result content
-                    tool_result = ""
-                    for block in tool_result_content.content:
-                        if isinstance(block, TextContent):
-                            tool_result = tool_result + block.text
-                            
-                    # add tool result to history
-                    self.messages.append({
-                        "role": "tool",
-                        "content": tool_result,
-                        "tool_name": tool_call["name"]
-                    })
-
-                except ToolError as t:
-                    self.error_console.print(Markdown(f"- error during tool execution of {tool_call['name']} error: {t}", style="bold red"))
-                    self.messages.append({
-                        "role": "tool",
-                        "content": f"Error: {e}",
-                        "tool_name": tool_call["name"]
-                    }) 
-                except Exception as e:
-                    self.error_console.print(Markdown(f"- error during tool execution of {tool_call['name']} error: {e} with type {type(e)}", style="bold red"))
-                    self.messages.append({
-                        "role": "tool",
-                        "content": f"Error: {e}",
-                        "tool_name": tool_call["name"]
-                    })
+        # independent calls run concurrently, results are added to history in call order
+        for tool_call in tools:
+            if not self.scheduler.is_submitted(tool_call):
+                self.submit_tool_call(tool_call)
+
+        with tracer.span("tools", calls=len(tools)), self.console.status("[bold green]Calling tools...") as status:
+            results = await self.scheduler.join()
+
+        for tool_call, tool_result_content in results:
+            if isinstance(tool_result_content, BaseException):
+                # only loaded when a call failed, mcp servers raise it and have imported it already
+                from fastmcp.exceptions import ToolError
+
+                # a read that timed out may still finish and record content the model never sees
+                self.read_snapshots.forget(tool_call["args"].get("file_path"))
+
+                if isinstance(tool_result_content, ToolError):
+                    self.error_console.print(Markdown(f"- error during tool execution of {tool_call['name']} error: {tool_result_content}", style="bold red"))
+                else:
+                    self.error_console.print(Markdown(f"- error during tool execution of {tool_call['name']} error: {tool_result_content} with type {type(tool_result_content)}", style="bold red"))
+                self.messages.append({
+                    "role": "tool",
+                    "content": f"Error: {tool_result_content}",
+                    "tool_name": tool_call["name"]
+                })
+                continue
+
+            # collect result content
+            tool_result = ""
+            for block in tool_result_content.content:
+                if getattr(block, "type", None) == "text":
+                    tool_result = tool_result + block.text
+                    
+            # large outputs stay out of the history, the model gets a preview and pages through the rest
+            tool_result = result_store.compact(tool_call["name"], tool_result, self.config.tool_result_inline_limit)
+
+            # add tool result to history, arguments are kept so the context manager can spot repeated calls
+            self.messages.append({
+                "role": "tool",
+                "content": tool_result,
+                "tool_name": tool_call["name"],
+                "tool_args": tool_call["args"],
+            })
         pass
     
+    async def summarize(self, transcript: str) -> str:
+        response = await self.model_client.chat(
+            self.config.model_id, 
+            messages=[
+                {"role": "system", "content": compact_prompt.COMPACT_PROMPT},
+                {"role": "user", "content": transcript + " \\nothink"},
+            ], 
+            think=False,
+            options={'num_ctx': self.config.context_size},
+        )
+        # drop the (empty) thinking block qwen emits even with thinking disabled
+        return re.sub(r"<think>.*?</think>", "", response.message.content or "", flags=re.DOTALL)
+
+    async def compact_context(self):
+        if not self.context.needs_compaction(self.messages):
+            return
+
+        with tracer.span("compact"), self.console.status("[bold green]Compacting context..."):
+            await self.context.compact(self.messages)
+        # earlier reads may have been elided or summarized, the next read of a file has to be a full one
+        self.read_snapshots.clear()
+        self.console.print(f"[#9ca0b0]compacted context to ~{self.context.total_tokens(self.messages)} tokens[/#9ca0b0]")
+
     async def inference(self, should_think: bool):
+        # tool calls of this conversation diff re-reads against its own earlier reads
+        use_snapshots(self.read_snapshots)
+        with tracer.span("inference", sub_agent=self.is_sub_agent) as span:
+            started_turns = self.turns
+            try:
+                await self._inference_rounds(should_think)
+            finally:
+                span.set(turns=self.turns - started_turns)
+
+    async def _inference_rounds(self, should_think: bool):
         while True:
             try:
-                # stream response
-                if should_think:
-                    response, tool_calls = self.stream_response() 
-                else:
-                    counter = 0
-                    with self.console.status(f"Thinking...{counter}"):
-                        response, tool_calls = self.stream_response() 
-                    
-                if len(response) != 0:
-                    self.console.print(Markdown("".join(response)))
+                # keep the history within the token budget before sending it again
+                await self.compact_context()
+
+                # stream response, Ctrl-C cancels the generation but keeps the session alive
+                # out of tool rounds, have the model answer with what it has
+                tools = None
+                if self.max_turns is not None and self.turns >= self.max_turns:
+                    self.messages.append({"role": "user", "content": sub_agent_prompt.WRAP_UP_PROMPT})
+                    tools = []
+                self.turns += 1
+
+                self.interrupted = False
+                stream_task = asyncio.create_task(self.stream_response(tools))
+
+                def interrupt():
+                    self.interrupted = True
+                    stream_task.cancel()
+
+                # a sub-agent is cancelled together with the tool call of its parent, a batch task by its timeout
+                with interrupt_handler(interrupt) if not self.headless else nullcontext():
+                    response, tool_calls = await stream_task
+
+                # the model was told to answer, tool calls it makes anyway are not run
+                if tools == [] and tool_calls:
+                    self.scheduler.cancel()
+                    tool_calls = []
 
                 # add assistant response to history
                 assistant_content = "".join(response)
@@ -199,66 +393,172 @@ class App:
                 await self.call_tools(tool_calls)                
 
             except Exception as e:
+                self.scheduler.cancel()
+                self.read_snapshots.clear()
                 self.error_console.log(f"inference error: {e}", style="bold red")
                 raise ValueError("inference error")
         pass
         
-async def main(config: Config):
+def generation_stats(renderer: StreamRenderer, final) -> dict:
+    """Time to first token, token counts and generation rate of a streamed response, for its trace span."""
+    stats = {"ttft_ms": round(renderer.ttft * 1000, 3) if renderer.ttft is not None else None}
+    if final is None:
+        return stats
+    stats["prompt_tokens"] = final.prompt_eval_count
+    stats["eval_tokens"] = final.eval_count
+    if final.prompt_eval_duration:
+        stats["prompt_ms"] = round(final.prompt_eval_duration / 1e6, 3)
+    if final.eval_count and final.eval_duration:
+        stats["tokens_per_second"] = round(final.eval_count / (final.eval_duration / 1e9), 2)
+    return stats
+
+class SubAgentPool:
+    """Runs sub-agents as tasks of this process, at most `max_concurrency` at a time.
+
+    Sub-agents share the MCP clients of the main agent but get their own history, token
+    budget and tool scheduler, and only see read-only tools so they can run side by side.
+    """
+
+    def __init__(self, mcp_client_index: dict, tools: list, config: Config):
+        self.mcp_client_index = mcp_client_index
+        self.tools = tools
+        self.config = config
+        self._semaphore = asyncio.Semaphore(max(1, config.max_sub_agents))
+
+    def sub_agent_tools(self) -> list:
+        tools = []
+        for tool in self.tools:
+            name = tool["function"]["name"]
+            client = self.mcp_client_index.get(name)
+            if name != "sub_agent_launch" and client is not None and client.is_read_only(name):
+                tools.append(tool)
+        return tools
+
+    async def launch(self, query: str) -> str:
+        async with self._semaphore:
+            app = App(self.mcp_client_index, self.sub_agent_tools(), self.config, is_sub_agent=True)
+            task = asyncio.create_task(app.run(query))
+            try:
+                await task
+            finally:
+                # cancelling the parent's tool call stops the sub-agent and its tool calls
+                if not task.done():
+                    task.cancel()
+                app.scheduler.cancel()
+            return app.final_report()
+
+def catalog_updater(client: mcp_client.MCPClient, tools: list, mcp_client_index: dict):
+    """Swaps a server's cached tool schemas for the ones it reported once connected."""
+    def update(previous: list, current: list):
+        for tool in previous:
+            if tool in tools:
+                tools.remove(tool)
+            if mcp_client_index.get(tool["function"]["name"]) is client:
+                del mcp_client_index[tool["function"]["name"]]
+        for tool in current:
+            mcp_client_index[tool["function"]["name"]] = client
+        tools.extend(current)
+    return update
+
+def build_worker_pool(config: Config) -> WorkerPool:
+    return WorkerPool(
+        config.tool_threads,
+        config.tool_processes,
+        config.process_tools,
+        config.tool_timeout,
+        config.tool_timeouts,
+    )
+
+async def connect_tools(config: Config, stack: AsyncExitStack, worker_pool: WorkerPool) -> tuple[dict, list]:
+    """Connects the builtin tools and the user's mcp servers, returns (tool name -> client, tool schemas)."""
     mcp_client_index = {}
-    mcp_client_builtin = builtin_mcp_client.BuiltinMCPClient(BUILTIN_TOOLS)
-    try:
-        # add builtin tools to index
-        tools = await mcp_client_builtin.connect_to_server()
-        for tool in tools:
-            mcp_client_index[tool["function"]["name"]] = mcp_client_builtin
-
-        # add async context for user defined tools
-            async with AsyncExitStack() as stack:
-                if len(config.user_mcp_servers) > 0:
-                    for server_config in config.user_mcp_servers:
-                        # construct client
-                        client = mcp_client.MCPClient()
+    mcp_client_builtin = builtin_mcp_client.BuiltinMCPClient(builtin_tools(config), worker_pool)
+
+    # add builtin tools to index
+    tools = await mcp_client_builtin.connect_to_server()
+    for tool in tools:
+        mcp_client_index[tool["function"]["name"]] = mcp_client_builtin
+
+    # add async context for user defined tools
+    clients = []
+    for server_config in config.user_mcp_servers:
+        # construct client
+        client = mcp_client.MCPClient()
+        client.on_catalog_change = catalog_updater(client, tools, mcp_client_index)
+        clients.append(client)
+
+        # push exit call to stack so we can cleanup later
+        stack.push_async_callback(client.__aexit__, None, None, None)
+
+    # servers start concurrently, those with a cached catalog do not wait for their handshake
+    results = await asyncio.gather(
+        *(client.start(server_config, config.lazy_mcp_servers) for client, server_config in zip(clients, config.user_mcp_servers)),
+        return_exceptions=True,
+    )
+    for client, server_config, server_tools in zip(clients, config.user_mcp_servers, results):
+        if isinstance(server_tools, Exception):
+            print(f"could not connect to mcp server {server_config}: {server_tools}")
+            continue
+
+        # map each tool to its respective client
+        for tool in server_tools:
+            mcp_client_index[tool["function"]["name"]] = client
+
+        # add tools to available tools list
+        tools.extend(server_tools)
+
+    # sub_agent_launch runs sub-agents on the same clients
+    sub_agent.register_launcher(SubAgentPool(mcp_client_index, tools, config).launch)
+    return mcp_client_index, tools
+
+async def shutdown(worker_pool: WorkerPool):
+    # explicitly cancel all tasks
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    worker_pool.shutdown()
+    # grep's search pools, if a search started them
+    grep = sys.modules.get("codingagent.packages.tools.grep")
+    if grep is not None:
+        grep.shutdown()
+    # a local model saves its KV cache for the next session
+    await close_backends()
+
+def configure_tracing(config: Config):
+    tracer.configure(config.tracing, config.trace_path, config.trace_max_bytes, config.trace_backups)
 
-                        # setup
-                        server_tools = await client.connect_to_server(server_config)
-
-                        # map each tool to its respective client
-                        for tool in server_tools:
-                            mcp_client_index[tool["function"]["name"]] = client
-
-                        # add tools to available tools list
-                        tools.extend(server_tools)
-
-                        # push exit call to stack so we can cleanup later
-                        stack.push_async_callback(client.__aexit__, None, None, None)
+async def main(config: Config):
+    embedder.configure(config.embedding_api_url)
+    configure_tracing(config)
+    worker_pool = build_worker_pool(config)
+    try:
+        async with AsyncExitStack() as stack:
+            mcp_client_index, tools = await connect_tools(config, stack, worker_pool)
 
-                # construct app
-                app = App(mcp_client_index, tools, config) 
+            # construct app
+            app = App(mcp_client_index, tools, config) 
 
-                # initialise app
-                await app.init()
+            # initialise app
+            await app.init()
 
-                # run it
-                await app.run()
+            # run it
+            await app.run()
 
-                # for client in mcp_client_index.values():
-                #     await client.cleanup()
+            # for client in mcp_client_index.values():
+            #     await client.cleanup()
 
-                raise KeyboardInterrupt
+            raise KeyboardInterrupt
     except ValueError as e:
         print("Something went wrong: ", e)
     except (KeyboardInterrupt, asyncio.CancelledError):
         print("Shutdown requested")
     finally:
-        # explicitly cancel all tasks
-        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
-        for task in tasks:
-            task.cancel()
-        await asyncio.gather(*tasks, return_exceptions=True)
+        await shutdown(worker_pool)
         print("Bye!")
     pass
 
-if __name__ == "__main__":
+def run():
     try:
         homePath = Path.home()    
 
@@ -266,8 +566,17 @@ if __name__ == "__main__":
         parser.add_argument("-c", "--config", help="Absolute path to config file", default=f"{homePath}/.codingagent_config")
         parser.add_argument("-add", "--add-mcp", help="Add mcp command", default=False, action="store_true")
         parser.add_argument("-inf-url", "--inference-url", help="API URL where model is hosted", default="")
+        parser.add_argument("--profile-startup", help="Report the time spent per import during startup and exit", default=False, action="store_true")
+        parser.add_argument("--batch", help="Run the tasks of a JSONL file without prompting, one agent per task", default="")
+        parser.add_argument("--batch-output", help="JSONL file the batch results are appended to (default: <tasks>.results.jsonl)", default="")
+        parser.add_argument("--batch-concurrency", help="Batch tasks running at once (default: batch_concurrency from the config)", type=int, default=0)
+        parser.add_argument("--batch-worker", help=argparse.SUPPRESS, default="")
         args = parser.parse_args()
 
+        if args.profile_startup:
+            from codingagent.startup_profile import profile_startup
+            raise SystemExit(profile_startup(preload_modules))
+
         # load config
         config = load_config(config_path=args.config, args=ConfigArgs(
             config_path=args.config,
@@ -275,9 +584,22 @@ if __name__ == "__main__":
             inference_url=args.inference_url,
         ))
 
+        if args.batch_worker:
+            from codingagent.batch import run_worker
+            raise SystemExit(asyncio.run(run_worker(config, args.batch_worker)))
+
+        if args.batch:
+            from codingagent.batch import run_batch
+            output = args.batch_output or os.path.splitext(args.batch)[0] + ".results.jsonl"
+            concurrency = args.batch_concurrency or config.batch_concurrency
+            raise SystemExit(asyncio.run(run_batch(args.batch, output, args.config, config, concurrency)))
+
         asyncio.run(main(config))
     except KeyboardInterrupt:
         pass
     except Exception as e:
         print("something went wrong: ", e)
-        pass
\ No newline at end of file
+        pass
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,145 @@
+import json
+from typing import Awaitable, Callable
+
+from codingagent.packages.context.read_snapshots import DELTA_MARKER
+from codingagent.packages.context.tokens import message_tokens, set_content
+
+# share of the budget kept verbatim when older turns are summarized
+KEEP_RECENT_RATIO = 0.5
+
+# tool output included per message when building the transcript that gets summarized
+TRANSCRIPT_TOOL_LIMIT = 2000
+
+ELIDED_TOOL_RESULT = "[tool result elided to save context]"
+
+SUMMARY_ACKNOWLEDGEMENT = "Understood, I will continue from this summary."
+
+class ContextManager:
+    """Keeps the chat history sent to the model within a token budget.
+
+    Compaction happens in three stages, each only if the previous one did not free enough:
+    1. results of read-only tool calls that were repeated later with the same arguments are elided
+    2. older turns are replaced by a model-written summary, keeping the most recent turns verbatim
+    3. remaining tool results are elided, oldest first
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        summarize: Callable[[str], Awaitable[str]],
+        is_read_only: Callable[[str], bool],
+    ):
+        self.budget = budget
+        self.summarize = summarize
+        self.is_read_only = is_read_only
+
+    def total_tokens(self, messages: list[dict]) -> int:
+        return sum(message_tokens(message) for message in messages)
+
+    def needs_compaction(self, messages: list[dict]) -> bool:
+        return self.total_tokens(messages) > self.budget
+
+    def stale_key(self, message: dict):
+        """Key identifying tool results that a later identical read-only call supersedes."""
+        if message.get("role") != "tool" or "tool_args" not in message:
+            return None
+        if not self.is_read_only(message["tool_name"]):
+            return None
+        # a delta read only adds to the earlier read of the file, it does not replace it
+        if (message.get("content") or "").startswith(DELTA_MARKER):
+            return None
+        return message["tool_name"], json.dumps(message["tool_args"], sort_keys=True, default=str)
+
+    def elide_stale(self, messages: list[dict]) -> int:
+        """Elides superseded tool results and returns the number of tokens freed."""
+        freed = 0
+        seen = set()
+        for message in reversed(messages):
+            key = self.stale_key(message)
+            if key is None:
+                continue
+            if key in seen and not message.get("elided"):
+                before = message_tokens(message)
+                set_content(message, f"[superseded by a later {message['tool_name']} call with the same arguments]")
+                message["elided"] = True
+                freed += before - message_tokens(message)
+            seen.add(key)
+        return freed
+
+    def elide_oldest(self, messages: list[dict], tokens_needed: int) -> int:
+        """Elides tool results from the oldest onwards until `tokens_needed` tokens are freed."""
+        freed = 0
+        for message in messages:
+            if freed >= tokens_needed:
+                break
+            if message.get("role") != "tool" or message.get("elided"):
+                continue
+            before = message_tokens(message)
+            set_content(message, ELIDED_TOOL_RESULT)
+            message["elided"] = True
+            freed += before - message_tokens(message)
+        return freed
+
+    def summary_cut(self, messages: list[dict]) -> int:
+        """Index of the oldest user message such that everything from it on fits the recent share of the budget.
+
+        Cutting at a user message keeps assistant turns together with their tool results.
+        Returns 0 when there is nothing that can be summarized.
+        """
+        keep = self.budget * KEEP_RECENT_RATIO
+        tokens = 0
+        cut = 0
+        for i in range(len(messages) - 1, 0, -1):
+            tokens += message_tokens(messages[i])
+            if tokens > keep:
+                break
+            if messages[i].get("role") == "user":
+                cut = i
+
+        # the oldest turn itself is too big to keep, summarize everything but the latest turn
+        if cut == 0:
+            for i in range(len(messages) - 1, 0, -1):
+                if messages[i].get("role") == "user":
+                    cut = i
+                    break
+
+        # nothing older than the latest turn (index 0 is the system prompt)
+        return cut if cut > 1 else 0
+
+    def transcript(self, messages: list[dict]) -> str:
+        lines = []
+        for message in messages:
+            content = message.get("content") or ""
+            if message.get("role") == "tool":
+                if len(content) > TRANSCRIPT_TOOL_LIMIT:
+                    content = content[:TRANSCRIPT_TOOL_LIMIT] + "\n[...]"
+                lines.append(f"tool ({message.get('tool_name')}): {content}")
+            else:
+                lines.append(f"{message.get('role')}: {content}")
+        return "\n\n".join(lines)
+
+    async def compact(self, messages: list[dict]) -> bool:
+        """Compacts `messages` in place if they exceed the budget, returns whether anything changed."""
+        total = self.total_tokens(messages)
+        if total <= self.budget:
+            return False
+
+        total -= self.elide_stale(messages)
+        if total <= self.budget:
+            return True
+
+        cut = self.summary_cut(messages)
+        if cut > 0:
+            summary = await self.summarize(self.transcript(messages[1:cut]))
+            # acknowledged by an assistant turn, so the summary and the next query do not read as
+            # two user turns in a row and the model answers the query rather than the summary
+            messages[1:cut] = [
+                {"role": "user", "content": f"[Summary of the earlier conversation]\n{summary.strip()}"},
+                {"role": "assistant", "content": SUMMARY_ACKNOWLEDGEMENT},
+            ]
+            total = self.total_tokens(messages)
+            if total <= self.budget:
+                return True
+
+        self.elide_oldest(messages, total - self.budget)
+        return True
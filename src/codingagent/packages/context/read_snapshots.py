@@ -0,0 +1,67 @@
+import os
+from contextvars import ContextVar
+from difflib import SequenceMatcher
+from typing import Optional
+
+# unchanged lines shown around every change in a delta read
+CONTEXT_LINES = 3
+
+# prefix of read_file results that only make sense next to an earlier read of the same file
+DELTA_MARKER = "[delta read]"
+
+class ReadSnapshots:
+    """The lines read_file last returned for each file (and line window) in one conversation.
+
+    Lets a re-read return only what changed. The snapshots describe what the model has in its
+    history, so they have to be forgotten whenever that history loses the earlier read.
+
+    It also holds the (mtime, size, inode) of every file the conversation read or wrote, which
+    the file cache checks before write_tool and edit_tool change a file. Those are kept when the
+    snapshots are cleared, the model has seen the content even if it no longer has it verbatim.
+    """
+
+    def __init__(self):
+        self.snapshots: dict[str, tuple[int, int, list[str]]] = {}
+        self.read_keys: dict[str, tuple[int, int, int]] = {}
+
+    def swap(self, path: str, offset: int, limit: int, lines: list[str]) -> Optional[list[str]]:
+        """Records `lines` as the latest read and returns the previous read of the same window, if any."""
+        path = os.path.abspath(path)
+        previous = self.snapshots.get(path)
+        self.snapshots[path] = (offset, limit, lines)
+        if previous is None or previous[:2] != (offset, limit):
+            return None
+        return previous[2]
+
+    def forget(self, path: Optional[str]):
+        if path:
+            self.snapshots.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        self.snapshots.clear()
+
+# set by the App for the conversation it runs, tools read it through current_snapshots
+_current: ContextVar[Optional[ReadSnapshots]] = ContextVar("read_snapshots", default=None)
+
+def use_snapshots(snapshots: ReadSnapshots):
+    _current.set(snapshots)
+
+def current_snapshots() -> Optional[ReadSnapshots]:
+    return _current.get()
+
+def unified_diff(previous: list[str], current: list[str], offset: int) -> list[str]:
+    """Unified diff hunks between two reads of a window starting at line `offset` (0 based)."""
+    output = []
+    matcher = SequenceMatcher(None, previous, current, autojunk=False)
+    for group in matcher.get_grouped_opcodes(CONTEXT_LINES):
+        first, last = group[0], group[-1]
+        output.append(
+            f"@@ -{offset + first[1] + 1},{last[2] - first[1]} +{offset + first[3] + 1},{last[4] - first[3]} @@"
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                output.extend(" " + line for line in previous[i1:i2])
+                continue
+            output.extend("-" + line for line in previous[i1:i2])
+            output.extend("+" + line for line in current[j1:j2])
+    return output
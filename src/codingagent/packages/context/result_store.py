@@ -0,0 +1,178 @@
+import atexit
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from codingagent.packages.fs.line_index import LineIndex
+
+# characters a tool result may have before it is stored and only a preview is sent to the model
+INLINE_LIMIT = 8000
+
+# characters of the start and end of a stored result included in its preview
+PREVIEW_HEAD = 2500
+PREVIEW_TAIL = 1500
+
+# bytes of stored results kept in memory, older results are spilled to disk beyond that
+MEMORY_BYTES = 64 * 1024 * 1024
+
+# tools that page their own output, storing it would only add a level of indirection
+PAGED_TOOLS = {"read_file", "tool_result"}
+
+class StoredResult:
+    __slots__ = ("handle", "tool_name", "data", "path", "size", "index")
+
+    def __init__(self, handle: str, tool_name: str, data: bytes):
+        self.handle = handle
+        self.tool_name = tool_name
+        self.data: Optional[bytes] = data
+        self.path: Optional[str] = None
+        self.size = len(data)
+        self.index = LineIndex(self.size)
+
+def _head(text: str, limit: int) -> str:
+    head = text[:limit]
+    cut = head.rfind("\n")
+    return head[:cut] if cut > 0 else head
+
+def _tail(text: str, limit: int) -> str:
+    tail = text[-limit:]
+    cut = tail.find("\n")
+    return tail[cut + 1:] if 0 <= cut < len(tail) - 1 else tail
+
+class ResultStore:
+    """Keeps large tool results out of the chat history.
+
+    Results over the inline limit are stored under a handle and replaced by a head and tail
+    preview; the tool_result tool pages or searches the full output. Results live in memory
+    up to MEMORY_BYTES, older ones are spilled to files that are removed on exit.
+    """
+
+    def __init__(self, memory_bytes: int = MEMORY_BYTES):
+        self.memory_bytes = memory_bytes
+        self.results: OrderedDict[str, StoredResult] = OrderedDict()
+        self.in_memory = 0
+        self.spill_dir: Optional[str] = None
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def compact(self, tool_name: str, text: str, inline_limit: int = INLINE_LIMIT) -> str:
+        """Returns `text` if it is small enough to inline, otherwise stores it and returns a preview."""
+        if len(text) <= inline_limit or tool_name in PAGED_TOOLS:
+            return text
+
+        result = self.put(tool_name, text)
+        lines = text.count("\n") + (0 if text.endswith("\n") else 1)
+        head = _head(text, PREVIEW_HEAD)
+        tail = _tail(text, PREVIEW_TAIL)
+        omitted = lines - (head.count("\n") + 1) - (tail.count("\n") + 1)
+        return (
+            f"[output of {tool_name} stored as {result.handle}: {lines} lines, {len(text)} characters. "
+            f"Use the tool_result tool with handle \"{result.handle}\" to page through it (offset, limit) "
+            f"or search it (pattern) instead of calling {tool_name} again]\n"
+            f"{head}\n"
+            f"[... {max(omitted, 0)} lines omitted ...]\n"
+            f"{tail}"
+        )
+
+    def put(self, tool_name: str, text: str) -> StoredResult:
+        data = text.encode("utf-8")
+        with self._lock:
+            self._counter += 1
+            result = StoredResult(f"result-{self._counter}", tool_name, data)
+            self.results[result.handle] = result
+            self.in_memory += result.size
+            self._spill()
+        return result
+
+    def _spill(self):
+        for result in self.results.values():
+            if self.in_memory <= self.memory_bytes:
+                break
+            if result.data is None:
+                continue
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix="codingagent-results-")
+                atexit.register(shutil.rmtree, self.spill_dir, True)
+            path = os.path.join(self.spill_dir, result.handle)
+            with open(path, "wb") as f:
+                f.write(result.data)
+            result.path = path
+            result.data = None
+            self.in_memory -= result.size
+
+    def get(self, handle: str) -> StoredResult:
+        with self._lock:
+            result = self.results.get(handle.strip())
+        if result is None:
+            raise ValueError(f"unknown tool result handle: {handle}")
+        return result
+
+    def _read(self, result: StoredResult, callback):
+        # a spilled result is mapped for the duration of one request
+        data = result.data
+        if data is not None:
+            return callback(data)
+        with open(result.path, "rb") as f:
+            if result.size == 0:
+                return callback(b"")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return callback(mm)
+
+    def read_lines(self, handle: str, start: int, count: int) -> tuple[list[str], bool]:
+        """Lines [start, start + count) of a stored result and whether more lines follow."""
+        result = self.get(handle)
+
+        def lines(buffer) -> tuple[list[str], bool]:
+            with self._lock:
+                begin, end, more = result.index.span(buffer, start, count)
+            text = bytes(buffer[begin:end]).decode("utf-8", errors="replace")
+            # only \n ends a line, as in LineIndex and search; splitlines would also split on \r, \x0c and others
+            lines = [line.removesuffix("\r") for line in text.split("\n")]
+            # the span ends right after a newline unless it runs to the end of the result
+            if lines and lines[-1] == "":
+                lines.pop()
+            return lines, more
+
+        return self._read(result, lines)
+
+    def search(self, handle: str, pattern: str, max_matches: int) -> tuple[list[tuple[int, str]], bool]:
+        """(line number, line) of lines matching `pattern` and whether there were more than `max_matches`."""
+        result = self.get(handle)
+        regex = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+
+        def search(buffer) -> tuple[list[tuple[int, str]], bool]:
+            matches = []
+            line_number = 1
+            counted_to = 0
+            position = 0
+            while position <= result.size:
+                match = regex.search(buffer, position)
+                if match is None:
+                    return matches, False
+                # an empty match after the final newline (or in an empty result) is not on a line
+                if match.start() == result.size and (result.size == 0 or buffer[result.size - 1] == ord("\n")):
+                    return matches, False
+                start = buffer.rfind(b"\n", 0, match.start()) + 1
+                end = buffer.find(b"\n", match.start())
+                if end == -1:
+                    end = result.size
+                # as in fs.search, a match running past its line only counts if the pattern also matches within the line
+                if match.end() > end and not regex.search(buffer, start, end):
+                    position = end + 1
+                    continue
+                if len(matches) == max_matches:
+                    return matches, True
+                line_number += buffer[counted_to:start].count(b"\n")
+                counted_to = start
+                matches.append((line_number, bytes(buffer[start:end]).decode("utf-8", errors="replace")))
+                position = end + 1
+            return matches, False
+
+        return self._read(result, search)
+
+result_store = ResultStore()
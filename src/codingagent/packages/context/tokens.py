@@ -0,0 +1,37 @@
+import re
+
+# words, numbers and individual punctuation characters roughly line up with BPE pieces
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# role markers and separators the chat template adds around every message
+MESSAGE_OVERHEAD = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimates how many tokens `text` takes up without loading the model's tokenizer.
+
+    Short words are usually a single token, longer identifiers get split into pieces of roughly
+    four characters. Errs on the side of over-counting, which is the safe side for a budget.
+    """
+    if not text:
+        return 0
+
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        length = match.end() - match.start()
+        tokens += 1 if length <= 4 else (length + 3) // 4
+
+    # runs of indentation and newlines are tokens too
+    return tokens + text.count("\n") // 2
+
+def message_tokens(message: dict) -> int:
+    """Token estimate for a chat message, cached on the message (see `set_content`)."""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+        message["tokens"] = tokens
+    return tokens
+
+def set_content(message: dict, content: str):
+    """Replaces the content of a message and drops its cached token estimate."""
+    message["content"] = content
+    message.pop("tokens", None)
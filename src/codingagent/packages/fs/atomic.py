@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+# read once at import, os.umask can only be queried by setting it which is not thread safe
+_umask = os.umask(0)
+os.umask(_umask)
+
+def atomic_write(path: str, data: bytes):
+    """Writes `data` to `path` through a temporary file in the same directory and a rename.
+
+    Readers see either the old or the new content, never a partially written file. The
+    permissions of an existing file are kept.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        # match what open(path, "w") would create
+        mode = 0o666 & ~_umask
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
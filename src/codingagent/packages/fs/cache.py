@@ -0,0 +1,13 @@
+import os
+
+def cache_dir(*parts: str) -> str:
+    """Directory for caches the agent keeps between runs, created on first use.
+
+    Lives below $XDG_CACHE_HOME (default ~/.cache), CODINGAGENT_CACHE_DIR overrides it.
+    """
+    base = os.environ.get("CODINGAGENT_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "codingagent"
+    )
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,182 @@
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from codingagent.packages.context.read_snapshots import current_snapshots
+from codingagent.packages.fs.line_index import SNIFF_BYTES, LineIndex, is_binary
+
+# total bytes of file content kept in memory
+CACHE_BYTES = 64 << 20
+
+# files larger than this are never held in memory, they are read through mmap instead
+MAX_ENTRY_BYTES = 8 << 20
+
+def stat_key(stat: os.stat_result) -> tuple[int, int, int]:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+class CachedFile:
+    __slots__ = ("key", "content", "index", "binary", "lock")
+
+    def __init__(self, key: tuple[int, int, int], content: Optional[bytes], binary: bool):
+        self.key = key
+        self.content = content
+        self.index = LineIndex(key[1])
+        self.binary = binary
+        self.lock = threading.Lock()
+
+    def nbytes(self) -> int:
+        return (len(self.content) if self.content is not None else 0) + self.index.nbytes()
+
+class FileCache:
+    """Process wide LRU cache of file contents and line indexes shared by the builtin tools.
+
+    Entries are validated against (st_mtime_ns, st_size, st_ino) on every access, so a file
+    changed by anything outside the agent is re-read. The cache also remembers which files
+    were read, which write_tool and edit_tool require before changing a file. That record is
+    kept per conversation (with the conversation's ReadSnapshots), so a file only a sub-agent
+    read does not count as read by its parent.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_BYTES, max_entry_bytes: int = MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # files read outside of any conversation, e.g. by the benchmarks
+        self.read_keys: dict[str, tuple[int, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def _read_keys(self) -> dict[str, tuple[int, int, int]]:
+        snapshots = current_snapshots()
+        return snapshots.read_keys if snapshots is not None else self.read_keys
+
+    def _get(self, path: str, f, stat: os.stat_result) -> CachedFile:
+        key = stat_key(stat)
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                self.entries.move_to_end(path)
+                return entry
+            self.misses += 1
+
+        # load outside the lock so concurrent reads of other files are not blocked
+        if stat.st_size <= self.max_entry_bytes:
+            content = f.read()
+            entry = CachedFile(key, content, is_binary(content[:SNIFF_BYTES]))
+        else:
+            entry = CachedFile(key, None, is_binary(os.pread(f.fileno(), SNIFF_BYTES, 0)))
+
+        with self._lock:
+            self._discard(path)
+            self.entries[path] = entry
+            self.size += entry.nbytes()
+            self._evict()
+        return entry
+
+    def _discard(self, path: str):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= entry.nbytes()
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.size -= entry.nbytes()
+
+    def _with_buffer(self, path: str, fn):
+        """Calls fn(entry, buffer) with the file content, from memory or through mmap for large files."""
+        path = os.path.abspath(path)
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            entry = self._get(path, f, stat)
+            read_keys = self._read_keys()
+            with self._lock:
+                read_keys[path] = entry.key
+
+            if entry.binary:
+                raise ValueError(f"{path} is a binary file and can not be read")
+
+            before = entry.nbytes()
+            with entry.lock:
+                if entry.content is not None:
+                    result = fn(entry, entry.content)
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        result = fn(entry, mm)
+
+            # the line index grows as further lines are requested
+            with self._lock:
+                if self.entries.get(path) is entry:
+                    self.size += entry.nbytes() - before
+                    self._evict()
+            return result
+
+    def read_text(self, path: str) -> str:
+        """Returns the whole file decoded as utf-8 and records it as read."""
+        return self._with_buffer(path, lambda _, buffer: bytes(buffer).decode("utf-8"))
+
+    def read_lines(self, path: str, start: int, count: int) -> tuple[list[str], bool]:
+        """Reads `count` lines starting at the 0-based line `start` and records the file as read.
+
+        Returns the decoded lines (without their newline) and whether the file continues after them.
+        Raises ValueError for binary files.
+        """
+        def page(entry: CachedFile, buffer):
+            begin, end, more = entry.index.span(buffer, start, count)
+            if begin >= end:
+                return [], False
+            return buffer[begin:end].decode("utf-8", errors="replace").split("\n"), more
+
+        lines, more = self._with_buffer(path, page)
+        # the span ends right after a newline unless it runs to the end of an unterminated file
+        if lines and lines[-1] == "":
+            lines.pop()
+        return lines, more
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._discard(os.path.abspath(path))
+
+    def record_write(self, path: str):
+        """Drops the cached content of a file the agent just wrote, it still counts as read."""
+        path = os.path.abspath(path)
+        read_keys = self._read_keys()
+        with self._lock:
+            self._discard(path)
+            try:
+                read_keys[path] = stat_key(os.stat(path))
+            except FileNotFoundError:
+                read_keys.pop(path, None)
+
+    def check_can_modify(self, path: str):
+        """Raises ValueError unless an existing file was read in this conversation and has not changed since."""
+        path = os.path.abspath(path)
+        try:
+            key = stat_key(os.stat(path))
+        except FileNotFoundError:
+            return
+
+        read_keys = self._read_keys()
+        with self._lock:
+            read_key = read_keys.get(path)
+        if read_key is None:
+            raise ValueError(f"{path} has not been read yet, use the read_file tool before changing it")
+        if read_key != key:
+            raise ValueError(f"{path} has been modified since it was last read, read it again before changing it")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.size,
+            }
+
+# cache shared by all builtin tools
+file_cache = FileCache()
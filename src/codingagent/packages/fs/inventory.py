@@ -0,0 +1,305 @@
+import os
+import stat
+import threading
+from typing import Callable, Iterator, Optional
+
+from codingagent.packages.fs.walk import (
+    DEFAULT_IGNORE_DIRS,
+    VIRTUALENV_MARKER,
+    IgnoreFile,
+    ancestor_ignore_files,
+    is_ignored,
+)
+from codingagent.packages.fs.watch import InotifyWatcher, PollingWatcher, inotify_available
+
+FILE = "file"
+DIRECTORY = "dir"
+SYMLINK = "symlink"
+
+class FileRecord:
+    __slots__ = ("path", "size", "mtime", "kind", "ignored")
+
+    def __init__(self, path: str, size: int, mtime: float, kind: str, ignored: bool):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.kind = kind
+        self.ignored = ignored
+
+def record_kind(mode: int) -> str:
+    if stat.S_ISDIR(mode):
+        return DIRECTORY
+    if stat.S_ISLNK(mode):
+        return SYMLINK
+    return FILE
+
+class Inventory:
+    """In-memory listing of every path below `root`, kept fresh by a filesystem watcher.
+
+    Ignored directories (see packages/fs/walk) are recorded but not descended into, so
+    ls still shows them while glob and search tools skip them. Until `ready` is set (the
+    initial scan runs in the background) tools should fall back to the disk.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.records: dict[str, FileRecord] = {}
+        self.children: dict[str, set[str]] = {}
+        self.ignore_chains: dict[str, tuple[IgnoreFile, ...]] = {}
+        self.ready = threading.Event()
+        self.watcher = None
+        self._lock = threading.RLock()
+
+    def start(self):
+        """Scans the tree in a background thread and starts watching it for changes."""
+        threading.Thread(target=self._build, name="inventory-build", daemon=True).start()
+
+    def stop(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+
+    def _build(self):
+        if inotify_available():
+            try:
+                self.watcher = InotifyWatcher(self.update_path, self.rescan)
+            except OSError:
+                self.watcher = PollingWatcher(self.poll)
+        else:
+            self.watcher = PollingWatcher(self.poll)
+
+        self.rescan()
+        self.watcher.start()
+        self.ready.set()
+
+    def rescan(self):
+        chain = ancestor_ignore_files(self.root)
+        st = os.stat(self.root)
+        rebuild = bool(self.records)
+        with self._lock:
+            self.records.clear()
+            self.children.clear()
+            self.ignore_chains.clear()
+            self.records[self.root] = FileRecord(self.root, st.st_size, st.st_mtime, DIRECTORY, False)
+        self._scan(self.root, chain)
+        # after a watcher overflow anything below the root may have changed
+        if rebuild:
+            _notify(self.root)
+
+    def _watch(self, directory: str):
+        try:
+            self.watcher.add(directory)
+        except OSError:
+            # out of inotify watches, keep the inventory fresh by polling instead
+            if not isinstance(self.watcher, PollingWatcher):
+                self.watcher.stop()
+                self.watcher = PollingWatcher(self.poll)
+                self.watcher.start()
+
+    def _scan(self, directory: str, parent_chain: tuple[IgnoreFile, ...]):
+        stack = [(directory, parent_chain)]
+        while stack:
+            directory, chain = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            names = {entry.name for entry in entries}
+            if directory != self.root:
+                if VIRTUALENV_MARKER in names:
+                    with self._lock:
+                        record = self.records.get(directory)
+                        if record is not None:
+                            record.ignored = True
+                    continue
+                if ".gitignore" in names:
+                    ignore_file = IgnoreFile.load(directory)
+                    if ignore_file is not None:
+                        chain = chain + (ignore_file,)
+
+            records = []
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                kind = record_kind(st.st_mode)
+                ignored = (kind == DIRECTORY and entry.name in DEFAULT_IGNORE_DIRS) or (
+                    bool(chain) and is_ignored(entry.path, kind == DIRECTORY, chain)
+                )
+                records.append(FileRecord(entry.path, st.st_size, st.st_mtime, kind, ignored))
+
+            with self._lock:
+                self.ignore_chains[directory] = chain
+                self.children[directory] = names
+                for record in records:
+                    self.records[record.path] = record
+
+            if self.watcher is not None:
+                self._watch(directory)
+            stack.extend((record.path, chain) for record in records if record.kind == DIRECTORY and not record.ignored)
+
+    def _remove(self, path: str):
+        _notify(path)
+        with self._lock:
+            record = self.records.pop(path, None)
+            parent = os.path.dirname(path)
+            if parent in self.children:
+                self.children[parent].discard(os.path.basename(path))
+            if record is None or record.kind != DIRECTORY:
+                return
+
+            prefix = path + os.sep
+            for child in [p for p in self.records if p.startswith(prefix)]:
+                del self.records[child]
+            for directory in [d for d in self.children if d == path or d.startswith(prefix)]:
+                del self.children[directory]
+                self.ignore_chains.pop(directory, None)
+
+    def update_path(self, path: str):
+        """Brings the record for `path` (and a new directory's contents) up to date with the disk."""
+        path = os.path.abspath(path)
+        if path == self.root:
+            return
+        parent = os.path.dirname(path)
+        with self._lock:
+            chain = self.ignore_chains.get(parent)
+        # not below a directory the inventory descends into
+        if chain is None:
+            return
+
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            self._remove(path)
+            return
+
+        name = os.path.basename(path)
+        if name == ".gitignore":
+            # rules changed, rebuild everything below the directory with the new chain
+            self._remove_children(parent)
+            self._scan(parent, self._parent_chain(parent))
+            return
+
+        kind = record_kind(st.st_mode)
+        ignored = (kind == DIRECTORY and name in DEFAULT_IGNORE_DIRS) or (
+            bool(chain) and is_ignored(path, kind == DIRECTORY, chain)
+        )
+        with self._lock:
+            self.records[path] = FileRecord(path, st.st_size, st.st_mtime, kind, ignored)
+            self.children.setdefault(parent, set()).add(name)
+            scanned = path in self.children
+
+        if kind == DIRECTORY and not ignored and not scanned:
+            self._scan(path, chain)
+        if not ignored:
+            _notify(path)
+
+    def _remove_children(self, directory: str):
+        with self._lock:
+            for name in list(self.children.get(directory, ())):
+                self._remove(os.path.join(directory, name))
+
+    def _parent_chain(self, directory: str) -> tuple[IgnoreFile, ...]:
+        if directory == self.root:
+            return ancestor_ignore_files(self.root)
+        with self._lock:
+            return self.ignore_chains.get(os.path.dirname(directory), ())
+
+    def poll(self, full: bool):
+        """Polling fallback: rescans directories whose mtime changed, and re-stats every file when `full`."""
+        with self._lock:
+            directories = list(self.children)
+        for directory in directories:
+            try:
+                mtime = os.stat(directory).st_mtime
+            except FileNotFoundError:
+                self._remove(directory)
+                continue
+            with self._lock:
+                record = self.records.get(directory)
+                names = set(self.children.get(directory, ()))
+            if record is not None and record.mtime == mtime and not full:
+                continue
+            if record is not None:
+                record.mtime = mtime
+
+            try:
+                current = set(os.listdir(directory))
+            except OSError:
+                continue
+            for name in names - current:
+                self._remove(os.path.join(directory, name))
+            for name in (current - names) if not full else current:
+                self.update_path(os.path.join(directory, name))
+
+    def covers(self, path: str) -> bool:
+        """Whether `path` lies in the part of the tree the inventory tracks."""
+        path = os.path.abspath(path)
+        if not self.ready.is_set():
+            return False
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return False
+        with self._lock:
+            return path == self.root or path in self.children or (
+                path in self.records and os.path.dirname(path) in self.children and self.records[path].kind != DIRECTORY
+            )
+
+    def is_directory(self, path: str) -> bool:
+        with self._lock:
+            return os.path.abspath(path) in self.children
+
+    def listdir(self, directory: str) -> list[FileRecord]:
+        directory = os.path.abspath(directory)
+        with self._lock:
+            names = sorted(self.children.get(directory, ()))
+            return [self.records[os.path.join(directory, name)] for name in names if os.path.join(directory, name) in self.records]
+
+    def files(self, directory: str) -> Iterator[FileRecord]:
+        """Non-ignored files below `directory`, from a snapshot taken when called."""
+        directory = os.path.abspath(directory)
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self._lock:
+            if directory in self.records and self.records[directory].kind != DIRECTORY:
+                records = [self.records[directory]]
+            else:
+                records = [
+                    record for path, record in self.records.items()
+                    if record.kind != DIRECTORY and not record.ignored and path.startswith(prefix)
+                    and os.path.dirname(path) in self.children
+                ]
+        return iter(records)
+
+_inventory: Optional[Inventory] = None
+
+# called with the path of every file or directory that changed, from the watcher thread
+_listeners: list[Callable[[str], None]] = []
+
+def add_listener(listener: Callable[[str], None]):
+    """Registers `listener` to be told about changes below the inventory root, see _notify."""
+    _listeners.append(listener)
+
+def _notify(path: str):
+    for listener in _listeners:
+        listener(path)
+
+def start(root: str) -> Inventory:
+    """Starts the process wide inventory for `root`, replacing a previous one."""
+    global _inventory
+    if _inventory is not None:
+        _inventory.stop()
+    _inventory = Inventory(root)
+    _inventory.start()
+    return _inventory
+
+def covering(path: str) -> Optional[Inventory]:
+    """The active inventory if it is ready and tracks `path`, otherwise None (use the disk)."""
+    if _inventory is not None and _inventory.covers(path):
+        return _inventory
+    return None
+
+def refresh_path(path: str):
+    """Updates the inventory right away after a tool changed `path`, ahead of the watcher."""
+    if _inventory is not None and _inventory.ready.is_set():
+        _inventory.update_path(path)
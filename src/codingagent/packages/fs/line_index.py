@@ -0,0 +1,59 @@
+from array import array
+from itertools import accumulate, repeat
+from operator import add
+
+# bytes scanned for newlines per step when extending an index
+SCAN_BLOCK = 1 << 20
+
+# bytes looked at to decide whether a file is binary
+SNIFF_BYTES = 8192
+
+# signatures of common binary formats that may not contain a NUL byte early on
+BINARY_SIGNATURES = (
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+    b"%PDF",
+    b"GIF8",
+    b"PK\x03\x04",
+    b"\x7fELF",
+)
+
+class LineIndex:
+    """Byte offsets of the line starts of a file.
+
+    The index is extended lazily: only as much of the file is scanned as the furthest line
+    requested so far, so reading the head of a huge file never scans the rest of it.
+    """
+
+    __slots__ = ("size", "offsets", "scanned")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.offsets = array("Q", [0])
+        self.scanned = 0
+
+    def extend_to(self, buffer, line: int):
+        """Scans until the start offset of `line` is known or the whole file has been scanned."""
+        while len(self.offsets) <= line and self.scanned < self.size:
+            block = buffer[self.scanned:self.scanned + SCAN_BLOCK]
+            # every line in the block but the last (which may continue in the next block) ends with a newline
+            lengths = map(len, block.split(b"\n")[:-1])
+            starts = accumulate(map(add, lengths, repeat(1)), initial=self.scanned)
+            next(starts)
+            self.offsets.extend(starts)
+            self.scanned += len(block)
+
+    def span(self, buffer, start: int, count: int) -> tuple[int, int, bool]:
+        """Byte range covering lines [start, start + count) and whether more lines follow it."""
+        end_line = start + count
+        self.extend_to(buffer, end_line)
+
+        begin = self.offsets[start] if start < len(self.offsets) else self.size
+        end = self.offsets[end_line] if end_line < len(self.offsets) else self.size
+        return begin, end, end < self.size
+
+    def nbytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets)
+
+def is_binary(head: bytes) -> bool:
+    return b"\x00" in head or head.startswith(BINARY_SIGNATURES)
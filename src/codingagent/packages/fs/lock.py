@@ -0,0 +1,18 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+@contextmanager
+def file_lock(path: str):
+    """Holds an exclusive lock on `path` (created if missing) for the duration of the block.
+
+    Serializes writers of files shared by several agent processes, like the caches of concurrent
+    sessions or batch workers. The lock is released when the process exits, even if it crashes.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # closing the descriptor releases the lock
+        os.close(fd)
@@ -0,0 +1,121 @@
+import mmap
+import os
+import re
+from functools import lru_cache
+
+from codingagent.packages.fs.line_index import SNIFF_BYTES, is_binary
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern: str, ignore_case: bool) -> re.Pattern:
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(pattern.encode("utf-8"), flags)
+
+def _line(buffer, start: int, end: int) -> str:
+    return buffer[start:end].decode("utf-8", errors="replace").rstrip("\r")
+
+def search_file(path: str, display_path: str, pattern: str, ignore_case: bool, context: int, max_matches: int) -> tuple[list[tuple[str, bool]], int]:
+    """Searches one file and returns grep style (line, is match) pairs plus the number of matching lines.
+
+    Matching lines are formatted as `path:line:text`, context lines as `path-line-text` and
+    non-adjacent groups are separated by `--`. Stops after `max_matches` matching lines.
+    The pattern is matched line by line like grep does. Binary and unreadable files are skipped.
+    """
+    regex = compile_pattern(pattern, ignore_case)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return [], 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if is_binary(mm[:SNIFF_BYTES]):
+                    return [], 0
+                return _search(mm, display_path, regex, context, max_matches)
+    except (OSError, ValueError):
+        return [], 0
+
+def _search(mm: mmap.mmap, display_path: str, regex: re.Pattern, context: int, max_matches: int) -> tuple[list[tuple[str, bool]], int]:
+    size = len(mm)
+    output = []
+    matches = 0
+
+    # line number bookkeeping, newlines are only counted once between matches
+    counted_to = 0
+    line_number = 1
+    last_emitted = 0
+
+    position = 0
+    while matches < max_matches and position <= size:
+        match = regex.search(mm, position)
+        if match is None:
+            break
+        # an empty match after the final newline is not on a line
+        if match.start() == size and mm[size - 1] == ord("\n"):
+            break
+
+        start = mm.rfind(b"\n", 0, match.start()) + 1
+        end = mm.find(b"\n", match.start())
+        if end == -1:
+            end = size
+
+        # the search runs over the whole file, a match running past its line (through \s or [^x])
+        # only counts if the pattern also matches within the line
+        if match.end() > end and not regex.search(mm, start, end):
+            position = end + 1
+            continue
+
+        line_number += mm[counted_to:start].count(b"\n")
+        counted_to = start
+        matches += 1
+
+        # context before the match, without repeating lines that were already emitted
+        before = []
+        line_start = start
+        for offset in range(1, context + 1):
+            if line_start == 0 or line_number - offset <= last_emitted:
+                break
+            previous_start = mm.rfind(b"\n", 0, line_start - 1) + 1
+            before.append((line_number - offset, previous_start, line_start - 1))
+            line_start = previous_start
+
+        first_line = before[-1][0] if before else line_number
+        if context and output and first_line > last_emitted + 1:
+            output.append(("--", False))
+        for number, line_begin, line_end in reversed(before):
+            output.append((f"{display_path}-{number}-{_line(mm, line_begin, line_end)}", False))
+
+        output.append((f"{display_path}:{line_number}:{_line(mm, start, end)}", True))
+        last_emitted = line_number
+
+        # context after the match, stopping early at the next match so it is reported as one
+        line_end = end
+        for offset in range(1, context + 1):
+            if line_end >= size:
+                break
+            next_start = line_end + 1
+            next_end = mm.find(b"\n", next_start)
+            if next_end == -1:
+                next_end = size
+            if next_start >= size or regex.search(mm[next_start:next_end]):
+                break
+            output.append((f"{display_path}-{line_number + offset}-{_line(mm, next_start, next_end)}", False))
+            last_emitted = line_number + offset
+            line_end = next_end
+
+        # continue after the matching line so every line is reported once
+        position = end + 1
+
+    return output, matches
+
+def search_files(files: list[tuple[str, str]], pattern: str, ignore_case: bool, context: int, max_matches: int) -> tuple[list[tuple[str, bool]], int]:
+    """Searches a batch of (path, display path) pairs, the unit of work handed to pool workers."""
+    output = []
+    matches = 0
+    for path, display_path in files:
+        lines, count = search_file(path, display_path, pattern, ignore_case, context, max_matches - matches)
+        if count:
+            if output and context:
+                output.append(("--", False))
+            output.extend(lines)
+            matches += count
+            if matches >= max_matches:
+                break
+    return output, matches
@@ -0,0 +1,202 @@
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Iterator, Optional
+
+# directories that are never worth descending into, whatever the ignore files say
+DEFAULT_IGNORE_DIRS = frozenset({
+    ".git", ".hg", ".svn",
+    "node_modules", "target",
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox",
+    ".venv", "venv",
+})
+
+# a directory containing this file is a virtualenv, whatever it is called
+VIRTUALENV_MARKER = "pyvenv.cfg"
+
+GLOB_SPECIAL = re.compile(r"[*?\[]")
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> re.Pattern:
+    """Compiles a glob pattern matched against '/' separated relative paths.
+
+    `**` matches any number of directories, `*` and `?` never match a '/'.
+    """
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            regex.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            regex.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            regex.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(regex), re.DOTALL)
+
+def split_glob(pattern: str) -> tuple[str, str, Optional[int]]:
+    """Splits a glob into its literal leading directories, the remaining pattern and the walk depth it needs.
+
+    `src/app/**/*.ts` becomes ("src/app", "**/*.ts", None) and `src/*.py` becomes ("src", "*.py", 1),
+    so only the part of the tree that can possibly match is walked.
+    """
+    segments = pattern.strip("/").split("/")
+    literal = []
+    while len(segments) > 1 and not GLOB_SPECIAL.search(segments[0]):
+        literal.append(segments.pop(0))
+    depth = None if any("**" in segment for segment in segments) else len(segments)
+    return "/".join(literal), "/".join(segments), depth
+
+class IgnoreRule:
+    __slots__ = ("regex", "negate", "dir_only")
+
+    def __init__(self, regex: re.Pattern, negate: bool, dir_only: bool):
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+def parse_gitignore(text: str) -> list[IgnoreRule]:
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        line = line.replace("\\#", "#").replace("\\!", "!")
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        # patterns with a slash are relative to the ignore file, others match at any depth
+        if "/" in line:
+            pattern = line.lstrip("/")
+        else:
+            pattern = "**/" + line
+        rules.append(IgnoreRule(compile_glob(pattern), negate, dir_only))
+    return rules
+
+class IgnoreFile:
+    __slots__ = ("base", "rules")
+
+    def __init__(self, base: str, rules: list[IgnoreRule]):
+        self.base = base
+        self.rules = rules
+
+    @staticmethod
+    def load(directory: str) -> Optional["IgnoreFile"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", errors="replace") as f:
+                rules = parse_gitignore(f.read())
+        except OSError:
+            return None
+        return IgnoreFile(directory, rules) if rules else None
+
+def is_ignored(path: str, is_dir: bool, ignore_files: tuple[IgnoreFile, ...]) -> bool:
+    """Applies ignore files from the outermost to the innermost, the last matching rule wins."""
+    ignored = False
+    for ignore_file in ignore_files:
+        relative = path[len(ignore_file.base) + 1:]
+        for rule in ignore_file.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.fullmatch(relative):
+                ignored = not rule.negate
+    return ignored
+
+def ancestor_ignore_files(directory: str) -> tuple[IgnoreFile, ...]:
+    """Ignore files of the directories between the enclosing git repository root and `directory`."""
+    chain = []
+    current = directory
+    while True:
+        chain.append(current)
+        if os.path.isdir(os.path.join(current, ".git")):
+            break
+        parent = os.path.dirname(current)
+        if parent == current:
+            # not inside a repository, only the directory's own ignore file applies
+            chain = [directory]
+            break
+        current = parent
+
+    loaded = (IgnoreFile.load(path) for path in reversed(chain))
+    return tuple(ignore_file for ignore_file in loaded if ignore_file is not None)
+
+def walk(
+    root: str,
+    max_depth: Optional[int] = None,
+    include_dirs: bool = False,
+    respect_ignore: bool = True,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Iterator[tuple[str, os.DirEntry]]:
+    """Yields (path relative to root, entry) for the files below `root`, using os.scandir.
+
+    Directories from DEFAULT_IGNORE_DIRS, virtualenvs and anything excluded by .gitignore files
+    (including those of enclosing directories up to the repository root) are pruned without
+    being listed. Walking stops as soon as `should_stop` returns True.
+    """
+    root = os.path.abspath(root)
+    ignore_files = ancestor_ignore_files(root) if respect_ignore else ()
+    stack = [(root, "", 1, ignore_files)]
+
+    while stack:
+        if should_stop is not None and should_stop():
+            return
+
+        directory, relative, depth, ignore_files = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        if respect_ignore and depth > 1:
+            if any(entry.name == VIRTUALENV_MARKER for entry in entries):
+                continue
+            ignore_file = IgnoreFile.load(directory) if any(entry.name == ".gitignore" for entry in entries) else None
+            if ignore_file is not None:
+                ignore_files = ignore_files + (ignore_file,)
+
+        subdirectories = []
+        for entry in entries:
+            path = f"{relative}/{entry.name}" if relative else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+
+            if respect_ignore:
+                if is_dir and entry.name in DEFAULT_IGNORE_DIRS:
+                    continue
+                if ignore_files and is_ignored(entry.path, is_dir, ignore_files):
+                    continue
+
+            if is_dir:
+                if include_dirs:
+                    yield path, entry
+                if max_depth is None or depth < max_depth:
+                    subdirectories.append((entry.path, path, depth + 1, ignore_files))
+            else:
+                yield path, entry
+
+        # pop in listing order
+        stack.extend(reversed(subdirectories))
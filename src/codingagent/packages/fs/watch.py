@@ -0,0 +1,129 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# seconds between checks of directory mtimes when polling
+POLL_INTERVAL = 2
+
+# seconds between re-stats of every file when polling, catches in-place edits
+FULL_RESCAN_INTERVAL = 30
+
+class InotifyWatcher:
+    """Feeds inotify events for every watched directory into `on_change(path)` from a background thread.
+
+    `on_overflow()` is called when the kernel queue overflowed and events were lost.
+    """
+
+    def __init__(self, on_change, on_overflow):
+        self.on_change = on_change
+        self.on_overflow = on_overflow
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories: dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inventory-watch", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def add(self, directory: str):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            # ENOSPC means fs.inotify.max_user_watches was reached
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.directories[wd] = directory
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                ready, _, _ = select.select([self.fd], [], [], 1)
+                if not ready:
+                    continue
+                try:
+                    data = os.read(self.fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._dispatch(data)
+        finally:
+            os.close(self.fd)
+
+    def _dispatch(self, data: bytes):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self.on_overflow()
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            self.on_change(os.path.join(directory, os.fsdecode(name)) if name else directory)
+
+class PollingWatcher:
+    """Fallback for platforms without inotify, periodically asks the inventory to look for changes."""
+
+    def __init__(self, poll):
+        self.poll = poll
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inventory-poll", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def add(self, directory: str):
+        pass
+
+    def _run(self):
+        last_full_rescan = time.monotonic()
+        while not self._stopped.wait(POLL_INTERVAL):
+            full = time.monotonic() - last_full_rescan > FULL_RESCAN_INTERVAL
+            if full:
+                last_full_rescan = time.monotonic()
+            self.poll(full)
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    library = ctypes.util.find_library("c")
+    return library is not None and hasattr(ctypes.CDLL(library), "inotify_init1")
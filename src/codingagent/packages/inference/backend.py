@@ -0,0 +1,87 @@
+import threading
+from typing import TYPE_CHECKING, Any, Optional, Protocol
+
+if TYPE_CHECKING:
+    from codingagent.config import Config
+
+class InferenceBackend(Protocol):
+    """What App needs from a model: Ollama's chat call.
+
+    With `stream` the awaited call returns an async iterator of ollama ChatResponse parts, the
+    last one with `done` set and the token counts and durations; without it a single
+    ChatResponse. Backends that are not Ollama produce the same types.
+    """
+
+    async def chat(
+        self,
+        model: str,
+        messages: list[dict],
+        stream: bool = False,
+        think: bool = False,
+        tools: Optional[list] = None,
+        options: Optional[dict[str, Any]] = None,
+    ) -> Any: ...
+
+    def close(self): ...
+
+class OllamaBackend:
+    """Sends requests to the Ollama compatible server at `host`."""
+
+    def __init__(self, host: str):
+        from codingagent.packages.inference.pool import ollama_client
+        self.client = ollama_client(host)
+
+    async def chat(self, model, messages, stream=False, think=False, tools=None, options=None):
+        return await self.client.chat(model, messages=messages, stream=stream, think=think, tools=tools, options=options)
+
+    def close(self):
+        pass
+
+BACKENDS = ("ollama", "llama_cpp")
+
+# backends holding a model or server state are shared by the agent and its sub-agents
+_shared: dict[str, Any] = {}
+_shared_lock = threading.Lock()
+
+def inference_urls(config: "Config") -> list[str]:
+    urls = [config.inference_api_url] if config.inference_api_url else []
+    return urls + [url for url in config.inference_api_urls if url not in urls]
+
+def create_backend(config: "Config") -> InferenceBackend:
+    """The backend of one conversation, App creates one per agent and sub-agent."""
+    if config.inference_backend == "ollama":
+        urls = inference_urls(config)
+        if len(urls) < 2:
+            return OllamaBackend(urls[0] if urls else "")
+
+        from codingagent.packages.inference.pool import InferencePool, PooledBackend
+        key = "pool:" + ",".join(urls)
+        with _shared_lock:
+            pool = _shared.get(key)
+            if pool is None:
+                pool = _shared[key] = InferencePool(urls, config.model_id, config.inference_health_interval)
+        # the pool is shared, the server a conversation sticks to is its own
+        return PooledBackend(pool)
+
+    if config.inference_backend == "llama_cpp":
+        if not config.llama_model_path:
+            raise ValueError("the llama_cpp inference backend needs llama_model_path, the path of a GGUF model")
+        with _shared_lock:
+            backend = _shared.get(config.llama_model_path)
+            if backend is None:
+                from codingagent.packages.inference.llama_cpp_backend import LlamaCppBackend
+                backend = _shared[config.llama_model_path] = LlamaCppBackend(config)
+            return backend
+
+    raise ValueError(f"unknown inference_backend {config.inference_backend!r}, expected one of {', '.join(BACKENDS)}")
+
+async def close_backends():
+    """Lets the shared backends persist their state and close their connections, called on shutdown."""
+    with _shared_lock:
+        backends = list(_shared.values())
+        _shared.clear()
+    for backend in backends:
+        if hasattr(backend, "aclose"):
+            await backend.aclose()
+        else:
+            backend.close()
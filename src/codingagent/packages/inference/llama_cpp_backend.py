@@ -0,0 +1,398 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+
+if TYPE_CHECKING:
+    from codingagent.config import Config
+
+# sampling of the Qwen3 models without thinking, overridden by the request's options
+DEFAULT_SAMPLING = {"temperature": 0.7, "top_p": 0.8, "top_k": 20, "min_p": 0.0, "repeat_penalty": 1.0}
+
+# KV cache entries a prompt has to discard before the current state is kept for later, a
+# sub-agent taking over the context rather than the next turn of the same conversation
+SWITCH_TOKENS = 512
+
+# saved KV states start with this, followed by the length of a JSON header, the header and the raw arrays
+STATE_MAGIC = b"codingagent-llama-state\n"
+STATE_VERSION = 1
+
+TOOL_CALL_OPEN = "<tool_call>"
+TOOL_CALL_CLOSE = "</tool_call>"
+
+class ToolCallParser:
+    """Splits generated text into response text and <tool_call>{"name", "arguments"}</tool_call> blocks.
+
+    This is the format of Qwen and Hermes style chat templates, the one Ollama parses for them.
+    Text that could be the start of an opening tag is held back until it is clear it is not.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.inside = False
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        self.buffer += text
+        events = []
+        while True:
+            if self.inside:
+                end = self.buffer.find(TOOL_CALL_CLOSE)
+                if end < 0:
+                    return events
+                events.append(self._call(self.buffer[:end]))
+                self.buffer = self.buffer[end + len(TOOL_CALL_CLOSE):]
+                self.inside = False
+                continue
+
+            start = self.buffer.find(TOOL_CALL_OPEN)
+            if start >= 0:
+                if start > 0:
+                    events.append(("text", self.buffer[:start]))
+                self.buffer = self.buffer[start + len(TOOL_CALL_OPEN):]
+                self.inside = True
+                continue
+
+            held = 0
+            for length in range(min(len(self.buffer), len(TOOL_CALL_OPEN) - 1), 0, -1):
+                if TOOL_CALL_OPEN.startswith(self.buffer[-length:]):
+                    held = length
+                    break
+            text, self.buffer = self.buffer[:len(self.buffer) - held], self.buffer[len(self.buffer) - held:]
+            if text:
+                events.append(("text", text))
+            return events
+
+    def finish(self) -> list[tuple[str, Any]]:
+        buffer, self.buffer = self.buffer, ""
+        if not buffer:
+            return []
+        if self.inside:
+            # generation stopped before the closing tag
+            return [self._call(buffer)]
+        return [("text", buffer)]
+
+    def _call(self, body: str) -> tuple[str, Any]:
+        try:
+            call = json.loads(body.strip())
+            if not isinstance(call, dict) or "name" not in call:
+                raise ValueError("no tool name")
+        except ValueError:
+            return ("text", TOOL_CALL_OPEN + body + TOOL_CALL_CLOSE)
+        arguments = call.get("arguments") or {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except ValueError:
+                arguments = {}
+        return ("tool", {"name": call["name"], "arguments": arguments})
+
+def write_state(path: str, state, llama_cpp_version: str):
+    """Saves a LlamaState as raw bytes, unlike pickle loading it can not run code from the cache directory."""
+    input_ids, scores = state.input_ids, state.scores
+    header = json.dumps({
+        "version": STATE_VERSION,
+        "llama_cpp": llama_cpp_version,
+        "n_tokens": int(state.n_tokens),
+        "seed": int(state.seed),
+        "input_ids": {"dtype": input_ids.dtype.str, "shape": list(input_ids.shape)},
+        "scores": {"dtype": scores.dtype.str, "shape": list(scores.shape)},
+        "llama_state_size": int(state.llama_state_size),
+    }).encode("utf-8")
+    atomic_write(path, b"".join((
+        STATE_MAGIC,
+        struct.pack("<I", len(header)),
+        header,
+        input_ids.tobytes(),
+        scores.tobytes(),
+        bytes(state.llama_state[:state.llama_state_size]),
+    )))
+
+def read_state(path: str, llama_cpp_version: str):
+    """Loads a state saved by `write_state`, raises ValueError if it is damaged or from another llama.cpp version."""
+    import numpy as np
+    from llama_cpp import LlamaState
+
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(STATE_MAGIC):
+        raise ValueError("not a saved llama state")
+    offset = len(STATE_MAGIC) + 4
+    (length,) = struct.unpack_from("<I", data, len(STATE_MAGIC))
+    header = json.loads(data[offset:offset + length])
+    offset += length
+    if header.get("version") != STATE_VERSION or header.get("llama_cpp") != llama_cpp_version:
+        raise ValueError("saved by another version")
+
+    arrays = {}
+    for name in ("input_ids", "scores"):
+        dtype = np.dtype(header[name]["dtype"])
+        shape = tuple(header[name]["shape"])
+        size = dtype.itemsize * int(np.prod(shape))
+        if offset + size > len(data):
+            raise ValueError("truncated llama state")
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape).copy()
+        offset += size
+    llama_state = data[offset:]
+    if len(llama_state) != header["llama_state_size"]:
+        raise ValueError("truncated llama state")
+    return LlamaState(
+        input_ids=arrays["input_ids"],
+        scores=arrays["scores"],
+        n_tokens=header["n_tokens"],
+        llama_state=llama_state,
+        llama_state_size=header["llama_state_size"],
+        seed=header["seed"],
+    )
+
+class LlamaCppBackend:
+    """Runs a GGUF model in process with llama.cpp.
+
+    The model file is memory mapped and loaded on the first request. Every request renders
+    the whole history with the model's chat template, but only the tokens after the prefix
+    already in the KV cache are evaluated, so a turn costs its new messages rather than the
+    full history. When another conversation (a sub-agent) takes over the context, the KV
+    state of the current one is kept in memory up to `llama_state_cache_bytes` and restored
+    when it continues. On exit the state is saved to the cache directory, keyed by model and
+    working directory, and the next session there starts from it.
+
+    Generations run one at a time on a worker thread, llama.cpp contexts are not reentrant.
+    """
+
+    def __init__(self, config: "Config"):
+        self.model_path = os.path.abspath(os.path.expanduser(config.llama_model_path))
+        self.context_size = config.context_size
+        self.threads = config.llama_threads or None
+        self.gpu_layers = config.llama_gpu_layers
+        self.state_cache_bytes = config.llama_state_cache_bytes
+        self.persist_state = config.llama_persist_state
+        self.llama = None
+        self.formatter = None
+        self.cache = None
+        self.state_path: Optional[str] = None
+        self.llama_cpp_version = ""
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _model(self):
+        with self._load_lock:
+            if self.llama is not None:
+                return self.llama
+            try:
+                import llama_cpp
+                from llama_cpp import Llama, LlamaRAMCache
+                from llama_cpp.llama_chat_format import Jinja2ChatFormatter
+            except ImportError as e:
+                raise ValueError("the llama_cpp inference backend needs llama-cpp-python") from e
+
+            stat = os.stat(self.model_path)
+            llama = Llama(
+                model_path=self.model_path,
+                n_ctx=self.context_size,
+                n_threads=self.threads,
+                n_gpu_layers=self.gpu_layers,
+                use_mmap=True,
+                verbose=False,
+            )
+
+            template = llama.metadata.get("tokenizer.chat_template")
+            if not template:
+                raise ValueError(f"{self.model_path} has no chat template")
+            eos, bos = llama.token_eos(), llama.token_bos()
+            self.formatter = Jinja2ChatFormatter(
+                template=template,
+                eos_token=llama.detokenize([eos], special=True).decode("utf-8", errors="replace") if eos != -1 else "",
+                bos_token=llama.detokenize([bos], special=True).decode("utf-8", errors="replace") if bos != -1 else "",
+                stop_token_ids=[eos],
+            )
+            if self.state_cache_bytes > 0:
+                self.cache = LlamaRAMCache(capacity_bytes=self.state_cache_bytes)
+
+            # the saved state only fits this exact model file
+            key = hashlib.sha256(f"{self.model_path}\0{stat.st_mtime_ns}\0{stat.st_size}\0{self.context_size}\0{os.getcwd()}".encode("utf-8")).hexdigest()[:16]
+            self.state_path = os.path.join(cache_dir("llama"), key + ".kv")
+            self.llama_cpp_version = llama_cpp.__version__
+            if self.persist_state:
+                try:
+                    llama.load_state(read_state(self.state_path, self.llama_cpp_version))
+                except FileNotFoundError:
+                    pass
+                except Exception:
+                    # a damaged state or one of another llama.cpp version, start from an empty cache
+                    llama.reset()
+
+            self.llama = llama
+            return llama
+
+    def _reuse(self, llama, tokens: list[int]) -> int:
+        """Loads the best KV state for `tokens`, returns how many of them are already evaluated."""
+        from llama_cpp import Llama
+
+        current = llama.input_ids[:llama.n_tokens].tolist()
+        reused = Llama.longest_token_prefix(current, tokens)
+        if self.cache is None:
+            return reused
+
+        if len(current) - reused > SWITCH_TOKENS:
+            # another conversation takes over the context, keep this one's for when it continues
+            self.cache[current] = llama.save_state()
+        try:
+            state = self.cache[tokens]
+        except KeyError:
+            return reused
+        cached = Llama.longest_token_prefix(state.input_ids[:state.n_tokens].tolist(), tokens)
+        if cached > reused:
+            llama.load_state(state)
+            reused = cached
+        return reused
+
+    def _generate(self, messages: list[dict], tools: Optional[list], options: dict, cancelled: threading.Event) -> Iterator[tuple[str, Any]]:
+        """Yields ("text", str) and ("tool", call) events, then ("done", stats)."""
+        llama = self._model()
+        formatted = self.formatter(messages=messages, tools=tools or None)
+        tokens = llama.tokenize(formatted.prompt.encode("utf-8"), add_bos=False, special=True)
+        context = llama.n_ctx()
+        if len(tokens) >= context:
+            raise ValueError(f"the prompt of {len(tokens)} tokens does not fit the context of {context} tokens")
+
+        stop_tokens = {llama.token_eos()}
+        stops = formatted.stop if isinstance(formatted.stop, list) else [formatted.stop] if formatted.stop else []
+        for stop in stops:
+            ids = llama.tokenize(stop.encode("utf-8"), add_bos=False, special=True)
+            if len(ids) == 1:
+                stop_tokens.add(ids[0])
+
+        sampling = {**DEFAULT_SAMPLING, **{key: options[key] for key in DEFAULT_SAMPLING if key in options}}
+        limit = options.get("num_predict") or -1
+        if limit < 0:
+            limit = context - len(tokens)
+
+        started = time.perf_counter_ns()
+        reused = self._reuse(llama, tokens)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parser = ToolCallParser()
+        first_token = None
+        generated = 0
+        reason = "length"
+        for token in llama.generate(
+            tokens,
+            top_k=sampling["top_k"],
+            top_p=sampling["top_p"],
+            min_p=sampling["min_p"],
+            temp=sampling["temperature"],
+            repeat_penalty=sampling["repeat_penalty"],
+            reset=True,
+        ):
+            if first_token is None:
+                first_token = time.perf_counter_ns()
+            if token in stop_tokens:
+                reason = "stop"
+                break
+            generated += 1
+            yield from parser.feed(decoder.decode(llama.detokenize([token], special=True)))
+            if cancelled.is_set():
+                reason = "cancelled"
+                break
+            if generated >= limit:
+                break
+        yield from parser.feed(decoder.decode(b"", final=True))
+        yield from parser.finish()
+
+        finished = time.perf_counter_ns()
+        first_token = first_token or finished
+        yield ("done", {
+            "done_reason": reason,
+            "total_duration": finished - started,
+            "load_duration": 0,
+            "prompt_eval_count": len(tokens) - reused,
+            "prompt_eval_duration": first_token - started,
+            "eval_count": generated,
+            "eval_duration": finished - first_token,
+        })
+
+    def _run(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, cancelled: threading.Event, *args):
+        try:
+            with self._lock:
+                for event in self._generate(*args, cancelled):
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+                    if cancelled.is_set():
+                        break
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def _events(self, messages: list[dict], tools: Optional[list], options: dict):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        threading.Thread(
+            target=self._run,
+            args=(loop, queue, cancelled, messages, tools, options),
+            name="llama-cpp",
+            daemon=True,
+        ).start()
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                if event[0] == "error":
+                    raise event[1]
+                yield event
+        finally:
+            # Ctrl-C or a cancelled sub-agent, stop generating at the next token
+            cancelled.set()
+
+    async def _stream(self, model: str, messages: list[dict], tools: Optional[list], options: dict):
+        from ollama import ChatResponse, Message
+
+        # closing the stream stops the generation right away, not when the generator is finalized
+        async with aclosing(self._events(messages, tools, options)) as events:
+            async for kind, value in events:
+                if kind == "text":
+                    yield ChatResponse(model=model, done=False, message=Message(role="assistant", content=value))
+                elif kind == "tool":
+                    call = Message.ToolCall(function=Message.ToolCall.Function(name=value["name"], arguments=value["arguments"]))
+                    yield ChatResponse(model=model, done=False, message=Message(role="assistant", content="", tool_calls=[call]))
+                else:
+                    yield ChatResponse(model=model, done=True, message=Message(role="assistant", content=""), **value)
+
+    async def chat(self, model, messages, stream=False, think=False, tools=None, options=None):
+        options = options or {}
+        if stream:
+            return self._stream(model, messages, tools, options)
+
+        from ollama import ChatResponse, Message
+
+        content = []
+        calls = []
+        stats = {}
+        async with aclosing(self._events(messages, tools, options)) as events:
+            async for kind, value in events:
+                if kind == "text":
+                    content.append(value)
+                elif kind == "tool":
+                    calls.append(Message.ToolCall(function=Message.ToolCall.Function(name=value["name"], arguments=value["arguments"])))
+                else:
+                    stats = value
+        message = Message(role="assistant", content="".join(content), tool_calls=calls or None)
+        return ChatResponse(model=model, done=True, message=message, **stats)
+
+    def close(self):
+        """Saves the KV state for the next session in this directory."""
+        with self._lock:
+            if self.llama is None or not self.persist_state or self.llama.n_tokens == 0:
+                return
+            try:
+                write_state(self.state_path, self.llama.save_state(), self.llama_cpp_version)
+            except OSError:
+                pass
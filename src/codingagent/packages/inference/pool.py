@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Optional
+
+from codingagent.packages.tracing.tracer import tracer
+
+# seconds an idle connection to an inference server is kept open, turns are often minutes apart
+KEEPALIVE_SECONDS = 300
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+# seconds to connect to a server before trying another one
+CONNECT_TIMEOUT = 10
+
+# seconds a health probe may take
+PROBE_TIMEOUT = 5
+
+# seconds a failed server is skipped when no probe has found it healthy again
+RETRY_AFTER = 30
+
+# requests in flight a conversation's server may have over the least busy one before it moves
+AFFINITY_SLACK = 2
+
+def ollama_client(host: str):
+    """An ollama AsyncClient that keeps its connections open between turns."""
+    # ollama pulls in httpx and pydantic, they are imported when the first request is made
+    import httpx
+    from ollama import AsyncClient
+
+    return AsyncClient(
+        host=host,
+        # generations take as long as they take, only connecting is bounded
+        timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_SECONDS),
+    )
+
+def should_fail_over(error: BaseException) -> tuple[bool, bool]:
+    """(try another server, mark this one unhealthy) for an error raised before the first token."""
+    import httpx
+    from ollama import ResponseError
+
+    if isinstance(error, ResponseError):
+        if error.status_code == 429:
+            # busy, not broken
+            return True, False
+        return error.status_code >= 500, error.status_code >= 500
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True, True
+    return False, False
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        # requests sent and not yet finished streaming
+        self.outstanding = 0
+        self.healthy = True
+        # whether the last probe found the model loaded, a cold server takes a while to answer
+        self.warm = False
+        self.failed_at = 0.0
+        self.last_error = ""
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = ollama_client(self.url)
+        return self._client
+
+    def available(self, now: float) -> bool:
+        return self.healthy or now - self.failed_at > RETRY_AFTER
+
+    def mark_failed(self, error: BaseException):
+        self.healthy = False
+        self.failed_at = time.monotonic()
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+
+    def mark_healthy(self):
+        self.healthy = True
+        self.last_error = ""
+
+    async def aclose(self):
+        client, self._client = self._client, None
+        if client is not None:
+            # ollama's AsyncClient has no close of its own, its httpx client keeps the connections
+            await client._client.aclose()
+
+class InferencePool:
+    """Several Ollama compatible servers serving the same model.
+
+    Each conversation gets a PooledBackend that sticks to one server, so the server's prompt
+    cache keeps the conversation's prefix, unless that server is unhealthy or has AFFINITY_SLACK
+    more requests in flight than the least busy one. New conversations go to the healthy server
+    with the fewest requests in flight, preferring servers that have the model loaded. A request
+    that fails before its first token is retried on another server. Servers are probed every
+    `health_interval` seconds.
+    """
+
+    def __init__(self, urls: list[str], model: str, health_interval: float):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.model = model
+        self.health_interval = health_interval
+        self._rotation = itertools.count()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Starts the health probes on the running loop, once."""
+        if self.health_interval > 0 and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.gather(*(self._probe(endpoint) for endpoint in self.endpoints))
+            await asyncio.sleep(self.health_interval)
+
+    async def _probe(self, endpoint: Endpoint):
+        from ollama import ResponseError
+
+        try:
+            running = await asyncio.wait_for(endpoint.client.ps(), PROBE_TIMEOUT)
+            endpoint.warm = any(model.model == self.model or model.name == self.model for model in running.models)
+            endpoint.mark_healthy()
+        except ResponseError as e:
+            if e.status_code < 500:
+                # a proxy without /api/ps, it answered so it is up
+                endpoint.mark_healthy()
+            else:
+                endpoint.mark_failed(e)
+        except Exception as e:
+            endpoint.mark_failed(e)
+
+    def pick(self, preferred: Optional[Endpoint], tried: list[Endpoint]) -> Optional[Endpoint]:
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in tried]
+        if not candidates:
+            return None
+        # with every server down, try them anyway rather than failing without a request
+        available = [endpoint for endpoint in candidates if endpoint.available(now)] or candidates
+        least = min(endpoint.outstanding for endpoint in available)
+        if preferred in available and preferred.outstanding <= least + AFFINITY_SLACK:
+            return preferred
+
+        idle = [endpoint for endpoint in available if endpoint.outstanding == least]
+        warm = [endpoint for endpoint in idle if endpoint.warm] or idle
+        return warm[next(self._rotation) % len(warm)]
+
+    def status(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "url": endpoint.url,
+                "healthy": endpoint.healthy,
+                "warm": endpoint.warm,
+                "outstanding": endpoint.outstanding,
+                "requests": endpoint.requests,
+                "failures": endpoint.failures,
+                "last_error": endpoint.last_error,
+            }
+            for endpoint in self.endpoints
+        ]
+
+    async def aclose(self):
+        """Stops the health probes and closes the connections kept alive to the servers."""
+        task, self._probe_task = self._probe_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await asyncio.gather(*(endpoint.aclose() for endpoint in self.endpoints), return_exceptions=True)
+
+class Relay:
+    """The stream of a request that got its first part, it holds one of the endpoint's requests in flight.
+
+    The request is released exactly once: when the stream ends or fails, when it is closed, or
+    when it is garbage collected without ever being read, e.g. because the caller was cancelled
+    between getting it and reading from it.
+    """
+
+    def __init__(self, endpoint: Endpoint, first, response):
+        self.endpoint = endpoint
+        self.first = first
+        self.response = response
+        self.released = False
+        if first is None:
+            # the stream ended before its first part
+            self.release()
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.endpoint.outstanding -= 1
+
+    def __aiter__(self) -> "Relay":
+        return self
+
+    async def __anext__(self):
+        if self.first is not None:
+            first, self.first = self.first, None
+            return first
+        if self.released:
+            raise StopAsyncIteration
+        try:
+            return await anext(self.response)
+        except BaseException:
+            # the end of the stream, an error or cancellation
+            self.release()
+            raise
+
+    async def aclose(self):
+        self.release()
+        aclose = getattr(self.response, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def __del__(self):
+        self.release()
+
+class PooledBackend:
+    """One conversation's view of an InferencePool, it remembers the server the conversation uses."""
+
+    def __init__(self, pool: InferencePool):
+        self.pool = pool
+        self.endpoint: Optional[Endpoint] = None
+
+    async def chat(self, model, messages, stream=False, think=False, tools=None, options=None):
+        self.pool.start()
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = self.pool.pick(self.endpoint, tried)
+            self.endpoint = endpoint
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            finished = True
+            try:
+                with tracer.span("first_token", endpoint.url, attempt=len(tried) + 1):
+                    response = await endpoint.client.chat(model, messages=messages, stream=stream, think=think, tools=tools, options=options)
+                    if not stream:
+                        return response
+                    # the request is only sent once the stream is read
+                    try:
+                        first = await anext(response)
+                    except StopAsyncIteration:
+                        first = None
+                finished = False
+                return Relay(endpoint, first, response)
+            except Exception as e:
+                fail_over, unhealthy = should_fail_over(e)
+                if unhealthy:
+                    endpoint.mark_failed(e)
+                if not fail_over or len(tried) + 1 >= len(self.pool.endpoints):
+                    raise
+                tried.append(endpoint)
+            finally:
+                if finished:
+                    endpoint.outstanding -= 1
+
+    def close(self):
+        pass
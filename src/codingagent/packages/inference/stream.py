@@ -0,0 +1,132 @@
+import asyncio
+import signal
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.spinner import Spinner
+from rich.text import Text
+
+# how often the live view is redrawn, tokens arriving in between are batched
+REFRESH_PER_SECOND = 8
+
+def finished_blocks_end(text: str, start: int) -> int:
+    """End of the last complete markdown block in `text[start:]`, or `start` if none is complete yet.
+
+    A block is complete once a blank line follows it, blank lines inside an open code fence do not count.
+    """
+    end = text.rfind("\n\n", start)
+    while end != -1:
+        fences = sum(1 for line in text[start:end].split("\n") if line.lstrip().startswith(("```", "~~~")))
+        if fences % 2 == 0:
+            return end + 2
+        end = text.rfind("\n\n", start, end)
+    return start
+
+class StreamRenderer:
+    """Incrementally renders a streamed model response.
+
+    Parts are buffered as they arrive and the live view re-renders them at most
+    REFRESH_PER_SECOND times a second, so markdown is not re-parsed per token. Finished
+    markdown blocks are parsed once and cached, only the block still being written is
+    re-parsed. The live view is cropped to the terminal and replaced by one final print
+    on exit, so nothing is duplicated in the scrollback.
+    """
+
+    def __init__(self, console: Console, status: str = "Thinking...", refresh_per_second: float = REFRESH_PER_SECOND):
+        self.console = console
+        self.status = status
+        self.thoughts: list[str] = []
+        self.response: list[str] = []
+        self.started_at = time.perf_counter()
+        self.first_token_at: float | None = None
+        self._rendered_length = -1
+        self._renderable = None
+        # markdown of the finished blocks and how much of the response they cover
+        self._blocks: list[Markdown] = []
+        self._blocks_end = 0
+        self._live = Live(
+            console=console,
+            get_renderable=self._render,
+            refresh_per_second=refresh_per_second,
+            vertical_overflow="ellipsis",
+            transient=True,
+        )
+
+    @property
+    def ttft(self) -> float | None:
+        """Seconds between the start of the request and the first streamed token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    def mark_first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def add_thought(self, text: str):
+        self.mark_first_token()
+        self.thoughts.append(text)
+
+    def add_response(self, text: str):
+        self.mark_first_token()
+        self.response.append(text)
+
+    def _response_renderables(self, final: bool = False) -> list:
+        text = "".join(self.response)
+        end = len(text) if final else finished_blocks_end(text, self._blocks_end)
+        if end > self._blocks_end:
+            self._blocks.append(Markdown(text[self._blocks_end:end]))
+            self._blocks_end = end
+        tail = text[self._blocks_end:]
+        return self._blocks + [Markdown(tail)] if tail.strip() else list(self._blocks)
+
+    def _render(self, final: bool = False):
+        # only rebuild the renderable when new parts arrived since the last refresh
+        length = sum(len(part) for part in self.thoughts) + sum(len(part) for part in self.response)
+        if length == self._rendered_length and self._renderable is not None and not final:
+            return self._renderable
+        self._rendered_length = length
+
+        renderables = []
+        if self.thoughts:
+            renderables.append(Text("".join(self.thoughts), style="#9ca0b0"))
+        if self.response:
+            renderables.extend(self._response_renderables(final))
+        elif not final:
+            renderables.append(Spinner("dots", text=self.status))
+
+        self._renderable = Group(*renderables)
+        return self._renderable
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        self._live.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # the transient live view is cleared, the final answer is printed once in full
+        self._live.__exit__(exc_type, exc, tb)
+        if self.response or self.thoughts:
+            self.console.print(self._render(final=True))
+
+@contextmanager
+def interrupt_handler(on_interrupt: Callable[[], None]):
+    """Routes Ctrl-C to `on_interrupt` for the duration of the block instead of ending the session."""
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGINT)
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+    except (NotImplementedError, RuntimeError):
+        # signal handlers are not available on this platform / thread
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        loop.remove_signal_handler(signal.SIGINT)
+        signal.signal(signal.SIGINT, previous)
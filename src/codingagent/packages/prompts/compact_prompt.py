@@ -0,0 +1,11 @@
+COMPACT_PROMPT = """
+You are summarizing the earlier part of a conversation between a user and an AI coding agent so the agent can continue the work with less context.
+Write a concise summary that preserves:
+- The user's requests and any constraints or preferences they stated
+- Files that were read, created or changed, with the relevant paths, symbols and decisions
+- Important findings from tool results (errors, command output, search results) that later steps depend on
+- What has been completed and what is still outstanding
+
+Leave out greetings, repeated tool output and anything that is no longer relevant. Do not invent details.
+Respond with the summary only.
+"""
@@ -0,0 +1,120 @@
+import ast
+import re
+from typing import NamedTuple
+
+# chunks are cut at a boundary once they reach TARGET_LINES, and unconditionally at MAX_LINES or MAX_CHARS
+TARGET_LINES = 40
+MAX_LINES = 80
+MAX_CHARS = 6000
+
+# adjacent chunks smaller than this are merged, a lone import block or constant is too little context
+MIN_LINES = 8
+
+# lines that start a top level definition in the common languages, a good place to cut a chunk
+BOUNDARY = re.compile(
+    r"(?:export\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+    r"(?:def|class|func|fn|function|impl|struct|enum|trait|interface|type|mod|module|const|let|var|package)\b"
+)
+
+class Chunk(NamedTuple):
+    start: int  # 1-based, inclusive
+    end: int
+    text: str
+
+def _is_boundary(line: str) -> bool:
+    return not line.strip() or (not line[0].isspace() and BOUNDARY.match(line) is not None)
+
+def _windows(lines: list[str], start: int, end: int) -> list[tuple[int, int]]:
+    """Splits lines [start, end] (1-based) into spans, cut before boundaries past TARGET_LINES."""
+    spans = []
+    begin = start
+    chars = 0
+    for number in range(start, end + 1):
+        line = lines[number - 1]
+        size = number - begin
+        if size > 0 and (
+            (size >= TARGET_LINES and _is_boundary(line))
+            or size >= MAX_LINES
+            or chars + len(line) > MAX_CHARS
+        ):
+            spans.append((begin, number - 1))
+            begin = number
+            chars = 0
+        chars += len(line) + 1
+    if begin <= end:
+        spans.append((begin, end))
+    return spans
+
+def _fits(lines: list[str], start: int, end: int) -> bool:
+    return end - start < MAX_LINES and sum(len(line) + 1 for line in lines[start - 1:end]) <= MAX_CHARS
+
+def _node_start(node: ast.stmt) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+def _python_spans(lines: list[str], body: list[ast.stmt], start: int, end: int) -> list[tuple[int, int]]:
+    """One span per function or class in `body`, with the code between them split into windows."""
+    spans = []
+    cursor = start
+    for node in body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        node_start, node_end = _node_start(node), node.end_lineno
+        if cursor < node_start:
+            spans.extend(_windows(lines, cursor, node_start - 1))
+
+        if _fits(lines, node_start, node_end):
+            spans.append((node_start, node_end))
+        elif isinstance(node, ast.ClassDef):
+            # a large class is split along its methods, the class line stays with the first chunk
+            spans.extend(_python_spans(lines, node.body, node_start, node_end))
+        else:
+            spans.extend(_windows(lines, node_start, node_end))
+        cursor = node_end + 1
+    if cursor <= end:
+        spans.extend(_windows(lines, cursor, end))
+    return spans
+
+def _merge(lines: list[str], spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in spans:
+        if merged:
+            previous_start, previous_end = merged[-1]
+            small = end - start + 1 < MIN_LINES or previous_end - previous_start + 1 < MIN_LINES
+            if small and end - previous_start < TARGET_LINES and _fits(lines, previous_start, end):
+                merged[-1] = (previous_start, end)
+                continue
+        merged.append((start, end))
+    return merged
+
+def chunk_text(path: str, text: str) -> list[Chunk]:
+    """Splits a file into chunks to embed separately.
+
+    Python files are cut along top level functions and classes (large classes along their
+    methods) using ast; other files, and Python that does not parse, are cut into windows of
+    about TARGET_LINES lines, preferring blank lines and lines that start a definition.
+    """
+    lines = text.splitlines()
+    if not lines:
+        return []
+
+    spans = None
+    if path.endswith((".py", ".pyi")):
+        try:
+            spans = _python_spans(lines, ast.parse(text).body, 1, len(lines))
+        except (SyntaxError, ValueError):
+            spans = None
+    if spans is None:
+        spans = _windows(lines, 1, len(lines))
+
+    chunks = []
+    for start, end in _merge(lines, spans):
+        # leading and trailing blank lines carry no meaning but would change the hash
+        while start < end and not lines[start - 1].strip():
+            start += 1
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        body = "\n".join(lines[start - 1:end])
+        if body.strip():
+            chunks.append(Chunk(start, end, body))
+    return chunks
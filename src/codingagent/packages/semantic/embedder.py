@@ -0,0 +1,58 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# seconds to wait for the embedding server per request
+TIMEOUT = 60
+
+# Qwen3-Embedding (see embedding/Dockerfile) expects queries, but not documents, to carry an instruction
+QUERY_INSTRUCTION = "Instruct: Given a code search query, retrieve the code that implements or answers it\nQuery: "
+
+class Embedder:
+    """Client for a text-embeddings-inference style `/embed` endpoint, the one the indexer service uses.
+
+    POSTs {"inputs": [...]} and expects one vector per input back. Safe to share between threads.
+    """
+
+    def __init__(self, url: str, timeout: float = TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        # one keep-alive connection per thread, requests sessions are not thread safe
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+    def embed(self, texts: list[str]) -> "np.ndarray":
+        """Embeds `texts` and returns a float32 matrix with one row per text."""
+        import numpy as np
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        response = self._session().post(self.url, json={"inputs": texts, "truncate": True}, timeout=self.timeout)
+        response.raise_for_status()
+        vectors = np.asarray(response.json(), dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError(f"embedding server returned {vectors.shape} for {len(texts)} inputs")
+        return vectors
+
+    def embed_query(self, query: str) -> "np.ndarray":
+        return self.embed([QUERY_INSTRUCTION + query])[0]
+
+_embedder: Optional[Embedder] = None
+
+def configure(url: str):
+    """Sets the embedding endpoint used by semantic_search and the indexer, an empty url disables them."""
+    global _embedder
+    _embedder = Embedder(url) if url else None
+
+def default_embedder() -> Embedder:
+    if _embedder is None:
+        raise ValueError("no embedding endpoint configured, set embedding_api_url in the config")
+    return _embedder
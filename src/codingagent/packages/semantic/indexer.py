@@ -0,0 +1,349 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.walk import walk
+from codingagent.packages.semantic.chunker import chunk_text
+from codingagent.packages.semantic.embedder import Embedder
+from codingagent.packages.semantic.vector_cache import VectorCache, content_hash
+from codingagent.packages.semantic.vector_index import VectorIndex
+
+# chunks and characters sent per embedding request
+BATCH_SIZE = 32
+BATCH_CHARS = 64_000
+
+# embedding requests in flight at once, the walk pauses while this many are outstanding
+CONCURRENCY = 4
+
+# files larger than this are generated or data, not worth embedding
+MAX_FILE_BYTES = 512 * 1024
+
+# rows written to the index at a time
+COMMIT_ROWS = 512
+
+MANIFEST_FILE = "manifest.json"
+
+INDEXED_EXTENSIONS = frozenset({
+    ".py", ".pyi", ".go", ".rs", ".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs",
+    ".java", ".kt", ".scala", ".swift", ".c", ".h", ".cc", ".cpp", ".hpp", ".cs",
+    ".rb", ".php", ".lua", ".sh", ".sql", ".proto", ".md", ".rst", ".toml", ".yaml", ".yml",
+})
+
+GENERATED_SUFFIXES = (".pb.go", "_pb2.py", "_pb2_grpc.py", ".min.js", ".d.ts")
+
+def indexable(path: str) -> bool:
+    return os.path.splitext(path)[1] in INDEXED_EXTENSIONS and not path.endswith(GENERATED_SUFFIXES)
+
+@dataclass
+class IndexStats:
+    files: int = 0
+    changed: int = 0
+    removed: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    reused: int = 0
+    failed: int = 0
+    seconds: float = 0
+
+class PendingFile:
+    __slots__ = ("key", "chunks", "hashes", "remaining", "failed", "requeued")
+
+    def __init__(self, key: list[int], chunks: list, hashes: list[bytes]):
+        self.key = key
+        self.chunks = chunks
+        self.hashes = hashes
+        self.remaining = 0
+        self.failed = False
+        self.requeued = False
+
+class Indexer:
+    """Brings the vector index of `root` up to date with the files on disk.
+
+    The walk is streamed: files whose (mtime, size) match the manifest of the last run are
+    skipped without being read, changed files are chunked and only chunks whose content hash
+    is not in the vector cache are embedded. Embedding requests are batched by count and size
+    and run CONCURRENCY at a time; the walk waits while that many are in flight. A file's rows
+    are replaced once all its vectors are available, and files whose embedding failed keep their
+    old manifest entry so the next run retries them.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        index: VectorIndex,
+        cache: VectorCache,
+        embedder: Embedder,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = CONCURRENCY,
+    ):
+        self.root = os.path.abspath(root)
+        self.index = index
+        self.cache = cache
+        self.embedder = embedder
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self.stats = IndexStats()
+
+        self.manifest: dict[str, list[int]] = {}
+        self.pending: dict[str, PendingFile] = {}
+        # hashes being embedded and the files waiting for them
+        self.waiting: dict[bytes, list[str]] = {}
+        self.batch: list[tuple[bytes, str]] = []
+        self.batch_chars = 0
+        self.in_flight: dict[Future, list[bytes]] = {}
+        self.commits: list[tuple[str, list[int], np.ndarray, list[tuple[str, int, int, bytes]]]] = []
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index.directory, MANIFEST_FILE)
+
+    def _load_manifest(self) -> dict[str, list[int]]:
+        # an index that was reset or never written has nothing the manifest could vouch for
+        if len(self.index) == 0:
+            return {}
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.index.directory, exist_ok=True)
+        atomic_write(self._manifest_path(), json.dumps(self.manifest).encode("utf-8"))
+
+    def run(self, should_stop: Optional[Callable[[], bool]] = None) -> IndexStats:
+        started = time.perf_counter()
+        if self.cache.dim and self.index.dim and self.cache.dim != self.index.dim:
+            # the model changed, every vector in the index is from the old one
+            self.index.reset()
+        self.manifest = self._load_manifest()
+        seen = set()
+        completed = True
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+        try:
+            for path, entry in walk(self.root):
+                if should_stop is not None and should_stop():
+                    completed = False
+                    break
+                if not indexable(path):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if stat.st_size > MAX_FILE_BYTES:
+                    continue
+
+                seen.add(path)
+                self.stats.files += 1
+                key = [stat.st_mtime_ns, stat.st_size]
+                if self.manifest.get(path) == key:
+                    continue
+                self._add_file(pool, path, key)
+
+            self._submit(pool)
+            while self.in_flight:
+                self._wait(FIRST_COMPLETED)
+                # files whose vectors dropped out of the cache queue their chunks again
+                self._submit(pool)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future in list(self.in_flight):
+                self._complete(future)
+            self._commit()
+
+            # only a full walk can tell a deleted file from one not reached yet
+            if completed:
+                removed = [path for path in self.manifest if path not in seen]
+                self.index.delete_paths(removed)
+                for path in removed:
+                    del self.manifest[path]
+                self.stats.removed = len(removed)
+            self.index.compact()
+            self._save_manifest()
+            self.stats.seconds = time.perf_counter() - started
+        return self.stats
+
+    def _add_file(self, pool: ThreadPoolExecutor, path: str, key: list[int]):
+        try:
+            with open(os.path.join(self.root, path), "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        chunks = chunk_text(path, text)
+        hashes = [content_hash(chunk.text) for chunk in chunks]
+        self.stats.changed += 1
+        self.stats.chunks += len(chunks)
+
+        # touched but not changed, or changed back
+        if self.index.entries(path) == [(chunk.start, chunk.end, h) for chunk, h in zip(chunks, hashes)]:
+            self.manifest[path] = key
+            self.stats.reused += len(chunks)
+            return
+
+        self._queue(path, PendingFile(key, chunks, hashes))
+        if len(self.batch) >= self.batch_size or self.batch_chars >= BATCH_CHARS:
+            self._submit(pool)
+
+    def _queue(self, path: str, pending: PendingFile):
+        """Adds the chunks of `path` that are not in the cache to the next embedding batch."""
+        for h, chunk in zip(pending.hashes, pending.chunks):
+            if h in self.cache:
+                self.stats.reused += 1
+                continue
+            waiters = self.waiting.get(h)
+            if waiters is None:
+                self.waiting[h] = waiters = []
+                self.batch.append((h, chunk.text))
+                self.batch_chars += len(chunk.text)
+            if path not in waiters:
+                waiters.append(path)
+                pending.remaining += 1
+
+        if pending.remaining == 0:
+            self._ready(path, pending)
+        else:
+            self.pending[path] = pending
+
+    def _submit(self, pool: ThreadPoolExecutor):
+        if not self.batch:
+            return
+        # backpressure: the walk does not run ahead of the embedding server
+        while len(self.in_flight) >= self.concurrency:
+            self._wait(FIRST_COMPLETED)
+        hashes = [h for h, _ in self.batch]
+        texts = [text for _, text in self.batch]
+        self.in_flight[pool.submit(self.embedder.embed, texts)] = hashes
+        self.batch = []
+        self.batch_chars = 0
+
+    def _wait(self, return_when: str):
+        done, _ = wait(list(self.in_flight), return_when=return_when)
+        for future in done:
+            self._complete(future)
+
+    def _complete(self, future: Future):
+        hashes = self.in_flight.pop(future)
+        try:
+            vectors = future.result()
+            self.cache.add(hashes, vectors)
+            self.stats.embedded += len(hashes)
+            failed = False
+        except BaseException:
+            self.stats.failed += len(hashes)
+            failed = True
+
+        for h in hashes:
+            for path in self.waiting.pop(h, []):
+                pending = self.pending.get(path)
+                if pending is None:
+                    continue
+                pending.failed = pending.failed or failed
+                pending.remaining -= 1
+                if pending.remaining == 0:
+                    del self.pending[path]
+                    if not pending.failed:
+                        self._ready(path, pending)
+
+    def _ready(self, path: str, pending: PendingFile):
+        entries = [(path, chunk.start, chunk.end, h) for chunk, h in zip(pending.chunks, pending.hashes)]
+        vectors = self.cache.get(pending.hashes) if pending.hashes else None
+        if pending.hashes and vectors is None:
+            # the cache started over since the hashes were looked up, embed them again once
+            if pending.requeued:
+                self.stats.failed += len(pending.hashes)
+                return
+            pending.requeued = True
+            self._queue(path, pending)
+            return
+        self.commits.append((path, pending.key, vectors, entries))
+        if sum(len(commit[3]) for commit in self.commits) >= COMMIT_ROWS:
+            self._commit()
+
+    def _commit(self):
+        if not self.commits:
+            return
+        self.index.delete_paths([path for path, _, _, _ in self.commits])
+        rows = [(vectors, entries) for _, _, vectors, entries in self.commits if entries]
+        if rows:
+            self.index.append(np.concatenate([vectors for vectors, _ in rows]), [e for _, entries in rows for e in entries])
+        for path, key, _, _ in self.commits:
+            self.manifest[path] = key
+        self.commits = []
+
+class BackgroundIndexer:
+    """Runs one indexing pass at a time in a daemon thread, see `start` and `refresh`."""
+
+    def __init__(self, make_indexer: Callable[[], Indexer]):
+        self.make_indexer = make_indexer
+        self.thread: Optional[threading.Thread] = None
+        self.stats: Optional[IndexStats] = None
+        self.error: Optional[Exception] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Starts a pass unless one is running, returns whether it did."""
+        with self._lock:
+            if self.running() or self._stopped.is_set():
+                return False
+            self.thread = threading.Thread(target=self._run, name="semantic-index", daemon=True)
+            self.thread.start()
+            return True
+
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        try:
+            self.stats = self.make_indexer().run(self._stopped.is_set)
+            self.error = None
+        except Exception as e:
+            self.error = e
+
+_background: dict[str, BackgroundIndexer] = {}
+
+def _make_indexer(root: str, embedding_url: str, batch_size: int, concurrency: int) -> Indexer:
+    from codingagent.packages.semantic.embedder import default_embedder
+    from codingagent.packages.semantic.vector_cache import open_cache
+    from codingagent.packages.semantic.vector_index import open_index
+
+    return Indexer(root, open_index(root), open_cache(embedding_url), default_embedder(), batch_size, concurrency)
+
+def build(root: str, embedding_url: str, batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY) -> IndexStats:
+    """Indexes `root` on the calling thread, a batch run does it once before starting its workers."""
+    return _make_indexer(os.path.abspath(root), embedding_url, batch_size, concurrency).run()
+
+def start(root: str, embedding_url: str, batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY) -> BackgroundIndexer:
+    """Indexes `root` in the background, later calls to `refresh` re-run it incrementally."""
+    root = os.path.abspath(root)
+    previous = _background.get(root)
+    if previous is not None:
+        previous.stop()
+
+    def make_indexer() -> Indexer:
+        return _make_indexer(root, embedding_url, batch_size, concurrency)
+
+    background = _background[root] = BackgroundIndexer(make_indexer)
+    background.refresh()
+    return background
+
+def background(root: str) -> Optional[BackgroundIndexer]:
+    return _background.get(os.path.abspath(root))
+
+def refresh(root: str):
+    """Picks up changes below `root` if it is being indexed, costs a walk plus the changed files."""
+    indexer = background(root)
+    if indexer is not None:
+        indexer.refresh()
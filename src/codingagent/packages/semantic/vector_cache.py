@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+from codingagent.packages.fs.lock import file_lock
+
+CACHE_VERSION = 2
+
+# vectors kept before the cache starts over, about 1.5GB at 1024 dimensions
+MAX_ROWS = 400_000
+
+HEADER_FILE = "cache.json"
+HASHES_FILE = "hashes.bin"
+VECTORS_FILE = "vectors.f32"
+LOCK_FILE = "cache.lock"
+
+# raw bytes, an "S" dtype would drop trailing zero bytes of a digest
+HASH_DTYPE = np.dtype("V16")
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+class VectorCache:
+    """Persistent map from content hash to embedding, shared by every checkout indexed with one model.
+
+    Chunks that did not change, moved, or exist in several files or worktrees are embedded once.
+    Both files are append-only; the hash list is read into a dict on open, vectors are mapped.
+    Concurrent sessions and batch workers append to the same files: every append holds a lock
+    on LOCK_FILE, first reads the rows other processes appended since, and numbers the new rows
+    from the files' sizes. A reset replaces the files rather than truncating them, so vectors
+    mapped by other processes stay readable, and gives the header a new id they notice.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.dim = 0
+        self.id = ""
+        # rows of the files read so far, the dict has fewer entries if a hash was appended twice
+        self.count = 0
+        self.rows: dict[bytes, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _header(self) -> Optional[dict]:
+        try:
+            with open(self._file(HEADER_FILE)) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return header if header.get("version") == CACHE_VERSION else None
+
+    def _complete_rows(self) -> int:
+        # a crash between the two appends leaves one file longer, only complete rows count
+        return min(
+            os.path.getsize(self._file(HASHES_FILE)) // HASH_DTYPE.itemsize,
+            os.path.getsize(self._file(VECTORS_FILE)) // (4 * self.dim),
+        )
+
+    def _load(self):
+        self.dim, self.id, self.count, self.rows, self.vectors = 0, "", 0, {}, None
+        header = self._header()
+        if header is None:
+            return
+        self.dim, self.id = header["dim"], header["id"]
+        try:
+            self._read_new_rows()
+        except OSError:
+            self.dim, self.id = 0, ""
+
+    def _read_new_rows(self):
+        """Reads the rows appended since the last read, by this or another process."""
+        count = self._complete_rows()
+        if count <= self.count:
+            return
+        with open(self._file(HASHES_FILE), "rb") as f:
+            f.seek(self.count * HASH_DTYPE.itemsize)
+            hashes = np.fromfile(f, dtype=HASH_DTYPE, count=count - self.count)
+        for i, h in enumerate(hashes, self.count):
+            self.rows.setdefault(bytes(h), i)
+        self.count = count
+        self.vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, self.dim))
+
+    def _reset(self, dim: int):
+        os.makedirs(self.directory, exist_ok=True)
+        # new files, the old ones stay valid for processes that still map them
+        for name in (HASHES_FILE, VECTORS_FILE):
+            atomic_write(self._file(name), b"")
+        self.id = os.urandom(8).hex()
+        header = {"version": CACHE_VERSION, "dim": dim, "id": self.id}
+        atomic_write(self._file(HEADER_FILE), json.dumps(header).encode("utf-8"))
+        self.dim = dim
+        self.count = 0
+        self.rows = {}
+        self.vectors = None
+
+    def __contains__(self, content_hash: bytes) -> bool:
+        return content_hash in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, hashes: list[bytes]) -> Optional[np.ndarray]:
+        """Vectors for `hashes`, None if any of them is not in the cache (anymore, after a reset)."""
+        with self._lock:
+            rows = [self.rows.get(h) for h in hashes]
+            if None in rows:
+                return None
+            return np.array(self.vectors[rows])
+
+    def add(self, hashes: list[bytes], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, file_lock(self._file(LOCK_FILE)):
+            header = self._header()
+            if header is None or header["id"] != self.id:
+                # started over by another process
+                self._load()
+            else:
+                self._read_new_rows()
+            if self.dim != vectors.shape[1] or self.count >= MAX_ROWS:
+                # a different model behind the same endpoint (the old vectors are useless) or a full cache
+                self._reset(vectors.shape[1])
+
+            fresh, seen = [], set()
+            for i, h in enumerate(hashes):
+                if h not in self.rows and h not in seen:
+                    seen.add(h)
+                    fresh.append(i)
+            if not fresh:
+                return
+
+            # drop the partial row a crash may have left, so both files end at row `count`
+            for name, size in ((HASHES_FILE, HASH_DTYPE.itemsize), (VECTORS_FILE, 4 * self.dim)):
+                if os.path.getsize(self._file(name)) != self.count * size:
+                    os.truncate(self._file(name), self.count * size)
+            with open(self._file(HASHES_FILE), "ab") as f:
+                f.write(np.array([hashes[i] for i in fresh], dtype=HASH_DTYPE).tobytes())
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors[fresh].tobytes())
+            self._read_new_rows()
+
+def open_cache(embedding_url: str) -> VectorCache:
+    """The vector cache of the model served at `embedding_url`."""
+    key = hashlib.sha256(embedding_url.encode("utf-8")).hexdigest()[:16]
+    return VectorCache(cache_dir("semantic", "vectors", key))
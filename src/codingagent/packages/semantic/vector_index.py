@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+from codingagent.packages.fs.lock import file_lock
+
+INDEX_VERSION = 3
+
+# per vector metadata, `path` indexes into paths.txt and `hash` identifies the embedded content
+ROW_DTYPE = np.dtype([
+    ("path", "<u4"),
+    ("start", "<u4"),
+    ("end", "<u4"),
+    ("alive", "u1"),
+    ("hash", "V16"),
+])
+
+# rewrite the files once deleted rows outnumber live ones
+COMPACT_RATIO = 1.0
+
+# the header names the generation of the data files, compaction writes a new one and swaps the header
+HEADER_FILE = "index.json"
+VECTORS_FILE = "vectors.{}.f32"
+ROWS_FILE = "rows.{}.bin"
+PATHS_FILE = "paths.{}.txt"
+DATA_FILES = (VECTORS_FILE, ROWS_FILE, PATHS_FILE)
+LOCK_FILE = "index.lock"
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class VectorIndex:
+    """Append-only vector index on disk, searched through memory maps.
+
+    Vectors are stored normalized as a float32 matrix, so cosine similarity is a single
+    matrix-vector product. Row metadata is a fixed size record per vector plus a list of
+    paths; deleting rows only clears their `alive` flag in place, appending writes to the
+    end of the files. Opening an index maps the files and reads the path list, nothing else.
+
+    Compaction writes the live rows to files of a new generation and then replaces the header
+    naming the current generation, so a crash leaves either the old or the new files in use.
+
+    Several processes may index the same repository: loading and every change hold a lock on
+    LOCK_FILE and first pick up what other processes changed since, the paths and rows they
+    appended or the new generation of a compaction.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.dim = 0
+        self.generation = 0
+        # changes with every header written, tells a recreated index from the one loaded
+        self.id = ""
+        self.vectors: Optional[np.ndarray] = None
+        self.rows: Optional[np.ndarray] = None
+        self.paths: list[str] = []
+        self.path_ids: dict[str, int] = {}
+        # bytes of the paths file read so far
+        self._paths_size = 0
+        self._lock = threading.RLock()
+        self.load()
+
+    @contextmanager
+    def _locked(self):
+        """Holds the thread and the file lock, with the state of other processes' changes loaded."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, file_lock(os.path.join(self.directory, LOCK_FILE)):
+            self._refresh()
+            yield
+
+    def _file(self, name: str, generation: Optional[int] = None) -> str:
+        return os.path.join(self.directory, name.format(self.generation if generation is None else generation))
+
+    def _remove_data_files(self, keep: Optional[int] = None):
+        """Deletes the data files of every generation but `keep`."""
+        kept = {name.format(keep) for name in DATA_FILES} if keep is not None else set()
+        prefixes = tuple(name.split("{}")[0] for name in DATA_FILES)
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(prefixes) and name not in kept:
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _header(self) -> Optional[dict]:
+        try:
+            with open(self._file(HEADER_FILE)) as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return header if header.get("version") == INDEX_VERSION else None
+
+    def _clear(self):
+        self.dim = 0
+        self.id = ""
+        self.vectors, self.rows = None, None
+        self.paths, self.path_ids = [], {}
+        self._paths_size = 0
+
+    def load(self):
+        with self._locked():
+            pass
+
+    def _refresh(self):
+        header = self._header()
+        if header is None:
+            self._clear()
+            return
+        if header.get("id") != self.id:
+            # created, reset or compacted by another process
+            self._clear()
+            self.dim, self.generation, self.id = header["dim"], header["generation"], header.get("id")
+        try:
+            self._read_new_paths()
+            self._map()
+        except OSError:
+            # data files of the header's generation are missing
+            self._clear()
+            return
+        if self.rows is not None and len(self.rows) and int(self.rows["path"].max()) >= len(self.paths):
+            # rows referring to paths that were never written, the files do not belong together
+            self._reset()
+
+    def _read_new_paths(self):
+        with open(self._file(PATHS_FILE), "rb") as f:
+            f.seek(self._paths_size)
+            data = f.read()
+        # a crash can leave a partial last line, it is not a path yet
+        end = data.rfind(b"\n") + 1
+        for path in data[:end].decode("utf-8").split("\n")[:-1]:
+            self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        self._paths_size += end
+
+    def _map(self):
+        # a crash between the two appends leaves one file longer, only complete rows count
+        count = min(
+            os.path.getsize(self._file(ROWS_FILE)) // ROW_DTYPE.itemsize,
+            os.path.getsize(self._file(VECTORS_FILE)) // (4 * self.dim),
+        )
+        if count == 0:
+            self.vectors, self.rows = None, None
+            return
+        self.vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, self.dim))
+        self.rows = np.memmap(self._file(ROWS_FILE), dtype=ROW_DTYPE, mode="r+", shape=(count,))
+
+    def __len__(self) -> int:
+        return 0 if self.rows is None else len(self.rows)
+
+    def alive_count(self) -> int:
+        with self._lock:
+            return 0 if self.rows is None else int(np.count_nonzero(self.rows["alive"]))
+
+    def reset(self):
+        """Drops every vector, the next append starts a new index."""
+        with self._locked():
+            self._reset()
+
+    def _reset(self):
+        try:
+            os.unlink(self._file(HEADER_FILE))
+        except FileNotFoundError:
+            pass
+        self._remove_data_files()
+        self._clear()
+
+    def _create(self, dim: int):
+        self._clear()
+        # files of an index of an older version or a crashed compaction
+        self._remove_data_files()
+        self.generation = 0
+        for name in DATA_FILES:
+            open(self._file(name), "wb").close()
+        self._write_header(dim, self.generation)
+        self.dim = dim
+
+    def _write_header(self, dim: int, generation: int):
+        self.id = os.urandom(8).hex()
+        header = {"version": INDEX_VERSION, "dim": dim, "generation": generation, "id": self.id}
+        atomic_write(self._file(HEADER_FILE), json.dumps(header).encode("utf-8"))
+
+    def append(self, vectors: np.ndarray, entries: list[tuple[str, int, int, bytes]]):
+        """Adds one vector per (path, start line, end line, content hash) entry."""
+        if len(entries) == 0:
+            return
+        vectors = normalize(vectors)
+        with self._locked():
+            if self.dim == 0:
+                self._create(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"vectors have {vectors.shape[1]} dimensions, the index has {self.dim}")
+
+            new_paths: dict[str, int] = {}
+            rows = np.zeros(len(entries), dtype=ROW_DTYPE)
+            for i, (path, start, end, content_hash) in enumerate(entries):
+                path_id = self.path_ids.get(path)
+                if path_id is None:
+                    path_id = new_paths.setdefault(path, len(self.paths) + len(new_paths))
+                rows[i] = (path_id, start, end, 1, content_hash)
+
+            # drop the partial line or row a crash may have left, so the files end where they were read
+            os.truncate(self._file(PATHS_FILE), self._paths_size)
+            for name, size in ((VECTORS_FILE, 4 * self.dim), (ROWS_FILE, ROW_DTYPE.itemsize)):
+                if os.path.getsize(self._file(name)) != len(self) * size:
+                    os.truncate(self._file(name), len(self) * size)
+
+            if new_paths:
+                data = "".join(path + "\n" for path in new_paths).encode("utf-8")
+                with open(self._file(PATHS_FILE), "ab") as f:
+                    f.write(data)
+                self._paths_size += len(data)
+                self.paths.extend(new_paths)
+                self.path_ids.update(new_paths)
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file(ROWS_FILE), "ab") as f:
+                f.write(rows.tobytes())
+            self._map()
+
+    def delete_paths(self, paths: Iterable[str]) -> int:
+        """Marks every vector of `paths` deleted, returns how many were."""
+        paths = list(paths)
+        if not paths:
+            return 0
+        with self._locked():
+            ids = [self.path_ids[path] for path in paths if path in self.path_ids]
+            if not ids or self.rows is None:
+                return 0
+            mask = np.isin(self.rows["path"], ids) & (self.rows["alive"] == 1)
+            deleted = int(np.count_nonzero(mask))
+            if deleted:
+                self.rows["alive"][mask] = 0
+                self.rows.flush()
+            return deleted
+
+    def entries(self, path: str) -> list[tuple[int, int, bytes]]:
+        """(start, end, content hash) of the live vectors of `path`."""
+        with self._lock:
+            path_id = self.path_ids.get(path)
+            if path_id is None or self.rows is None:
+                return []
+            rows = self.rows[(self.rows["path"] == path_id) & (self.rows["alive"] == 1)]
+            return [(int(row["start"]), int(row["end"]), bytes(row["hash"])) for row in rows]
+
+    def search(self, query: np.ndarray, k: int, path_prefix: str = "") -> list[tuple[float, str, int, int]]:
+        """Top `k` live vectors by cosine similarity to `query`, as (score, path, start, end).
+
+        `path_prefix` restricts results to a file or directory, in the form the paths were added in.
+        """
+        with self._lock:
+            vectors, rows, paths = self.vectors, self.rows, self.paths
+        if vectors is None or k <= 0:
+            return []
+
+        scores = vectors @ normalize(query)
+        valid = rows["alive"] == 1
+        if path_prefix:
+            # a directory prefix only matches whole path components
+            directory = path_prefix.rstrip("/") + "/"
+            allowed = np.fromiter(
+                (path == path_prefix or path.startswith(directory) for path in paths), dtype=bool, count=len(paths)
+            )
+            valid &= allowed[rows["path"]]
+        scores = np.where(valid, scores, -np.inf)
+
+        k = min(k, int(np.count_nonzero(valid)))
+        if k == 0:
+            return []
+        # partial selection of the k best, only those get sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[i]), paths[rows["path"][i]], int(rows["start"][i]), int(rows["end"][i]))
+            for i in top
+        ]
+
+    def compact(self, force: bool = False) -> bool:
+        """Rewrites the index without deleted rows once they outnumber live ones."""
+        with self._locked():
+            if self.rows is None:
+                return False
+            alive = self.rows["alive"] == 1
+            dead = len(alive) - int(np.count_nonzero(alive))
+            if not force and dead <= COMPACT_RATIO * (len(alive) - dead):
+                return False
+
+            vectors = np.array(self.vectors[alive])
+            rows = np.array(self.rows[alive])
+            used = sorted(set(rows["path"].tolist()))
+            remap = np.zeros(len(self.paths), dtype="<u4")
+            remap[used] = np.arange(len(used), dtype="<u4")
+            rows["path"] = remap[rows["path"]]
+            paths = [self.paths[i] for i in used]
+
+            # the new generation only takes effect with the header, a crash before it keeps the old one
+            generation = self.generation + 1
+            atomic_write(self._file(VECTORS_FILE, generation), vectors.tobytes())
+            atomic_write(self._file(ROWS_FILE, generation), rows.tobytes())
+            paths_data = "".join(path + "\n" for path in paths).encode("utf-8")
+            atomic_write(self._file(PATHS_FILE, generation), paths_data)
+            self._write_header(self.dim, generation)
+            self.generation = generation
+            # unlinked files stay valid for searches that still map the old ones
+            self._remove_data_files(keep=generation)
+            self.paths = paths
+            self.path_ids = {path: i for i, path in enumerate(paths)}
+            self._paths_size = len(paths_data)
+            self._map()
+            return True
+
+_indexes: dict[str, VectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+def index_directory(root: str) -> str:
+    key = hashlib.sha256(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return cache_dir("semantic", key)
+
+def open_index(root: str) -> VectorIndex:
+    """The process wide index of the repository at `root`."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        if root not in _indexes:
+            _indexes[root] = VectorIndex(index_directory(root))
+        return _indexes[root]
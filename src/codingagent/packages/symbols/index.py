@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Iterator, Optional
+
+from codingagent.packages.fs import inventory
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+from codingagent.packages.fs.walk import walk
+from codingagent.packages.symbols.parsers import Symbol, parse, parser_for
+
+CACHE_VERSION = 1
+
+# files larger than this are generated or data, not worth parsing
+MAX_FILE_BYTES = 1024 * 1024
+
+# seconds a lookup waits for the initial build before giving up
+READY_TIMEOUT = 10
+
+def _stat_key(path: str) -> Optional[list[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size > MAX_FILE_BYTES:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+class SymbolIndex:
+    """Definitions of every Python, Go, Rust and TypeScript/JavaScript file below `root`.
+
+    Built once in the background from a cache file that remembers each file's symbols with
+    its (mtime, size), so only files changed since the last session are parsed again. After
+    that the inventory's watcher reports changed paths, which are re-parsed on the next
+    lookup; a lookup is then a dict access.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.files: dict[str, tuple[list[int], list[Symbol]]] = {}
+        self.by_name: dict[str, list[tuple[str, Symbol]]] = {}
+        self.dirty: set[str] = set()
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        key = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir("symbols"), key + ".json")
+
+    def start(self):
+        threading.Thread(target=self.build, name="symbol-index", daemon=True).start()
+
+    def _load(self) -> dict[str, tuple[list[int], list[Symbol]]]:
+        try:
+            with open(self.cache_path, "r") as f:
+                body = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if body.get("version") != CACHE_VERSION:
+            return {}
+        return {
+            path: (key, [Symbol(*symbol) for symbol in symbols])
+            for path, (key, symbols) in body["files"].items()
+        }
+
+    def _save(self):
+        with self._lock:
+            files = {path: [key, symbols] for path, (key, symbols) in self.files.items()}
+        try:
+            atomic_write(self.cache_path, json.dumps({"version": CACHE_VERSION, "files": files}).encode("utf-8"))
+        except OSError:
+            pass
+
+    def _parse(self, relative: str, key: list[int]) -> tuple[list[int], list[Symbol]]:
+        try:
+            with open(os.path.join(self.root, relative), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            return key, []
+        return key, parse(relative, text)
+
+    def build(self):
+        with self._update_lock:
+            cached = self._load()
+            files = {}
+            changed = False
+            for relative, entry in walk(self.root):
+                if parser_for(relative) is None:
+                    continue
+                key = _stat_key(entry.path)
+                if key is None:
+                    continue
+                previous = cached.get(relative)
+                if previous is not None and previous[0] == key:
+                    files[relative] = previous
+                else:
+                    files[relative] = self._parse(relative, key)
+                    changed = True
+
+            with self._lock:
+                self.files = files
+                self._reindex()
+            if changed or len(files) != len(cached):
+                self._save()
+        self.ready.set()
+
+    def _reindex(self):
+        by_name: dict[str, list[tuple[str, Symbol]]] = {}
+        for relative in sorted(self.files):
+            for symbol in self.files[relative][1]:
+                by_name.setdefault(symbol.name, []).append((relative, symbol))
+        self.by_name = by_name
+
+    def notify(self, path: str):
+        """Marks `path` (a file or directory) as changed, called from the inventory watcher."""
+        if path == self.root or path.startswith(self.root + os.sep):
+            with self._lock:
+                self.dirty.add(path)
+
+    def _update(self):
+        """Re-parses the files changed since the last lookup."""
+        with self._lock:
+            if not self.dirty:
+                return
+        with self._update_lock:
+            with self._lock:
+                dirty, self.dirty = self.dirty, set()
+            updates: dict[str, Optional[tuple[list[int], list[Symbol]]]] = {}
+            for path in dirty:
+                relative = os.path.relpath(path, self.root)
+                relative = "" if relative == "." else relative
+                if os.path.isdir(path):
+                    # a new, moved or rescanned directory, compare everything below it
+                    present = set()
+                    for child, entry in walk(path):
+                        child = os.path.join(relative, child) if relative else child
+                        if parser_for(child) is None:
+                            continue
+                        present.add(child)
+                        key = _stat_key(entry.path)
+                        current = self.files.get(child)
+                        if key is not None and (current is None or current[0] != key):
+                            updates[child] = self._parse(child, key)
+                    prefix = relative + os.sep if relative else ""
+                    for indexed in self.files:
+                        if indexed.startswith(prefix) and indexed not in present:
+                            updates[indexed] = None
+                elif parser_for(relative) is not None:
+                    key = _stat_key(path)
+                    current = self.files.get(relative)
+                    if key is None:
+                        updates[relative] = None
+                    elif current is None or current[0] != key:
+                        updates[relative] = self._parse(relative, key)
+                else:
+                    # a removed directory
+                    prefix = relative + os.sep
+                    for indexed in self.files:
+                        if indexed.startswith(prefix):
+                            updates[indexed] = None
+
+            updates = {path: update for path, update in updates.items() if update is not None or path in self.files}
+            if not updates:
+                return
+            with self._lock:
+                for relative, update in updates.items():
+                    if update is None:
+                        self.files.pop(relative, None)
+                    else:
+                        self.files[relative] = update
+                self._reindex()
+        self._save()
+
+    def _fresh(self) -> bool:
+        if not self.ready.wait(READY_TIMEOUT):
+            return False
+        self._update()
+        return True
+
+    def lookup(self, name: str, kind: str = "", parent: str = "") -> list[tuple[str, Symbol]]:
+        """Definitions named `name`, optionally only those of one kind or inside `parent`."""
+        if not self._fresh():
+            raise TimeoutError("the symbol index is still being built")
+        with self._lock:
+            matches = list(self.by_name.get(name, ()))
+
+        # the watcher may not cover every path, re-parse stale result files before answering
+        stale = {relative for relative, _ in matches if _stat_key(os.path.join(self.root, relative)) != self.files.get(relative, (None,))[0]}
+        if stale:
+            with self._lock:
+                self.dirty.update(os.path.join(self.root, relative) for relative in stale)
+            self._update()
+            with self._lock:
+                matches = list(self.by_name.get(name, ()))
+
+        return [
+            (relative, symbol) for relative, symbol in matches
+            if (not kind or symbol.kind == kind) and (not parent or symbol.parent == parent)
+        ]
+
+    def similar(self, name: str, limit: int) -> list[str]:
+        """Names containing `name`, ignoring case and underscores, for a lookup that found nothing."""
+        needle = name.lower().replace("_", "")
+        with self._lock:
+            names = [candidate for candidate in self.by_name if needle in candidate.lower().replace("_", "")]
+        return sorted(names, key=lambda candidate: (len(candidate), candidate))[:limit]
+
+    def symbols(self, prefix: str = "") -> Iterator[tuple[str, list[Symbol]]]:
+        """(path, symbols) of the files below the relative path `prefix`, in path order."""
+        if not self._fresh():
+            raise TimeoutError("the symbol index is still being built")
+        directory = prefix.rstrip("/") + "/"
+        with self._lock:
+            paths = sorted(path for path in self.files if not prefix or path == prefix or path.startswith(directory))
+            snapshot = [(path, self.files[path][1]) for path in paths]
+        return iter(snapshot)
+
+    def references(self, name: str, limit: int, prefix: str = "") -> tuple[list[tuple[str, int, str]], bool]:
+        """(path, line, text) of lines using `name` as a whole word and whether there were more than `limit`."""
+        word = re.compile(rf"(?<![\w$]){re.escape(name)}(?![\w$])")
+        needle = name.encode("utf-8")
+        matches = []
+        for relative, _ in self.symbols(prefix):
+            try:
+                with open(os.path.join(self.root, relative), "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if needle not in data:
+                continue
+            for number, line in enumerate(data.decode("utf-8", errors="replace").splitlines(), start=1):
+                if word.search(line) is None:
+                    continue
+                if len(matches) == limit:
+                    return matches, True
+                matches.append((relative, number, line.strip()))
+        return matches, False
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+def _on_change(path: str):
+    if _index is not None:
+        _index.notify(path)
+
+inventory.add_listener(_on_change)
+
+def start(root: str) -> SymbolIndex:
+    """Builds the process wide symbol index for `root` in the background, replacing a previous one."""
+    global _index
+    with _index_lock:
+        _index = SymbolIndex(root)
+        _index.start()
+        return _index
+
+def index_for(root: str) -> SymbolIndex:
+    """The symbol index covering `root`, started on first use when App.init has not done it."""
+    root = os.path.abspath(root)
+    with _index_lock:
+        index = _index
+    if index is not None and (root == index.root or root.startswith(index.root + os.sep)):
+        return index
+    return start(root)
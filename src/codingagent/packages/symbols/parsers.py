@@ -0,0 +1,189 @@
+import ast
+import os
+import re
+from typing import Callable, NamedTuple, Optional
+
+# characters of a definition's first line kept as its signature
+SIGNATURE_LIMIT = 160
+
+class Symbol(NamedTuple):
+    name: str
+    kind: str
+    line: int  # 1-based, inclusive
+    end: int
+    parent: str  # enclosing class, impl or type, "" at the top level
+    signature: str
+
+def _signature(lines: list[str], line: int) -> str:
+    text = lines[line - 1].strip()
+    return text[:SIGNATURE_LIMIT] + "..." if len(text) > SIGNATURE_LIMIT else text
+
+def parse_python(text: str) -> list[Symbol]:
+    lines = text.splitlines()
+    tree = ast.parse(text)
+    symbols = []
+
+    def visit(body: list[ast.stmt], parent: str):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if parent else "function"
+                symbols.append(Symbol(node.name, kind, node.lineno, node.end_lineno, parent, _signature(lines, node.lineno)))
+            elif isinstance(node, ast.ClassDef):
+                symbols.append(Symbol(node.name, "class", node.lineno, node.end_lineno, parent, _signature(lines, node.lineno)))
+                visit(node.body, node.name)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        kind = "attribute" if parent else "variable"
+                        symbols.append(Symbol(target.id, kind, node.lineno, node.end_lineno, parent, _signature(lines, node.lineno)))
+
+    visit(tree.body, "")
+    return symbols
+
+# string and character literals and line comments, removed before counting braces
+NOISE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|//.*')
+
+def _block_end(lines: list[str], index: int) -> int:
+    """Last line (1-based) of the brace delimited block opened on or just after line `index` (0-based)."""
+    depth = 0
+    opened = False
+    for i in range(index, len(lines)):
+        code = NOISE.sub("", lines[i])
+        for char in code:
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+                if opened and depth <= 0:
+                    return i + 1
+        # a declaration without a body, like `type A = B;` or a trait method
+        if not opened and (code.rstrip().endswith(";") or i > index + 3):
+            return index + 1
+    return len(lines) if opened else index + 1
+
+class Pattern(NamedTuple):
+    regex: re.Pattern
+    kind: str
+    # whether the symbol's block encloses the following definitions, like a class or impl
+    container: bool = False
+
+def _parse_braces(text: str, patterns: list[Pattern], member: Optional[re.Pattern] = None) -> list[Symbol]:
+    """Line based parser for brace delimited languages.
+
+    Each pattern's `name` group is a symbol and its optional `parent` group names the type it
+    belongs to (a Go receiver). Containers are tracked by their brace block; inside one, `member`
+    matches methods that have no keyword of their own, like TypeScript class methods.
+    """
+    lines = text.splitlines()
+    symbols = []
+    containers: list[tuple[str, int]] = []
+    # last line of the current member's body, calls in it look like member declarations
+    member_end = 0
+    for i, line in enumerate(lines):
+        number = i + 1
+        while containers and containers[-1][1] < number:
+            containers.pop()
+        parent = containers[-1][0] if containers else ""
+
+        for pattern in patterns:
+            match = pattern.regex.match(line)
+            if match is None:
+                continue
+            name = match.group("name")
+            end = _block_end(lines, i)
+            groups = match.groupdict()
+            owner = groups.get("parent") or parent
+            kind = pattern.kind
+            if kind == "function" and owner:
+                kind = "method"
+            if pattern.kind != "impl":
+                symbols.append(Symbol(name, kind, number, end, owner, _signature(lines, number)))
+            if pattern.container and end > number:
+                containers.append((name, end))
+            break
+        else:
+            if member is not None and parent and number > member_end:
+                match = member.match(line)
+                if match is not None and match.group("name") not in KEYWORDS:
+                    member_end = _block_end(lines, i)
+                    symbols.append(Symbol(match.group("name"), "method", number, member_end, parent, _signature(lines, number)))
+    return symbols
+
+KEYWORDS = frozenset({
+    "if", "else", "for", "while", "do", "switch", "case", "catch", "return", "new", "throw",
+    "function", "typeof", "await", "yield", "super", "this", "import", "export", "delete",
+})
+
+GO_PATTERNS = [
+    Pattern(re.compile(r"func\s+\(\s*\w*\s*\*?\s*(?P<parent>\w+)(?:\[[^\]]*\])?\s*\)\s*(?P<name>\w+)"), "function"),
+    Pattern(re.compile(r"func\s+(?P<name>\w+)"), "function"),
+    Pattern(re.compile(r"(?:type\s+|\t)(?P<name>\w+)(?:\[[^\]]*\])?\s+struct\b"), "struct"),
+    Pattern(re.compile(r"(?:type\s+|\t)(?P<name>\w+)(?:\[[^\]]*\])?\s+interface\b"), "interface"),
+    Pattern(re.compile(r"type\s+(?P<name>\w+)\b(?!\s*\()"), "type"),
+    Pattern(re.compile(r"(?:const|var)\s+(?P<name>\w+)\b(?!\s*\()"), "variable"),
+]
+
+RUST_VISIBILITY = r"\s*(?:pub(?:\([^)]*\))?\s+)?"
+RUST_PATTERNS = [
+    Pattern(re.compile(RUST_VISIBILITY + r"(?:default\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?fn\s+(?P<name>\w+)"), "function"),
+    Pattern(re.compile(RUST_VISIBILITY + r"struct\s+(?P<name>\w+)"), "struct"),
+    Pattern(re.compile(RUST_VISIBILITY + r"enum\s+(?P<name>\w+)"), "enum"),
+    Pattern(re.compile(RUST_VISIBILITY + r"(?:unsafe\s+)?trait\s+(?P<name>\w+)"), "trait", container=True),
+    Pattern(re.compile(r"\s*(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:]+(?:<[^>]*>)?\s+for\s+)?(?:[\w]+::)*(?P<name>\w+)"), "impl", container=True),
+    Pattern(re.compile(RUST_VISIBILITY + r"type\s+(?P<name>\w+)"), "type"),
+    Pattern(re.compile(RUST_VISIBILITY + r"mod\s+(?P<name>\w+)"), "module"),
+    Pattern(re.compile(RUST_VISIBILITY + r"(?:const|static)\s+(?:mut\s+)?(?P<name>\w+)\s*:"), "variable"),
+    Pattern(re.compile(r"\s*macro_rules!\s*(?P<name>\w+)"), "macro"),
+]
+
+TS_PREFIX = r"\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?"
+TS_PATTERNS = [
+    Pattern(re.compile(TS_PREFIX + r"(?:abstract\s+)?class\s+(?P<name>\w+)"), "class", container=True),
+    Pattern(re.compile(TS_PREFIX + r"interface\s+(?P<name>\w+)"), "interface"),
+    Pattern(re.compile(TS_PREFIX + r"(?:const\s+)?enum\s+(?P<name>\w+)"), "enum"),
+    Pattern(re.compile(TS_PREFIX + r"type\s+(?P<name>\w+)\s*(?:<[^=]*>)?\s*="), "type"),
+    Pattern(re.compile(TS_PREFIX + r"(?:namespace|module)\s+(?P<name>\w+)"), "module"),
+    Pattern(re.compile(TS_PREFIX + r"(?:async\s+)?function\s*\*?\s*(?P<name>\w+)"), "function"),
+    Pattern(re.compile(TS_PREFIX + r"(?:const|let|var)\s+(?P<name>\w+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|(?:\([^)]*\)|\w+)\s*(?::[^=]+)?=>)"), "function"),
+    Pattern(re.compile(r"(?:export\s+)?(?:const|let|var)\s+(?P<name>\w+)"), "variable"),
+]
+TS_MEMBER = re.compile(
+    r"\s+(?:(?:public|private|protected|static|readonly|abstract|override|async|get|set)\s+)*\*?(?P<name>[A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*\("
+)
+
+def parse_go(text: str) -> list[Symbol]:
+    return _parse_braces(text, GO_PATTERNS)
+
+def parse_rust(text: str) -> list[Symbol]:
+    return _parse_braces(text, RUST_PATTERNS)
+
+def parse_typescript(text: str) -> list[Symbol]:
+    return _parse_braces(text, TS_PATTERNS, TS_MEMBER)
+
+PARSERS: dict[str, Callable[[str], list[Symbol]]] = {
+    ".py": parse_python,
+    ".pyi": parse_python,
+    ".go": parse_go,
+    ".rs": parse_rust,
+    ".ts": parse_typescript,
+    ".tsx": parse_typescript,
+    ".js": parse_typescript,
+    ".jsx": parse_typescript,
+    ".mjs": parse_typescript,
+    ".cjs": parse_typescript,
+}
+
+def parser_for(path: str) -> Optional[Callable[[str], list[Symbol]]]:
+    return PARSERS.get(os.path.splitext(path)[1])
+
+def parse(path: str, text: str) -> list[Symbol]:
+    """Definitions in a source file, empty for unsupported languages and files that do not parse."""
+    parser = parser_for(path)
+    if parser is None:
+        return []
+    try:
+        return parser(text)
+    except (SyntaxError, ValueError, RecursionError):
+        return []
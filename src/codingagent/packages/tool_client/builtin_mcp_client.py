@@ -1,16 +1,27 @@
-from typing import Any, Callable, List
+from typing import Any, Callable, List, Optional
+import asyncio
 import inspect
-from mcp import Tool
 
-from codingagent.packages.tools.tool import builtin_tool_from_function, ollama_tool_from_mcp_tool
+from codingagent.packages.tool_client.tool_schemas import builtin_tool_schemas
+from codingagent.packages.tool_client.worker_pool import WorkerPool
+from codingagent.packages.tracing.tracer import tracer
 
 class BuiltinMCPClient:
-    def __init__(self, builtin_tool_commands: list[Callable[..., Any]]):
-        self.tool_schema_list = [builtin_tool_from_function(fn) for fn in builtin_tool_commands]
+    def __init__(self, builtin_tool_commands: list[Callable[..., Any]], worker_pool: Optional[WorkerPool] = None):
+        self.worker_pool = worker_pool or WorkerPool()
+        # cached between runs, building them through mcp and pydantic dominates startup
+        self.tool_schema_list = builtin_tool_schemas(builtin_tool_commands)
         self.command_index = {command.__name__: command for command in builtin_tool_commands}
+        self.read_only_tools = {
+            command.__name__ for command in builtin_tool_commands
+            if getattr(command, "read_only", False)
+        }
     
     async def connect_to_server(self, _: str = "") -> list:
-        return [ollama_tool_from_mcp_tool(tool) for tool in self.tool_schema_list]
+        return list(self.tool_schema_list)
+
+    def is_read_only(self, tool_name: str) -> bool:
+        return tool_name in self.read_only_tools
 
     async def call_tool(self, tool_name, tool_args):
         # confirm tool is a builtin tool
@@ -20,8 +31,13 @@ class BuiltinMCPClient:
         # get a handle to the tool
         command = self.command_index[tool_name]
 
-        # check if we need to await the execution of the command
-        if inspect.iscoroutinefunction(command):
-            return await command(**tool_args)
-        else:
-            return command(**tool_args)
+        with tracer.span("tool", tool_name, server="builtin") as span:
+            # check if we need to await the execution of the command
+            if inspect.iscoroutinefunction(command):
+                result = await asyncio.wait_for(command(**tool_args), self.worker_pool.timeout_for(tool_name))
+            else:
+                # run sync tools off the event loop so independent calls can overlap
+                result = await self.worker_pool.run(tool_name, command, tool_args)
+            if getattr(result, "isError", False):
+                span.set(error="tool error")
+            return result
@@ -1,22 +1,72 @@
+import asyncio
 from contextlib import AsyncExitStack
+from typing import Any, Callable, Optional
 
-from fastmcp import Client
-
+from codingagent.packages.tool_client.tool_catalog import catalog_key, load_catalog, save_catalog
 from codingagent.packages.tools.tool import ollama_tool_from_mcp_tool
+from codingagent.packages.tracing.tracer import tracer
+
+def server_label(server_config: Any) -> str:
+    """Short name of a server for traces: its name(s) in an mcpServers config, otherwise the config itself."""
+    if isinstance(server_config, dict) and isinstance(server_config.get("mcpServers"), dict):
+        return ",".join(server_config["mcpServers"])
+    return str(server_config)[:80]
 
 class MCPClient:
     def __init__(self):
         self.client = None 
         self.exit_stack = AsyncExitStack()
         self._connected = False
+        self.read_only_tools: set[str] = set()
+        self.server_config: Any = None
+        self.tools: list = []
+        # called with (old tools, new tools) when a refresh finds a different catalog than the cached one
+        self.on_catalog_change: Optional[Callable[[list, list], None]] = None
+        self._connect_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def start(self, server_config: Any, lazy: bool = False) -> list:
+        """Returns the server's tools, from the catalog cache when there is one.
+
+        With a cached catalog the connection is made in the background, or on the first
+        tool call when `lazy`. Without one the server has to be asked for its tools first.
+        """
+        self.server_config = server_config
+        cached = load_catalog(catalog_key(server_config))
+        if cached is None:
+            return await self.connect_to_server(server_config)
+
+        self.tools, self.read_only_tools = cached
+        if not lazy:
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self.tools
+
+    async def _refresh(self):
+        try:
+            await self.ensure_connected()
+        except Exception:
+            # reported when a tool of this server is called
+            pass
 
-    async def connect_to_server(self, server_command: str) -> list:
+    async def ensure_connected(self):
+        async with self._connect_lock:
+            if self._connected:
+                return
+            previous = self.tools
+            tools = await self.connect_to_server(self.server_config)
+            if tools != previous and self.on_catalog_change is not None:
+                self.on_catalog_change(previous, tools)
+
+    async def connect_to_server(self, server_command: Any) -> list:
         """Connect to an MCP server
 
         Args:
             server_command: py file to 
         """
 
+        from fastmcp import Client
+
+        self.server_config = server_command
         self.client = await self.exit_stack.enter_async_context(
             Client(server_command)
         )
@@ -24,17 +74,32 @@ class MCPClient:
         self._connected = True
         tools = await self.client.list_tools() 
 
-        return [ollama_tool_from_mcp_tool(tool) for tool in tools]
-            
+        # servers advertise side-effect free tools through the readOnlyHint annotation
+        self.read_only_tools = {
+            tool.name for tool in tools 
+            if tool.annotations is not None and tool.annotations.readOnlyHint
+        }
+
+        self.tools = [ollama_tool_from_mcp_tool(tool) for tool in tools]
+        save_catalog(catalog_key(server_command), self.tools, self.read_only_tools)
+        return self.tools
+
+    def is_read_only(self, tool_name: str) -> bool:
+        return tool_name in self.read_only_tools
+
     async def call_tool(self, tool_name, tool_args):
-        return await self.client.call_tool(tool_name, tool_args)
+        with tracer.span("tool", tool_name, server=server_label(self.server_config)) as span:
+            if not self._connected:
+                span.set(connect=True)
+                await self.ensure_connected()
+            return await self.client.call_tool(tool_name, tool_args)
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
         if self._connected:
             await self.client.close()
             await self.exit_stack.aclose()
-
-
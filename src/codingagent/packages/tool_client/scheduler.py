@@ -0,0 +1,86 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# arguments that name the file or directory a tool operates on
+PATH_ARGUMENTS = ("file_path", "path")
+
+@dataclass
+class ScheduledCall:
+    tool_call: dict
+    read_only: bool
+    path: Optional[str]
+    task: asyncio.Task
+
+def tool_call_path(args: dict) -> Optional[str]:
+    for argument in PATH_ARGUMENTS:
+        value = args.get(argument)
+        if isinstance(value, str) and value:
+            return os.path.abspath(value)
+    return None
+
+def paths_overlap(a: str, b: str) -> bool:
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+def conflicts(earlier: ScheduledCall, read_only: bool, path: Optional[str]) -> bool:
+    # readers never block each other
+    if earlier.read_only and read_only:
+        return False
+    # a write without a known target could touch anything
+    if earlier.path is None or path is None:
+        return True
+    return paths_overlap(earlier.path, path)
+
+class ToolScheduler:
+    """Runs the tool calls of a model turn concurrently where that is safe.
+
+    Read-only calls run in parallel, a writing call waits for every earlier call that touches
+    an overlapping path (or for all earlier calls when its target is unknown), and later calls
+    wait for it in turn. Results are joined in the order the calls were submitted.
+    """
+
+    def __init__(self, mcp_client_index: Dict[str, Any], max_concurrency: int = 8):
+        self.mcp_client_index = mcp_client_index
+        self.calls: list[ScheduledCall] = []
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    def is_read_only(self, tool_name: str) -> bool:
+        client = self.mcp_client_index.get(tool_name)
+        return client is not None and client.is_read_only(tool_name)
+
+    def submit(self, tool_call: dict) -> asyncio.Task:
+        read_only = self.is_read_only(tool_call["name"])
+        path = tool_call_path(tool_call["args"])
+        dependencies = [call.task for call in self.calls if conflicts(call, read_only, path)]
+
+        task = asyncio.create_task(self._run(tool_call, dependencies))
+        self.calls.append(ScheduledCall(tool_call, read_only, path, task))
+        return task
+
+    def is_submitted(self, tool_call: dict) -> bool:
+        return any(call.tool_call is tool_call for call in self.calls)
+
+    async def _run(self, tool_call: dict, dependencies: list[asyncio.Task]):
+        if dependencies:
+            await asyncio.wait(dependencies)
+
+        # determine client we can use to interact with the server
+        try:
+            client = self.mcp_client_index[tool_call["name"]]
+        except KeyError:
+            raise ValueError(f"can not find client for tool {tool_call['name']}")
+
+        async with self._semaphore:
+            return await client.call_tool(tool_call["name"], tool_call["args"])
+
+    async def join(self) -> list[tuple[dict, Any]]:
+        """Waits for all submitted calls and returns (tool_call, result or exception) in submission order."""
+        calls, self.calls = self.calls, []
+        results = await asyncio.gather(*(call.task for call in calls), return_exceptions=True)
+        return [(call.tool_call, result) for call, result in zip(calls, results)]
+
+    def cancel(self):
+        for call in self.calls:
+            call.task.cancel()
+        self.calls = []
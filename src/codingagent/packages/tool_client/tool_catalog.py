@@ -0,0 +1,34 @@
+import hashlib
+import json
+import os
+from typing import Any, Optional
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+
+CATALOG_VERSION = 1
+
+def catalog_key(server_config: Any) -> str:
+    """Hash of an MCP server config, a changed command or environment gets a fresh catalog."""
+    encoded = json.dumps({"version": CATALOG_VERSION, "server": server_config}, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def catalog_path(key: str) -> str:
+    return os.path.join(cache_dir("mcp_catalogs"), f"{key}.json")
+
+def load_catalog(key: str) -> Optional[tuple[list[dict], set[str]]]:
+    """Returns the cached (ollama tools, read-only tool names) for a server, None if there is no usable cache."""
+    try:
+        with open(catalog_path(key), "r") as f:
+            body = json.load(f)
+        return body["tools"], set(body["read_only"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_catalog(key: str, tools: list[dict], read_only: set[str]):
+    body = {"tools": tools, "read_only": sorted(read_only)}
+    try:
+        atomic_write(catalog_path(key), json.dumps(body).encode("utf-8"))
+    except OSError:
+        # the cache only speeds up startup, never fail a connection over it
+        pass
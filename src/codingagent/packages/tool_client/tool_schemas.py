@@ -0,0 +1,83 @@
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+from typing import Any, Callable
+
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.cache import cache_dir
+from codingagent.packages.tools.tool import builtin_tool_from_function, ollama_tool_from_mcp_tool
+
+SCHEMA_VERSION = 1
+
+# libraries that generate the schemas, a reinstall invalidates the cache
+SCHEMA_LIBRARIES = ("mcp", "pydantic")
+
+# schema files kept per environment, configs enabling different tools each have their own
+MAX_CACHED_SCHEMAS = 8
+
+def _library_stamp(name: str) -> str:
+    # find_spec locates a top level package without importing it
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.origin is None:
+        return f"{name}:missing"
+    try:
+        return f"{name}:{spec.origin}:{os.stat(spec.origin).st_mtime_ns}"
+    except OSError:
+        return f"{name}:{spec.origin}"
+
+def environment_key() -> str:
+    """Hash of the schema format, python version and the libraries generating the schemas."""
+    digest = hashlib.sha256(f"{SCHEMA_VERSION}:{sys.version_info[:2]}".encode())
+    for library in SCHEMA_LIBRARIES:
+        digest.update(_library_stamp(library).encode())
+    return digest.hexdigest()[:16]
+
+def schema_key(commands: list[Callable[..., Any]]) -> str:
+    """Hash of everything a tool schema is derived from: name, signature, docstring and read-only flag.
+
+    Signatures and docstrings are used rather than source files, they survive compilation
+    into the standalone binary where there are no sources to read.
+    """
+    digest = hashlib.sha256()
+    for fn in commands:
+        digest.update(f"{fn.__module__}.{fn.__name__}{inspect.signature(fn)}".encode())
+        digest.update((fn.__doc__ or "").encode())
+        digest.update(str(getattr(fn, "read_only", False)).encode())
+    return digest.hexdigest()
+
+def builtin_tool_schemas(commands: list[Callable[..., Any]]) -> list[dict]:
+    """Ollama tool specs for the builtin tools, generated through mcp on a cache miss only."""
+    directory = cache_dir("tool_schemas")
+    # the environment prefix tells files of older installs apart from other tool sets of this one
+    prefix = environment_key()
+    path = os.path.join(directory, f"{prefix}-{schema_key(commands)}.json")
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    schemas = [ollama_tool_from_mcp_tool(builtin_tool_from_function(fn)) for fn in commands]
+    try:
+        atomic_write(path, json.dumps(schemas).encode("utf-8"))
+        _prune(directory, prefix)
+    except OSError:
+        pass
+    return schemas
+
+def _prune(directory: str, prefix: str):
+    """Removes schemas written by other environments, and the oldest ones beyond MAX_CACHED_SCHEMAS."""
+    current = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".json"):
+            continue
+        if entry.name.startswith(f"{prefix}-"):
+            current.append((entry.stat().st_mtime_ns, entry.path))
+        else:
+            os.remove(entry.path)
+    current.sort(reverse=True)
+    for _, path in current[MAX_CACHED_SCHEMAS:]:
+        os.remove(path)
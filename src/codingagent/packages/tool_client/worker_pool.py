@@ -0,0 +1,238 @@
+import asyncio
+import contextvars
+import multiprocessing
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from codingagent.packages.tools.tool import set_current_call
+
+# seconds a builtin tool may run before it is abandoned and its child processes are killed
+DEFAULT_TIMEOUT = 120
+
+# tools that legitimately run for longer, overridden by the tool_timeouts passed to the pool
+DEFAULT_TOOL_TIMEOUTS = {"sub_agent_launch": 900}
+
+@dataclass
+class WorkerCall:
+    tool_name: str
+    submitted: float = field(default_factory=time.monotonic)
+    started: Optional[float] = None
+    abandoned: bool = False
+    processes: list[subprocess.Popen] = field(default_factory=list)
+
+    def add_process(self, proc: subprocess.Popen):
+        self.processes.append(proc)
+        # the call may have been abandoned before the tool got to start this process
+        if self.abandoned:
+            proc.kill()
+
+    def kill_processes(self):
+        for proc in self.processes:
+            if proc.poll() is None:
+                proc.kill()
+
+@dataclass
+class ProcessPool:
+    executor: ProcessPoolExecutor
+    # futures still running on the pool, without the abandoned ones
+    active: set[Future] = field(default_factory=set)
+    retired: bool = False
+    # worker processes, captured when the pool is retired
+    workers: list = field(default_factory=list)
+
+    def kill_workers(self):
+        for process in self.workers:
+            if process.is_alive():
+                process.kill()
+
+@dataclass
+class PoolMetrics:
+    # process workers can not report when they start, for the process pool queued counts calls until they finish
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    timed_out: int = 0
+    cancelled: int = 0
+    max_queued: int = 0
+    # seconds calls spent waiting for a free worker
+    queue_wait: float = 0.0
+
+def _invoke(call: WorkerCall, fn: Callable[..., Any], kwargs: dict, metrics: PoolMetrics, lock: threading.Lock):
+    with lock:
+        if call.abandoned:
+            # timed out or cancelled while it was waiting for this worker
+            return None
+        call.started = time.monotonic()
+        metrics.queued -= 1
+        metrics.running += 1
+        metrics.queue_wait += call.started - call.submitted
+    set_current_call(call)
+    try:
+        return fn(**kwargs)
+    finally:
+        set_current_call(None)
+        with lock:
+            metrics.running -= 1
+            metrics.completed += 1
+
+class WorkerPool:
+    """Runs synchronous builtin tools off the event loop.
+
+    Tools run on a bounded thread pool, tools listed in `process_tools` on a process pool
+    (they must not depend on state of the agent process, like the read-before-write check).
+    A call that exceeds its timeout or is cancelled is abandoned: child processes it registered
+    with `track_process` are killed so the worker thread unblocks. A process worker can not be
+    interrupted without breaking its pool, so the pool is retired instead: new calls go to a
+    fresh pool, the other calls on the old one finish, and then its workers are killed.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 8,
+        max_processes: int = 0,
+        process_tools: Optional[list[str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        tool_timeouts: Optional[dict[str, float]] = None,
+    ):
+        self.max_processes = max_processes
+        self.process_tools = set(process_tools or ()) if max_processes > 0 else set()
+        self.timeout = timeout
+        self.tool_timeouts = {**DEFAULT_TOOL_TIMEOUTS, **(tool_timeouts or {})}
+        self.threads = ThreadPoolExecutor(max_workers=max(1, max_threads), thread_name_prefix="builtin-tool")
+        self.processes: Optional[ProcessPool] = None
+        self.retired: list[ProcessPool] = []
+        self.thread_metrics = PoolMetrics()
+        self.process_metrics = PoolMetrics()
+        self._lock = threading.Lock()
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        timeout = self.tool_timeouts.get(tool_name, self.timeout)
+        return timeout if timeout and timeout > 0 else None
+
+    def _submit_process(self, fn: Callable[..., Any], kwargs: dict) -> tuple[ProcessPool, Future]:
+        with self._lock:
+            if self.processes is None:
+                # forkserver keeps the workers free of the event loop and threads of this process
+                self.processes = ProcessPool(ProcessPoolExecutor(
+                    max_workers=self.max_processes,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                ))
+            pool = self.processes
+            future = pool.executor.submit(_call_with_kwargs, fn, kwargs)
+            pool.active.add(future)
+        future.add_done_callback(lambda done: self._process_finished(pool, done))
+        return pool, future
+
+    def _process_finished(self, pool: ProcessPool, future: Future):
+        with self._lock:
+            pool.active.discard(future)
+            idle = pool.retired and not pool.active
+        if idle:
+            self._kill_retired(pool)
+
+    def _kill_retired(self, pool: ProcessPool):
+        with self._lock:
+            if pool not in self.retired:
+                return
+            self.retired.remove(pool)
+        pool.kill_workers()
+
+    async def run(self, tool_name: str, fn: Callable[..., Any], kwargs: dict) -> Any:
+        loop = asyncio.get_running_loop()
+        call = WorkerCall(tool_name)
+        in_process = tool_name in self.process_tools
+        metrics = self.process_metrics if in_process else self.thread_metrics
+
+        with self._lock:
+            metrics.queued += 1
+            metrics.max_queued = max(metrics.max_queued, metrics.queued)
+
+        if in_process:
+            pool, process_future = self._submit_process(fn, kwargs)
+            future = asyncio.wrap_future(process_future, loop=loop)
+            future.add_done_callback(lambda done: self._process_done(done, metrics))
+        else:
+            # like asyncio.to_thread, tools see the context variables of the calling task
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self.threads, context.run, _invoke, call, fn, kwargs, metrics, self._lock)
+
+        timeout = self.timeout_for(tool_name)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            if in_process:
+                self._abandon_process(pool, process_future)
+            else:
+                self._abandon(call, metrics)
+            with self._lock:
+                metrics.timed_out += 1
+            raise TimeoutError(f"{tool_name} timed out after {timeout} seconds")
+        except asyncio.CancelledError:
+            if in_process:
+                self._abandon_process(pool, process_future)
+            else:
+                self._abandon(call, metrics)
+            with self._lock:
+                metrics.cancelled += 1
+            raise
+
+    def _process_done(self, future: asyncio.Future, metrics: PoolMetrics):
+        with self._lock:
+            metrics.queued -= 1
+            if not future.cancelled():
+                metrics.completed += 1
+
+    def _abandon(self, call: WorkerCall, metrics: PoolMetrics):
+        with self._lock:
+            call.abandoned = True
+            if call.started is None:
+                # never reached a worker, it returns right away if it still does
+                metrics.queued -= 1
+                return
+        call.kill_processes()
+
+    def _abandon_process(self, pool: ProcessPool, future: Future):
+        # a call still waiting for a worker is simply dropped
+        if future.cancel():
+            return
+        with self._lock:
+            pool.active.discard(future)
+            retire = not pool.retired
+            if retire:
+                pool.retired = True
+                pool.workers = list((getattr(pool.executor, "_processes", None) or {}).values())
+                self.retired.append(pool)
+                if self.processes is pool:
+                    self.processes = None
+            idle = not pool.active
+        if retire:
+            # the other calls on the pool keep running, new calls get a fresh pool
+            pool.executor.shutdown(wait=False)
+        if idle:
+            self._kill_retired(pool)
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            pools = {"threads": self.thread_metrics}
+            if self.process_tools:
+                pools["processes"] = self.process_metrics
+            return {name: dict(vars(metrics)) for name, metrics in pools.items()}
+
+    def shutdown(self):
+        with self._lock:
+            pools = self.retired + ([self.processes] if self.processes is not None else [])
+            self.processes = None
+            self.retired = []
+        for pool in pools:
+            # the only way to stop a task that is already running in a worker
+            pool.workers = list((getattr(pool.executor, "_processes", None) or {}).values()) or pool.workers
+            pool.kill_workers()
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+        self.threads.shutdown(wait=False, cancel_futures=True)
+
+def _call_with_kwargs(fn: Callable[..., Any], kwargs: dict) -> Any:
+    return fn(**kwargs)
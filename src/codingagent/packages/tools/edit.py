@@ -1,47 +1,100 @@
-import fnmatch
-from pathlib import Path
-import subprocess
 import json
+from pathlib import Path
 from typing import List, Optional
 
-from codingagent.packages.tools.tool import Tool, builtin_mcp
+from codingagent.packages.fs import inventory
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.file_cache import file_cache
+from codingagent.packages.tools.tool import builtin_mcp
+
+def parse_edits(old_string: str, new_string: str, replace_all, edits) -> list[dict]:
+    # models sometimes send the batch as a json encoded string
+    if isinstance(edits, str):
+        edits = json.loads(edits) if edits.strip() else None
+    if not edits:
+        edits = [{"old_string": old_string, "new_string": new_string, "replace_all": replace_all}]
+
+    parsed = []
+    for i, edit in enumerate(edits, start=1):
+        old, new = edit.get("old_string", ""), edit.get("new_string", "")
+        if not old:
+            raise ValueError(f"edit {i}: old_string must not be empty")
+        if old == new:
+            raise ValueError(f"edit {i}: old_string and new_string are the same")
+        flag = edit.get("replace_all", False)
+        parsed.append({
+            "old_string": old,
+            "new_string": new,
+            "replace_all": flag if isinstance(flag, bool) else str(flag).lower() == "true",
+        })
+    return parsed
+
+def apply_edits(content: str, edits: list[dict]) -> str:
+    """Applies all edits to `content` in a single pass.
+
+    Every old_string is matched against the original content, must be unique unless
+    replace_all is set, and must not overlap the match of another edit.
+    """
+    spans = []
+    for i, edit in enumerate(edits, start=1):
+        old = edit["old_string"]
+        first = content.find(old)
+        if first == -1:
+            raise ValueError(f"edit {i}: old_string not found in file")
 
-LIMIT = 25000
+        if edit["replace_all"]:
+            position = first
+            while position != -1:
+                spans.append((position, position + len(old), edit["new_string"], i))
+                position = content.find(old, position + len(old))
+        else:
+            if content.find(old, first + 1) != -1:
+                raise ValueError(f"edit {i}: old_string is not unique in file, include more surrounding context or set replace_all")
+            spans.append((first, first + len(old), edit["new_string"], i))
+
+    spans.sort()
+    for previous, current in zip(spans, spans[1:]):
+        if current[0] < previous[1]:
+            raise ValueError(f"edits {previous[3]} and {current[3]} overlap")
+
+    parts = []
+    last = 0
+    for start, end, new, _ in spans:
+        parts.append(content[last:start])
+        parts.append(new)
+        last = end
+    parts.append(content[last:])
+    return "".join(parts)
 
 @builtin_mcp
-def edit_tool(path: str, ignore: Optional[List[str]] = None) -> str:
-    """Performs exact string replacements in files. 
+def edit_tool(file_path: str, old_string: str = "", new_string: str = "", replace_all: bool = False, edits: Optional[List[dict]] = None) -> str:
+    """Performs exact string replacements in files.
     Usage:
     - You must use your read_file tool at least once in the conversation before editing. This tool will error if you attempt
       an edit without reading the file.
     - When editing text from Read tool output, ensure you preserve the exact indentation (tabs/spaces) as it appears AFTER the line number prefix. The line number prefix format is: spaces + line number + tab. Everything after that tab is the actual file content to match. Never include any part of the line number prefix in the old_string or new_string.
+    - The file_path parameter must be an absolute path.
+    - old_string must match the file content exactly and be unique in the file, include enough surrounding lines to make it unique or set replace_all to replace every occurrence.
+    - To make several changes to one file, pass a list of {"old_string", "new_string", "replace_all"} objects as edits instead of old_string/new_string.
+      All edits are matched against the file as it was before the call and must not overlap; either all of them are applied or none.
     - ALWAYS prefer editing existing files in the codebase. NEVER write new files unless explicitly required.
     - Only use emojis if the user explicitly requests it. Avoid adding emojis to files unless asked.
     """
 
-    p = Path(path)
+    p = Path(file_path)
     if not p.is_absolute():
-        raise ValueError(f"Path must be absolute: {path}")
+        raise ValueError(f"Path must be absolute: {file_path}")
     if not p.exists():
-        raise FileNotFoundError(f"Path does not exist: {path}")
-
-    # Run `ls -A` (includes hidden files, excludes . and ..)
-    result = subprocess.run(
-        ["ls", "-A", str(p)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=True
-    )
-
-    files = result.stdout.strip().split("\n") if result.stdout else []
-    ignore = ignore or []
-
-    filtered = []
-    for f in files:
-        full_path = str(p / f)
-        if any(fnmatch(full_path, pattern) for pattern in ignore):
-            continue
-        filtered.append(full_path)
-
-    return json.dumps(filtered)
+        raise FileNotFoundError(f"Path does not exist: {file_path}")
+
+    parsed = parse_edits(old_string, new_string, replace_all, edits)
+
+    # the file must have been read (and not changed since) before it is edited
+    file_cache.check_can_modify(file_path)
+    content = file_cache.read_text(file_path)
+
+    atomic_write(file_path, apply_edits(content, parsed).encode("utf-8"))
+    file_cache.record_write(file_path)
+    inventory.refresh_path(file_path)
+
+    return f"Applied {len(parsed)} edit(s) to {file_path}"
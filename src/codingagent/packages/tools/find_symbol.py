@@ -0,0 +1,73 @@
+import json
+import os
+
+from codingagent.packages.tools.tool import builtin_mcp
+
+# max definitions and referencing lines returned per call
+DEFINITION_LIMIT = 50
+REFERENCE_LIMIT = 100
+
+# names suggested when nothing is called `name`
+SUGGESTION_LIMIT = 20
+
+TRUNCATED = "__TRUNCATED__"
+
+@builtin_mcp(read_only=True)
+def find_symbol(name: str, kind: str = "", references: bool = False, path: str = "") -> str:
+    """Finds where a function, class, method, type or variable is defined, from an index of the repository's Python, Go, Rust and TypeScript/JavaScript code.
+    Prefer this over grep or glob_tool when looking for a definition by name; it answers immediately with the file, the line range and the signature.
+
+    Usage:
+    - name: the symbol's name, e.g. "load_config", or qualified by its class, impl or receiver type, e.g. "App.run"
+    - kind: optional filter, one of function, method, class, struct, interface, trait, enum, type, variable, attribute, module, macro
+    - references: set to true to also list the lines that use the name (whole word matches in indexed files, up to 100)
+    - path: optional directory or file to restrict definitions and references to, relative to the working directory
+    - When nothing matches, similarly named symbols are suggested
+    """
+
+    try:
+        from codingagent.packages.symbols.index import index_for
+
+        root = os.getcwd()
+        index = index_for(root)
+        prefix = ""
+        if path:
+            prefix = os.path.relpath(os.path.abspath(path), root)
+            prefix = "" if prefix == "." else prefix
+        directory = prefix.rstrip("/") + "/"
+
+        parent = ""
+        if "." in name or "::" in name:
+            parent, _, name = name.replace("::", ".").rpartition(".")
+            parent = parent.rpartition(".")[2]
+
+        definitions = [
+            (relative, symbol) for relative, symbol in index.lookup(name, kind.strip(), parent)
+            if not prefix or relative == prefix or relative.startswith(directory)
+        ]
+        if not definitions:
+            similar = index.similar(name, SUGGESTION_LIMIT)
+            if not similar:
+                return f"No symbol named {name} found"
+            return f"No symbol named {name} found, similar names: " + ", ".join(similar)
+
+        output = []
+        for relative, symbol in definitions[:DEFINITION_LIMIT]:
+            owner = f" in {symbol.parent}" if symbol.parent else ""
+            output.append(f"{relative}:{symbol.line}-{symbol.end} {symbol.kind} {symbol.name}{owner}")
+            output.append(f"    {symbol.signature}")
+        if len(definitions) > DEFINITION_LIMIT:
+            output.append(TRUNCATED)
+
+        if str(references).lower() == "true":
+            lines, more = index.references(name, REFERENCE_LIMIT, prefix)
+            defined = {(relative, symbol.line) for relative, symbol in definitions}
+            lines = [line for line in lines if (line[0], line[1]) not in defined]
+            output.append("")
+            output.append(f"References ({len(lines)}{'+' if more else ''}):")
+            output.extend(f"{relative}:{number}: {text}" for relative, number, text in lines)
+            if more:
+                output.append(TRUNCATED)
+        return "\n".join(output) + "\n"
+    except Exception as e:
+        return json.dumps({"error": str(e)})
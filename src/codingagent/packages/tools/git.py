@@ -1,6 +1,12 @@
+import os
+import selectors
+import shlex
 import subprocess
+import threading
+import time
+from typing import Optional
 
-from codingagent.packages.tools.tool import builtin_mcp
+from codingagent.packages.tools.tool import builtin_mcp, track_process
 
 # Whitelist of safe git commands (only these allowed)
 SAFE_GIT_COMMANDS = [
@@ -9,19 +15,227 @@ SAFE_GIT_COMMANDS = [
     "cat-file", "rev-list", "for-each-ref", "merge-base"
 ]
 
-LIMIT = 25000  # max output length, can be used if you want
+# options that write files or run other programs, even for whitelisted commands
+UNSAFE_OPTIONS = ("--output", "-O", "--open-files-in-pager", "--upload-pack", "--exec", "--ext-diff")
 
-@builtin_mcp
+LIMIT = 25000  # max output length in bytes
+
+TIMEOUT = 30  # seconds before a git command is killed
+
+TRUNCATED = "__TRUNCATED__"
+
+# never wait on a pager, credential prompt or editor
+GIT_ENV = {**os.environ, "GIT_PAGER": "cat", "PAGER": "cat", "GIT_TERMINAL_PROMPT": "0"}
+
+class CatFileBatch:
+    """A long-lived `git cat-file --batch` process serving object reads for one repository.
+
+    Every read is bounded by TIMEOUT and the process is registered with the calling tool, so a
+    stuck or cancelled read kills it; the next read starts a new one.
+    """
+
+    def __init__(self, cwd: str):
+        self.cwd = cwd
+        self.proc: Optional[subprocess.Popen] = None
+        # output read from the process that is not consumed yet
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+
+    def _ensure_running(self) -> subprocess.Popen:
+        if self.proc is None or self.proc.poll() is not None:
+            self._reset()
+            self.proc = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=GIT_ENV,
+            )
+        return self.proc
+
+    def _reset(self):
+        proc, self.proc = self.proc, None
+        self.buffer = bytearray()
+        if proc is None:
+            return
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def _receive(self, selector: selectors.BaseSelector, proc: subprocess.Popen, deadline: float):
+        """Appends the next chunk of output to the buffer, raises TimeoutError once `deadline` passes."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"git cat-file timed out after {TIMEOUT} seconds")
+            if selector.select(remaining):
+                break
+        chunk = os.read(proc.stdout.fileno(), 1 << 16)
+        if not chunk:
+            raise OSError("git cat-file exited")
+        self.buffer += chunk
+
+    def read(self, object_name: str, limit: int) -> Optional[tuple[str, int, bytes]]:
+        """Returns (type, size, content truncated to `limit` bytes), or None if the object does not exist."""
+        if "\n" in object_name:
+            raise ValueError("object names can not contain newlines")
+
+        with self.lock:
+            proc = track_process(self._ensure_running())
+            deadline = time.monotonic() + TIMEOUT
+            try:
+                with selectors.DefaultSelector() as selector:
+                    selector.register(proc.stdout, selectors.EVENT_READ)
+                    proc.stdin.write(object_name.encode() + b"\n")
+                    proc.stdin.flush()
+
+                    while b"\n" not in self.buffer:
+                        self._receive(selector, proc, deadline)
+                    newline = self.buffer.index(b"\n")
+                    header = self.buffer[:newline].decode().split()
+                    del self.buffer[:newline + 1]
+
+                    if len(header) != 3:
+                        # "<name> missing" or "<name> ambiguous"
+                        return None
+                    _, object_type, size = header
+                    size = int(size)
+
+                    # the whole object and the newline after it have to be consumed to keep the stream in sync
+                    content = bytearray()
+                    remaining = size + 1
+                    while True:
+                        take = min(remaining, len(self.buffer))
+                        if len(content) < limit:
+                            content += self.buffer[:min(take, limit - len(content))]
+                        del self.buffer[:take]
+                        remaining -= take
+                        if remaining == 0:
+                            break
+                        self._receive(selector, proc, deadline)
+                    return object_type, size, bytes(content[:min(size, limit)])
+            except OSError:
+                # timed out, killed with its tool call or broken pipe, start over on the next read
+                self._reset()
+                raise
+
+_batches: dict[str, CatFileBatch] = {}
+_batches_lock = threading.Lock()
+
+def cat_file_batch(cwd: str) -> CatFileBatch:
+    with _batches_lock:
+        if cwd not in _batches:
+            _batches[cwd] = CatFileBatch(cwd)
+        return _batches[cwd]
+
+def batch_object(args: list[str]) -> Optional[tuple[str, Optional[str]]]:
+    """If the command can be answered by `git cat-file --batch`, returns (object name, cat-file mode)."""
+    if args[0] == "show" and len(args) == 2 and ":" in args[1] and not args[1].startswith("-"):
+        # `show <rev>:<path>` prints the blob content
+        return args[1], "blob-content"
+    if args[0] == "cat-file" and len(args) == 3 and args[1] in ("-p", "-t", "-s", "-e"):
+        return args[2], args[1]
+    if args[0] == "cat-file" and len(args) == 3 and args[1] in ("blob", "commit", "tree", "tag"):
+        return args[2], args[1]
+    return None
+
+def run_batch(args: list[str]) -> Optional[str]:
+    """Answers show/cat-file through the persistent reader, None if the plain command has to run."""
+    target = batch_object(args)
+    if target is None:
+        return None
+    object_name, mode = target
+
+    result = cat_file_batch(os.getcwd()).read(object_name, LIMIT)
+    if result is None:
+        if mode == "-e":
+            return "Error: object does not exist"
+        return None  # let git produce its own error message
+    object_type, size, content = result
+
+    if mode == "-t":
+        return object_type
+    if mode == "-s":
+        return str(size)
+    if mode == "-e":
+        return ""
+    # trees are stored in a binary format, only git can pretty print them
+    if object_type == "tree":
+        return None
+    if mode in ("blob", "commit", "tag") and mode != object_type:
+        return None
+    if mode == "blob-content" and object_type != "blob":
+        return None
+
+    output = content.decode("utf-8", errors="replace")
+    if size > len(content):
+        output += f"\n{TRUNCATED}\n"
+    return output.strip()
+
+def run_streaming(args: list[str]) -> str:
+    """Runs git without a shell, reading output until it exits, LIMIT bytes are read or TIMEOUT passes."""
+    proc = track_process(subprocess.Popen(
+        ["git", "--no-pager", *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=GIT_ENV,
+    ))
+
+    chunks = []
+    size = 0
+    truncated = False
+    timed_out = False
+    deadline = time.monotonic() + TIMEOUT
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            if not selector.select(remaining):
+                continue
+            chunk = os.read(proc.stdout.fileno(), 1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= LIMIT:
+                truncated = True
+                break
+
+    # stop the command as soon as we have all we are going to return
+    if proc.poll() is None:
+        proc.kill()
+    proc.wait()
+    proc.stdout.close()
+
+    output = b"".join(chunks)[:LIMIT].decode("utf-8", errors="replace").strip()
+    if truncated:
+        output += f"\n{TRUNCATED}\n"
+    if timed_out:
+        output += f"\nError: git command timed out after {TIMEOUT} seconds"
+    return output
+
+@builtin_mcp(read_only=True)
 def git(command: str) -> str:
     """
     Execute a git command safely with sandbox and timeout.
     Only allows commands in SAFE_GIT_COMMANDS whitelist (after stripping 'git ' prefix).
-    
+
     Parameters:
     - command: The git command string **without** the initial 'git', e.g. "status" or "log -1"
-    
+
     Returns:
     - Command stdout or error messages.
+    - Output is limited to 25000 bytes, if the last line only contains the word '__TRUNCATED__' narrow down the command (e.g. a path or -n).
     """
 
     # validate command starts with allowed git subcommand
@@ -33,20 +247,19 @@ def git(command: str) -> str:
     ):
         return f"Error: The git command '{stripped_command}' is not allowed for security reasons."
 
-    full_cmd = "git " + stripped_command
+    try:
+        args = shlex.split(stripped_command)
+    except ValueError as e:
+        return f"Error: Could not parse command: {e}"
+
+    if any(arg.startswith(UNSAFE_OPTIONS) for arg in args[1:]):
+        return f"Error: The git command '{stripped_command}' uses an option that is not allowed for security reasons."
 
     try:
-        proc = subprocess.run(
-            full_cmd,
-            shell=True,
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.STDOUT,
-            text=True,
-        )
-        output = proc.stdout
+        output = run_batch(args)
+        if output is None:
+            output = run_streaming(args)
     except Exception as e:
         return f"Error: Exception running command: {e}"
 
-    # Optionally truncate output if longer than LIMIT (not shown here)
-    return output.strip()
-
+    return output
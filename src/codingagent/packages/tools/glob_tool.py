@@ -1,37 +1,79 @@
-import glob
+import heapq
 import os
 import json
+import time
 
+from codingagent.packages.fs import inventory
+from codingagent.packages.fs.walk import compile_glob, split_glob, walk
 from codingagent.packages.tools.tool import builtin_mcp
 
 LIMIT = 10000
 
-@builtin_mcp
+# seconds spent walking before returning the best matches found so far
+TIMEOUT = 10
+
+TRUNCATED = "__TRUNCATED__"
+
+@builtin_mcp(read_only=True)
 def glob_tool(root_directory: str, pattern: str = "") -> str:
     """Fast file pattern matching tool that works with any codebase size. 
     - The root directory is the directory to start the file matching from (it is recursive)
     - Supports patterns like **/*.ts for trying to recursively find the files in subdirectories
     - Supports glob patterns like "***.ts"
-    - Returns matching file paths sorted by modification time
+    - Patterns are relative to the root directory, absolute patterns are rejected
+    - Returns absolute paths of matching files sorted by modification time (most recent first)
+    - Directories ignored by .gitignore files, .git, node_modules, build output and virtualenvs are skipped
+    - If the last entry is '__TRUNCATED__' the search was stopped early, narrow down the root directory or pattern
     - Use this tool when you need to find files by name patterns
     - When you are doing an open ended search that may require multiple rounds of globbing and grepping, use the Agent tool instead
     - You have the capability to call multiple tools in a single response. It is always better to speculatively perform multiple searches as a batch that are potentially useful.
     """
 
-    files = glob.glob(pattern, root_dir=root_directory, recursive=True)
-    files_with_mtime = []
-    for f in files:
-        try:
-            mtime = os.path.getmtime(f)
-            files_with_mtime.append((f, mtime))
-        except FileNotFoundError:
-            continue
+    root = os.path.abspath(root_directory)
+    # os.path.join would drop root for an absolute pattern and walk from there instead
+    if os.path.isabs(pattern):
+        raise ValueError(f"pattern {pattern!r} is absolute, pass the directory as root_directory and a pattern relative to it")
+    base, rest, max_depth = split_glob(pattern or "**/*")
+    regex = compile_glob(rest)
+
+    # keep only the LIMIT most recently modified matches
+    newest: list[tuple[float, str]] = []
+    def consider(mtime: float, path: str):
+        if len(newest) < LIMIT:
+            heapq.heappush(newest, (mtime, path))
+        else:
+            heapq.heappushpop(newest, (mtime, path))
+
+    timed_out = False
+    start = os.path.join(root, base)
+    tracked = inventory.covering(start)
+    if tracked is not None:
+        # match against the in-memory inventory, no filesystem access needed
+        prefix = len(start.rstrip(os.sep)) + 1
+        for record in tracked.files(start):
+            path = record.path[prefix:]
+            if max_depth is not None and path.count("/") >= max_depth:
+                continue
+            if regex.fullmatch(path):
+                consider(record.mtime, record.path)
+    else:
+        deadline = time.monotonic() + TIMEOUT
+        def should_stop():
+            nonlocal timed_out
+            timed_out = time.monotonic() > deadline
+            return timed_out
 
-    files_with_mtime.sort(key=lambda x: x[1], reverse=True)
-    sorted_files = [f for f, _ in files_with_mtime]
+        for path, entry in walk(start, max_depth=max_depth, should_stop=should_stop):
+            if not regex.fullmatch(path):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            consider(mtime, entry.path)
 
-    if len(sorted_files) > LIMIT:
-        sorted_files = sorted_files[:LIMIT]
+    sorted_files = [f for _, f in sorted(newest, reverse=True)]
+    if timed_out:
+        sorted_files.append(TRUNCATED)
 
     return json.dumps(sorted_files)
-        
@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
+
+from codingagent.packages.fs import inventory
+from codingagent.packages.fs.search import search_files
+from codingagent.packages.fs.walk import compile_glob, walk
+from codingagent.packages.tools.tool import builtin_mcp
+
+# max matching lines returned per call
+LIMIT = 200
+
+# files handed to a worker at a time
+BATCH_SIZE = 64
+
+# searches over fewer files than this stay in threads, larger ones are spread over processes
+PROCESS_THRESHOLD = 1024
+
+WORKERS = os.cpu_count() or 1
+
+TRUNCATED = "__TRUNCATED__"
+
+_thread_pool: ThreadPoolExecutor | None = None
+_process_pool: ProcessPoolExecutor | None = None
+
+def thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=min(32, WORKERS * 2), thread_name_prefix="grep")
+    return _thread_pool
+
+def process_pool() -> ProcessPoolExecutor:
+    # the agent runs tools in threads, forking it directly could copy a held lock
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _process_pool
+
+def shutdown():
+    """Stops the search pools, called when the agent exits."""
+    global _thread_pool, _process_pool
+    threads, _thread_pool = _thread_pool, None
+    processes, _process_pool = _process_pool, None
+    if threads is not None:
+        threads.shutdown(wait=False, cancel_futures=True)
+    if processes is not None:
+        processes.shutdown(wait=False, cancel_futures=True)
+
+def candidate_files(root: str, glob: str):
+    """Yields (path, display path) for the files to search, in walk order."""
+    if os.path.isfile(root):
+        yield root, root
+        return
+
+    # a glob without a '/' matches file names at any depth, like rg --glob
+    regex = compile_glob(glob if "/" in glob else "**/" + glob) if glob else None
+
+    # list candidates from the inventory when it tracks this directory
+    tracked = inventory.covering(root)
+    if tracked is not None:
+        prefix = len(root.rstrip(os.sep)) + 1
+        for record in tracked.files(root):
+            if regex is None or regex.fullmatch(record.path[prefix:]):
+                yield record.path, record.path
+        return
+
+    for path, entry in walk(root):
+        if regex is None or regex.fullmatch(path):
+            yield entry.path, entry.path
+
+def run_search(executor: Executor, files, pattern: str, ignore_case: bool, context: int, limit: int) -> tuple[list[str], bool]:
+    """Searches batches of files with a bounded number of batches in flight, consuming results in order."""
+    output = []
+    matches = 0
+    pending = deque()
+
+    def submit_next() -> bool:
+        batch = list(islice(files, BATCH_SIZE))
+        if batch:
+            pending.append(executor.submit(search_files, batch, pattern, ignore_case, context, limit))
+        return bool(batch)
+
+    while len(pending) < WORKERS * 2 and submit_next():
+        pass
+
+    truncated = False
+    while pending:
+        lines, count = pending.popleft().result()
+        if not count:
+            submit_next()
+            continue
+
+        if output and context:
+            output.append("--")
+        for line, is_match in lines:
+            if is_match:
+                # batches run concurrently, so each may return up to the limit on its own
+                if matches == limit:
+                    truncated = True
+                    break
+                matches += 1
+            output.append(line)
+
+        if matches == limit:
+            # a batch stops searching at the limit, and batches or files may be left unsearched
+            truncated = truncated or count >= limit or bool(pending) or next(files, None) is not None
+            break
+        submit_next()
+
+    while output and output[-1] == "--":
+        output.pop()
+    for future in pending:
+        future.cancel()
+    return output, truncated
+
+@builtin_mcp(read_only=True)
+def grep(pattern: str, path: str, glob: str = "", case_insensitive: bool = False, context: int = 0) -> str:
+    """A powerful content search tool, use it to find where code, symbols or text appear in a codebase.
+    - Supports full regular expression syntax (e.g. "log.*Error", "def\\s+\\w+"), matched line by line
+    - The path parameter must be an absolute path to a directory (searched recursively) or a single file
+    - Filter the files searched with the glob parameter (e.g. "*.py", "src/**/*.ts")
+    - Set case_insensitive to true to ignore case, and context to the number of lines to show around each match
+    - Directories ignored by .gitignore files, .git, node_modules, build output, virtualenvs and binary files are skipped
+    - Returns matches as path:line:text (context lines as path-line-text), at most 200 matching lines
+    - If the last line only contains the word '__TRUNCATED__' there were more matches, narrow down the pattern, path or glob
+    - You have the capability to call multiple tools in a single response. It is always better to speculatively perform multiple searches as a batch that are potentially useful.
+    """
+
+    if not os.path.isabs(path):
+        raise ValueError(f"Path must be absolute: {path}")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+
+    # arguments may arrive as strings
+    ignore_case = case_insensitive if isinstance(case_insensitive, bool) else str(case_insensitive).lower() == "true"
+    context = max(int(context or 0), 0)
+    try:
+        re.compile(pattern.encode("utf-8"))
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression: {e}")
+
+    # look ahead to decide whether the search is big enough to be worth spreading over processes
+    files = candidate_files(path, glob)
+    head = list(islice(files, PROCESS_THRESHOLD))
+    executor = process_pool() if len(head) == PROCESS_THRESHOLD and WORKERS > 1 else thread_pool()
+
+    output, truncated = run_search(executor, chain(head, files), pattern, ignore_case, context, LIMIT)
+    if not output:
+        return "No matches found"
+    if truncated:
+        output.append(TRUNCATED)
+    return "\n".join(output)
@@ -1,12 +1,13 @@
 import fnmatch
+import os
 from pathlib import Path
-import subprocess
 import json
 from typing import List, Optional
 
+from codingagent.packages.fs import inventory
 from codingagent.packages.tools.tool import builtin_mcp
 
-@builtin_mcp
+@builtin_mcp(read_only=True)
 def ls(path: str, ignore: Optional[List[str]] = None) -> str:
     """Lists files and directories in a given path. 
     - The path parameter must be an absolute path, not a relative path. 
@@ -17,25 +18,27 @@ def ls(path: str, ignore: Optional[List[str]] = None) -> str:
     p = Path(path)
     if not p.is_absolute():
         raise ValueError(f"Path must be absolute: {path}")
-    if not p.exists():
-        raise FileNotFoundError(f"Path does not exist: {path}")
 
-    # Run `ls -A` (includes hidden files, excludes . and ..)
-    result = subprocess.run(
-        ["ls", "-A", str(p)],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=True
-    )
+    # answer from the inventory when it tracks this directory, otherwise list it like `ls -A`
+    tracked = inventory.covering(str(p))
+    if tracked is not None and tracked.is_directory(str(p)):
+        files = [os.path.basename(record.path) for record in tracked.listdir(str(p))]
+    elif not p.exists():
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    elif p.is_dir():
+        files = sorted(os.listdir(p))
+    else:
+        files = [p.name]
+        p = p.parent
 
-    files = result.stdout.strip().split("\n") if result.stdout else []
+    if isinstance(ignore, str):
+        ignore = json.loads(ignore) if ignore.startswith("[") else [ignore]
     ignore = ignore or []
 
     filtered = []
     for f in files:
         full_path = str(p / f)
-        if any(fnmatch(full_path, pattern) for pattern in ignore):
+        if any(fnmatch.fnmatch(full_path, pattern) for pattern in ignore):
             continue
         filtered.append(full_path)
 
@@ -1,50 +1,76 @@
-import subprocess
 import json
 
+from codingagent.packages.context.read_snapshots import DELTA_MARKER, current_snapshots, unified_diff
+from codingagent.packages.fs.file_cache import file_cache
 from codingagent.packages.tools.tool import builtin_mcp
 
-@builtin_mcp
-def read_file(file_path: str, offset = 0, limit = 20000) -> str:
+# max characters returned per line and per call, to prevent filling the context window
+LINE_LIMIT = 2000
+OUTPUT_LIMIT = 20000
+
+TRUNCATED = "__TRUNCATED__"
+
+@builtin_mcp(read_only=True)
+def read_file(file_path: str, offset: int = 0, limit: int = 2000, full: bool = False) -> str:
     """Reads a file from the local filesystem. You can access any file directly by using this tool.
        Assume this tool is able to read all files on the machine. If the User provides a path to a file assume that path is valid. It is okay to read a file that does not exist; an error will be returned.
 
        Usage:
        - The file_path parameter must be an absolute path, not a relative path
        - By default, it reads up to 2000 lines starting from the beginning of the file
-       - You can optionally specify a line offset and limit (especially handy for long files), but it's recommended to read the whole file by not providing these parameters
+       - You can optionally specify a line offset (the number of lines to skip) and a limit on the number of lines (especially handy for long files), but it's recommended to read the whole file by not providing these parameters
        - Results are returned using cat -n format, with line numbers starting at 1
+       - Lines longer than 2000 characters are truncated
        - You have the capability to call multiple tools in a single response. It is always better to speculatively read multiple files as a batch that are potentially useful. 
-       - We can not read image files (PNG, JPG etc.) or PDF files, you will receive an error if you attempt to read these files.
+       - We can not read binary files such as images (PNG, JPG etc.) or PDF files, you will receive an error if you attempt to read these files.
        - If the file's last line only contains the word '__TRUNCATED__' communicate this to the user, only fetch more if the user asks you to do so.
+       - Reading a file again with the same offset and limit returns only a unified diff against your previous read (or a note that it is unchanged). Set full to true if you need the whole content again.
     """
 
-    # validate file extension
-    # TODO: Should probably use file metadata instead of extension (bunch of edge cases)
-    if file_path.endswith(".png") or file_path.endswith(".jpg") or file_path.endswith(".pdf"):
-        json.dumps({"error": "file ending with .png, .jpg or .pdf can not be read"})
-
     try:
-        result = subprocess.run(
-            ["cat", "-n", file_path],
-            capture_output=True,
-            text=True,
-        ) 
+        offset = max(int(offset), 0)
+        limit = max(int(limit), 1)
 
-        # if it was successful then capture output and send back
-        if result.returncode == 0:
-            output = result.stdout
+        lines, more = file_cache.read_lines(file_path, offset, limit)
 
-            # use offset if provided:
-            if offset != 0:
-                output = output[offset:]
+        # clip lines and stop at the output limit, numbering them like `cat -n`
+        shown = []
+        size = 0
+        for number, line in enumerate(lines, start=offset + 1):
+            if len(line) > LINE_LIMIT:
+                line = line[:LINE_LIMIT] + "..."
 
             # ensure output is not too long to prevent limiting context window
-            if len(output) > limit:
-                output = output[:limit]
-                output = output + "\n__TRUNCATED__\n"
+            size += len(f"{number:6}\t") + len(line) + 1
+            if size > OUTPUT_LIMIT:
+                more = True
+                break
+            shown.append(line)
 
-            return output
-        else:
-            raise ValueError(f"something went wrong: {result.stderr}")
+        output = [f"{number:6}\t{line}" for number, line in enumerate(shown, start=offset + 1)]
+        if more:
+            output.append(TRUNCATED)
+        content = "\n".join(output) + "\n" if output else ""
+
+        snapshots = current_snapshots()
+        if snapshots is None:
+            return content
+        previous = snapshots.swap(file_path, offset, limit, shown)
+        if previous is None or str(full).lower() == "true":
+            return content
+        return delta_read(file_path, offset, previous, shown, content)
     except Exception as e:
         return json.dumps({"error": str(e)})
+
+def delta_read(file_path: str, offset: int, previous: list[str], shown: list[str], content: str) -> str:
+    """What changed since the previous read of the same lines, or the full content if that is shorter."""
+    if previous == shown:
+        return f"{DELTA_MARKER} {file_path} is unchanged since your last read_file of it, set full to true to read it again\n"
+
+    diff = "\n".join([
+        f"{DELTA_MARKER} {file_path} changed since your last read_file of it, unified diff against that read (set full to true to read it again):",
+        f"--- {file_path} (previous read)",
+        f"+++ {file_path}",
+        *unified_diff(previous, shown, offset),
+    ]) + "\n"
+    return diff if len(diff) < len(content) else content
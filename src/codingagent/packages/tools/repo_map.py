@@ -0,0 +1,62 @@
+import json
+import os
+
+from codingagent.packages.tools.tool import builtin_mcp
+
+# max characters returned per call
+OUTPUT_LIMIT = 20000
+
+# kinds shown in the map, variables only when they look like constants
+MAP_KINDS = {"function", "method", "class", "struct", "interface", "trait", "enum", "type", "module", "macro"}
+
+TRUNCATED = "__TRUNCATED__"
+
+def _shown(symbol) -> bool:
+    if symbol.kind in MAP_KINDS:
+        return not symbol.name.startswith("_") or symbol.name.startswith("__")
+    return symbol.kind == "variable" and not symbol.parent and symbol.name.isupper()
+
+@builtin_mcp(read_only=True)
+def repo_map(path: str = "") -> str:
+    """Shows a compact map of the repository: every Python, Go, Rust and TypeScript/JavaScript file with the signatures of its classes, functions, methods, types and constants.
+    Use it to get an overview of a codebase or package before reading individual files.
+
+    Usage:
+    - path: optional directory or file to map, relative to the working directory, the whole repository by default
+    - Each signature is prefixed with its line number; members are indented under their class, impl or type
+    - Private helpers (names starting with a single underscore) are left out, use find_symbol to look them up
+    - If the last line only contains the word '__TRUNCATED__' the map was cut off, map a subdirectory instead.
+    """
+
+    try:
+        from codingagent.packages.symbols.index import index_for
+
+        root = os.getcwd()
+        index = index_for(root)
+        prefix = ""
+        if path:
+            prefix = os.path.relpath(os.path.abspath(path), root)
+            prefix = "" if prefix == "." else prefix
+
+        output = []
+        size = 0
+        for relative, symbols in index.symbols(prefix):
+            shown = [symbol for symbol in symbols if _shown(symbol)]
+            if not shown:
+                continue
+            entries = [f"{relative}:"]
+            for symbol in shown:
+                indent = "    " if symbol.parent else "  "
+                entries.append(f"{indent}{symbol.line:>5}  {symbol.signature}")
+
+            size += sum(len(entry) + 1 for entry in entries)
+            if size > OUTPUT_LIMIT:
+                output.append(TRUNCATED)
+                break
+            output.extend(entries)
+
+        if not output:
+            return "No symbols found"
+        return "\n".join(output) + "\n"
+    except Exception as e:
+        return json.dumps({"error": str(e)})
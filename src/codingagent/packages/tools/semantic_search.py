@@ -0,0 +1,70 @@
+import json
+import os
+from itertools import islice
+
+from codingagent.packages.tools.tool import builtin_mcp
+
+# max results per call
+MAX_LIMIT = 50
+
+# lines of each matching chunk shown under its location
+SNIPPET_LINES = 8
+
+def _snippet(path: str, start: int, end: int) -> list[str]:
+    # read directly, showing a snippet should not count as having read the file for edit_tool
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = list(islice(f, start - 1, min(end, start - 1 + SNIPPET_LINES)))
+    except OSError:
+        return []
+    snippet = [f"{number:6}\t{line.rstrip()}" for number, line in enumerate(lines, start=start)]
+    if end - start + 1 > len(lines) and lines:
+        snippet.append("   ...")
+    return snippet
+
+@builtin_mcp(read_only=True)
+def semantic_search(query: str, limit: int = 10, path: str = "") -> str:
+    """Searches the repository's code by meaning rather than by exact text.
+    Use it to find where something is implemented or handled when you do not know the names involved; use grep for exact identifiers or strings.
+
+    Usage:
+    - query: a natural language description of the code you are looking for, e.g. "where retries are scheduled after a failed request"
+    - limit: number of results to return, 10 by default
+    - path: optional directory or file to restrict results to, relative to the working directory
+    - Results are ordered by similarity and show the file, the line range of the matching chunk and its first lines
+    """
+
+    try:
+        from codingagent.packages.semantic import indexer
+        from codingagent.packages.semantic.embedder import default_embedder
+        from codingagent.packages.semantic.vector_index import open_index
+
+        root = os.getcwd()
+        index = open_index(root)
+        # picks up files changed since the last pass for the next search
+        indexer.refresh(root)
+        if index.alive_count() == 0:
+            background = indexer.background(root)
+            if background is not None and background.running():
+                return json.dumps({"error": "the semantic index of this repository is still being built, use grep or glob_tool for now"})
+            return json.dumps({"error": "the semantic index of this repository is empty, use grep or glob_tool instead"})
+
+        limit = min(max(int(limit), 1), MAX_LIMIT)
+        prefix = ""
+        if path:
+            prefix = os.path.relpath(os.path.abspath(path), root)
+            prefix = "" if prefix == "." else prefix
+
+        query_vector = default_embedder().embed_query(query)
+        results = index.search(query_vector, limit, prefix)
+        if not results:
+            return "No matches found"
+
+        output = []
+        for score, file_path, start, end in results:
+            output.append(f"{file_path}:{start}-{end} score={score:.3f}")
+            output.extend(_snippet(os.path.join(root, file_path), start, end))
+            output.append("")
+        return "\n".join(output)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
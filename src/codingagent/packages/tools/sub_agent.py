@@ -1,17 +1,17 @@
-import pkgutil
+from typing import Awaitable, Callable, Optional
 
-from codingagent.packages import tools
 from codingagent.packages.tools.tool import builtin_mcp
 
-# collect supported tools
-_tools = []
-for module_info in pkgutil.iter_modules(tools.__path__):
-    module_name = module_info.name
-    _tools.append(f"{tools.__name__}.{module_name}")
+# runs a sub-agent for a query and returns its final report, registered by the App at startup
+_launcher: Optional[Callable[[str], Awaitable[str]]] = None
 
-@builtin_mcp
-def sub_agent_launch(query: str) -> str:
-    f"""Launch a new agent that has access to the following tools: {" ".join(_tools)}.
+def register_launcher(launcher: Callable[[str], Awaitable[str]]):
+    global _launcher
+    _launcher = launcher
+
+@builtin_mcp(read_only=True)
+async def sub_agent_launch(query: str) -> str:
+    """Launch a new agent that has access to your read-only tools (ls, glob_tool, grep, git, read_file, tool_result) to research a task for you.
     - When you are searching for a keyword or file and are not confident that you will find the right match in the first few tries, use the Agent tool to perform the search for you.
     When to use the Agent tool:
     - If you are searching for a keyword like "config" or "logger", or for questions like "which file does X?", the Agent tool is strongly recommended.
@@ -27,8 +27,10 @@ def sub_agent_launch(query: str) -> str:
     2. When the agent is done, it will return a single message back to you. The result returned by the agent is not visible to the user. To show the user the result, you should send a text message back to the user with a concise summary of the result.
     3. Each agent invocation is stateless. You will not be able to send additional messages to the agent, nor will the agent be able to communicate with you outside of its final report. Therefore, your prompt should contain a highly detailed task description for the agent to perform autonomously and you should specify exactly what information the agent should return back to you in its final and only message to you.
     4. The agent's outputs should generally be trusted
-    5. Clearly tell the agent whether you expect it to write code or just to do research (search, file reads, web fetches, etc.), since it is not aware of the user's intent
+    5. The agent can only research (search, file reads, git history), it can not write or edit files. Make the changes yourself based on its report.
     """
-    return ""
+    if _launcher is None:
+        raise ValueError("sub agents are not available in this session")
+    return await _launcher(query)
 
 
@@ -1,10 +1,13 @@
 import inspect
+import subprocess
+import threading
 from dataclasses import dataclass
 from functools import wraps
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
-from mcp.server.fastmcp.tools.base import Tool
-from mcp.types import Tool as MCPTool, CallToolResult, TextContent
+# mcp and pydantic take a large share of startup time, they are imported when first needed
+if TYPE_CHECKING:
+    from mcp.types import Tool as MCPTool
 
 @dataclass
 class BuiltinTool:
@@ -12,9 +15,13 @@ class BuiltinTool:
     description: str
     inputSchema: dict[str,Any]
 
-def builtin_tool_from_function(fn: Callable[..., Any]) -> MCPTool:
+def builtin_tool_from_function(fn: Callable[..., Any]) -> "MCPTool":
+    from mcp.server.fastmcp.tools.base import Tool
+    from mcp.types import Tool as MCPTool, ToolAnnotations
+
     tool = Tool.from_function(
         fn,
+        annotations=ToolAnnotations(readOnlyHint=getattr(fn, "read_only", False)),
     ) 
     return MCPTool(
         name=tool.name,
@@ -24,7 +31,7 @@ def builtin_tool_from_function(fn: Callable[..., Any]) -> MCPTool:
         annotations=tool.annotations,
     )
 
-def ollama_tool_from_mcp_tool(tool: MCPTool):
+def ollama_tool_from_mcp_tool(tool: "MCPTool"):
     properties = {}
     if "properties" in tool.inputSchema:
         for property_id, property in tool.inputSchema["properties"].items():
@@ -46,22 +53,46 @@ def ollama_tool_from_mcp_tool(tool: MCPTool):
         },
     }
 
-def builtin_mcp(func):
+_current_call = threading.local()
+
+def set_current_call(call):
+    """Associates the calling worker thread with a tool call, see `track_process`."""
+    _current_call.call = call
+
+def track_process(proc: subprocess.Popen) -> subprocess.Popen:
+    """Registers a child process with the tool call running on this thread, so it is killed if the call times out."""
+    call = getattr(_current_call, "call", None)
+    if call is not None:
+        call.add_process(proc)
+    return proc
+
+def builtin_mcp(func=None, *, read_only: bool = False):
+    """Wraps a builtin tool so its result (or error) is returned as a CallToolResult.
+
+    Tools marked `read_only` never modify the filesystem, so they can be scheduled concurrently.
+    """
+    if func is None:
+        return lambda f: builtin_mcp(f, read_only=read_only)
+
     if inspect.iscoroutinefunction(func):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
+            from mcp.types import CallToolResult, TextContent
             try:
                 result = await func(*args, **kwargs)
                 return CallToolResult(content=[TextContent(type="text", text=str(result))])
             except Exception as e:
                 return CallToolResult(content=[TextContent(type="text", text=str(e))], isError=True)
+        async_wrapper.read_only = read_only
         return async_wrapper
     else:
         @wraps(func)
         def wrapper(*args, **kwargs):
+            from mcp.types import CallToolResult, TextContent
             try:
                 result = func(*args, **kwargs)
                 return CallToolResult(content=[TextContent(type="text", text=str(result))])
             except Exception as e:
                 return CallToolResult(content=[TextContent(type="text", text=str(e))], isError=True)
-        return wrapper
\ No newline at end of file
+        wrapper.read_only = read_only
+        return wrapper
@@ -0,0 +1,57 @@
+import json
+
+from codingagent.packages.context.result_store import result_store
+from codingagent.packages.tools.tool import builtin_mcp
+
+# max characters returned per line and per call, same as read_file
+LINE_LIMIT = 2000
+OUTPUT_LIMIT = 20000
+
+# max matching lines returned for a pattern
+MATCH_LIMIT = 200
+
+TRUNCATED = "__TRUNCATED__"
+
+def _clip(line: str) -> str:
+    return line[:LINE_LIMIT] + "..." if len(line) > LINE_LIMIT else line
+
+@builtin_mcp(read_only=True)
+def tool_result(handle: str, offset: int = 0, limit: int = 200, pattern: str = "") -> str:
+    """Pages through or searches the full output of an earlier tool call that was too large to show.
+    Large tool outputs are replaced by a preview that names a handle like "result-3"; use this tool instead of running the original command again.
+
+    Usage:
+    - handle: the handle from the preview
+    - offset, limit: the line to start at (0 based) and the number of lines to return, 200 by default
+    - pattern: optional regular expression, when given only the matching lines are returned (up to 200)
+    - Lines are returned in cat -n format, with line numbers starting at 1
+    - If the last line only contains the word '__TRUNCATED__' there is more output, continue with a larger offset or narrow the pattern.
+    """
+
+    try:
+        output = []
+        size = 0
+        if pattern:
+            matches, more = result_store.search(handle, pattern, MATCH_LIMIT)
+            if not matches:
+                return "No matches found"
+            numbered = ((number, line) for number, line in matches)
+        else:
+            offset = max(int(offset), 0)
+            limit = max(int(limit), 1)
+            lines, more = result_store.read_lines(handle, offset, limit)
+            numbered = enumerate(lines, start=offset + 1)
+
+        for number, line in numbered:
+            entry = f"{number:6}\t{_clip(line)}"
+            size += len(entry) + 1
+            if size > OUTPUT_LIMIT:
+                more = True
+                break
+            output.append(entry)
+
+        if more:
+            output.append(TRUNCATED)
+        return "\n".join(output) + "\n" if output else ""
+    except Exception as e:
+        return json.dumps({"error": str(e)})
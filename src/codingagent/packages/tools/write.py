@@ -1,3 +1,6 @@
+from codingagent.packages.fs import inventory
+from codingagent.packages.fs.atomic import atomic_write
+from codingagent.packages.fs.file_cache import file_cache
 from codingagent.packages.tools.tool import builtin_mcp
 
 
@@ -12,8 +15,12 @@ def write_tool(file_path: str, content: str = "") -> str:
     - Only use emojis if the user explicitly requests it. Avoid writing emojis to files unless asked.
     """
 
-    with open(file_path, "w") as f:
-        f.write(content)
+    # existing files must have been read (and not changed since) before they are overwritten
+    file_cache.check_can_modify(file_path)
+
+    atomic_write(file_path, content.encode("utf-8"))
+    file_cache.record_write(file_path)
+    inventory.refresh_path(file_path)
 
     return f"File {file_path} has been created."
 
@@ -0,0 +1,84 @@
+from typing import Any
+
+from rich.console import Group
+from rich.table import Table
+from rich.text import Text
+
+def _ms(value: float) -> str:
+    return f"{value / 1000:.2f}s" if value >= 1000 else f"{value:.1f}ms"
+
+def render_stats(summary: dict, pool_metrics: dict[str, dict[str, Any]], endpoints: list[dict[str, Any]] = ()) -> Group:
+    """The /stats view: model latency and throughput, span latency percentiles, inference server and worker pool load."""
+    renderables = []
+
+    generation = summary["generation"]
+    if generation["count"]:
+        model = Table(title="Model", title_justify="left", show_header=False, box=None)
+        model.add_row("responses", str(generation["count"]))
+        model.add_row("time to first token p50 / p95", f"{_ms(generation['ttft_p50_ms'])} / {_ms(generation['ttft_p95_ms'])}")
+        model.add_row("generation rate p50", f"{generation['tokens_per_second_p50']:.1f} tokens/s")
+        model.add_row("prompt tokens last / max", f"{generation['prompt_tokens_last']} / {generation['prompt_tokens_max']}")
+        model.add_row("generated tokens", str(generation["eval_tokens_total"]))
+        renderables.append(model)
+
+    if summary["spans"]:
+        spans = Table(title="Latency", title_justify="left")
+        for column in ("span", "calls", "errors", "p50", "p95", "p99", "max"):
+            spans.add_column(column, justify="left" if column == "span" else "right")
+        for span in summary["spans"]:
+            name = f"{span['name']} {span['label']}" if span["label"] else span["name"]
+            spans.add_row(
+                name,
+                str(span["count"]),
+                str(span["errors"]),
+                _ms(span["p50_ms"]),
+                _ms(span["p95_ms"]),
+                _ms(span["p99_ms"]),
+                _ms(span["max_ms"]),
+            )
+        renderables.append(spans)
+
+    if endpoints:
+        servers = Table(title="Inference servers", title_justify="left")
+        for column in ("server", "state", "in flight", "requests", "failures", "last error"):
+            servers.add_column(column, justify="left" if column in ("server", "state", "last error") else "right")
+        for endpoint in endpoints:
+            state = ("warm" if endpoint["warm"] else "up") if endpoint["healthy"] else "down"
+            servers.add_row(
+                endpoint["url"],
+                state,
+                str(endpoint["outstanding"]),
+                str(endpoint["requests"]),
+                str(endpoint["failures"]),
+                endpoint["last_error"][:60],
+            )
+        renderables.append(servers)
+
+    if pool_metrics:
+        pools = Table(title="Tool workers", title_justify="left")
+        columns = {
+            "completed": "done",
+            "running": "running",
+            "queued": "queued",
+            "max_queued": "peak queue",
+            "timed_out": "timeouts",
+            "cancelled": "cancelled",
+            "queue_wait": "waited",
+        }
+        pools.add_column("pool")
+        for header in columns.values():
+            pools.add_column(header, justify="right")
+        for name, metrics in pool_metrics.items():
+            pools.add_row(name, *(
+                f"{metrics[column]:.2f}s" if column == "queue_wait" else str(metrics[column])
+                for column in columns
+            ))
+        renderables.append(pools)
+
+    if not summary["enabled"]:
+        renderables.append(Text("Tracing is disabled, set tracing in the config to record latencies", style="#9ca0b0"))
+    elif not renderables:
+        renderables.append(Text("Nothing recorded yet", style="#9ca0b0"))
+    if summary["trace_path"]:
+        renderables.append(Text(f"trace: {summary['trace_path']}", style="#9ca0b0"))
+    return Group(*renderables)
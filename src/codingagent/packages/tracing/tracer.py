@@ -0,0 +1,250 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from codingagent.packages.fs.cache import cache_dir
+from codingagent.packages.fs.lock import file_lock
+
+# durations kept per span name and label, the percentiles of /stats are over this window
+WINDOW = 1000
+
+# size of the trace file before it is rotated and the number of rotated files kept
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 3
+
+def default_trace_path() -> str:
+    return os.path.join(cache_dir("traces"), "trace.jsonl")
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest rank percentile of the sorted list `ordered`, q between 0 and 1."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+class Span:
+    """A timed section of the agent, created with Tracer.span and used as a context manager.
+
+    Spans opened inside another one (in the same task or a task it created) record it as
+    their parent, so a tool call can be attributed to the generation that requested it.
+    """
+
+    __slots__ = ("tracer", "name", "label", "attrs", "id", "parent", "wall", "started", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, label: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.label = label
+        self.attrs = attrs
+        self.id = 0
+        self.parent: Optional[int] = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        self.parent = parent.id if parent is not None else None
+        self.id = next(self.tracer._ids)
+        self._token = _current.set(self)
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # exited in another context than it was entered in
+            pass
+        if exc_type is not None:
+            self.attrs.setdefault("error", exc_type.__name__)
+        self.tracer._finish(self, elapsed)
+        return False
+
+class NoopSpan:
+    """Stands in for every span while tracing is disabled, so instrumented code costs a call."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP = NoopSpan()
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+class Tracer:
+    """Records spans of the inference and tool call hot paths.
+
+    Finished spans are aggregated in memory for /stats (durations per name and label over
+    the last WINDOW spans, plus the token figures of recent generations) and, once
+    configured with a path, appended to a JSONL file that is rotated at `max_bytes`.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.path: Optional[str] = None
+        self.max_bytes = MAX_BYTES
+        self.backups = BACKUPS
+        # tells the records of concurrent agent processes sharing the trace file apart
+        self.session = f"{os.getpid()}-{int(time.time())}"
+        self.durations: dict[tuple[str, str], deque] = {}
+        self.counts: dict[tuple[str, str], list[int]] = {}
+        self.generations: deque = deque(maxlen=WINDOW)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def configure(self, enabled: bool, path: str = "", max_bytes: int = MAX_BYTES, backups: int = BACKUPS):
+        """Turns tracing on or off and sets the trace file, an empty path uses the cache directory."""
+        with self._lock:
+            self.enabled = enabled
+            self._close()
+            self.path = (path or default_trace_path()) if enabled else None
+            self.max_bytes = max_bytes
+            self.backups = backups
+
+    def span(self, name: str, label: str = "", **attrs: Any):
+        """A span named `name`; spans with the same name and label (like a tool name) are aggregated together."""
+        if not self.enabled:
+            return NOOP
+        return Span(self, name, label, attrs)
+
+    def _finish(self, span: Span, elapsed: float):
+        key = (span.name, span.label)
+        failed = "error" in span.attrs
+        with self._lock:
+            durations = self.durations.get(key)
+            if durations is None:
+                durations = self.durations[key] = deque(maxlen=WINDOW)
+                self.counts[key] = [0, 0]
+            durations.append(elapsed)
+            counts = self.counts[key]
+            counts[0] += 1
+            counts[1] += failed
+            if span.name == "generate":
+                self.generations.append(dict(span.attrs))
+
+            if self.path is not None:
+                record = {
+                    "session": self.session,
+                    "id": span.id,
+                    "parent": span.parent,
+                    "name": span.name,
+                    "label": span.label,
+                    "start": round(span.wall, 6),
+                    "ms": round(elapsed, 3),
+                    **span.attrs,
+                }
+                self._write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+
+    def _write(self, line: bytes):
+        try:
+            # batch workers append to the same file, reopen it once another process rotated it
+            if self._file is None or not self._is_current():
+                self._open()
+            if self._size + len(line) > self.max_bytes:
+                self._rotate_if_full(len(line))
+            self._file.write(line)
+            # an append leaves the offset at the end of the file, including other processes' records
+            self._size = self._file.tell()
+        except OSError:
+            # keep the in-memory stats, stop writing
+            self._close()
+            self.path = None
+
+    def _rotate_if_full(self, incoming: int):
+        # another process may have rotated the file already, the decision is made on the file
+        # itself with the other writers locked out
+        with file_lock(self.path + ".lock"):
+            if not self._is_current():
+                self._open()
+            self._size = os.fstat(self._file.fileno()).st_size
+            if self._size and self._size + incoming > self.max_bytes:
+                self._rotate()
+
+    def _open(self):
+        self._close()
+        # unbuffered, every record is a single append
+        self._file = open(self.path, "ab", buffering=0)
+        self._size = self._file.seek(0, os.SEEK_END)
+
+    def _is_current(self) -> bool:
+        """Whether the open file is still the one at `path`."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(self._file.fileno())
+        return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+    def _rotate(self):
+        self._close()
+        base, extension = os.path.splitext(self.path)
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{base}.{index}{extension}"
+            if os.path.exists(older):
+                os.replace(older, f"{base}.{index + 1}{extension}")
+        if self.backups > 0:
+            os.replace(self.path, f"{base}.1{extension}")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self) -> dict:
+        """Latency percentiles per span name and label, and token figures of the recent generations."""
+        with self._lock:
+            spans = []
+            for (name, label), durations in self.durations.items():
+                ordered = sorted(durations)
+                calls, errors = self.counts[(name, label)]
+                spans.append({
+                    "name": name,
+                    "label": label,
+                    "count": calls,
+                    "errors": errors,
+                    "p50_ms": percentile(ordered, 0.5),
+                    "p95_ms": percentile(ordered, 0.95),
+                    "p99_ms": percentile(ordered, 0.99),
+                    "max_ms": ordered[-1],
+                })
+            generations = list(self.generations)
+
+        ttft = sorted(g["ttft_ms"] for g in generations if g.get("ttft_ms") is not None)
+        rates = sorted(g["tokens_per_second"] for g in generations if g.get("tokens_per_second"))
+        prompts = [g["prompt_tokens"] for g in generations if g.get("prompt_tokens") is not None]
+        return {
+            "spans": sorted(spans, key=lambda span: (span["name"], span["label"])),
+            "generation": {
+                "count": len(generations),
+                "ttft_p50_ms": percentile(ttft, 0.5),
+                "ttft_p95_ms": percentile(ttft, 0.95),
+                "tokens_per_second_p50": percentile(rates, 0.5),
+                "prompt_tokens_last": prompts[-1] if prompts else 0,
+                "prompt_tokens_max": max(prompts, default=0),
+                "eval_tokens_total": sum(g.get("eval_tokens") or 0 for g in generations),
+            },
+            "enabled": self.enabled,
+            "trace_path": self.path,
+        }
+
+tracer = Tracer()
@@ -0,0 +1,132 @@
+import builtins
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Callable
+
+# runs in a fresh interpreter: the startup path up to the first prompt, then the deferred imports
+PROFILE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import codingagent.main as main
+imported = time.perf_counter()
+from codingagent.config import BUILTIN_TOOLS
+from codingagent.packages.tool_client.builtin_mcp_client import BuiltinMCPClient
+BuiltinMCPClient(BUILTIN_TOOLS)
+ready = time.perf_counter()
+sys.stderr.write("--- deferred ---\\n")
+sys.stderr.flush()
+main.preload_modules()
+deferred = time.perf_counter()
+print(json.dumps({
+    "import codingagent.main": imported - start,
+    "builtin tool schemas": ready - imported,
+    "deferred imports": deferred - ready,
+}))
+"""
+
+def parse_importtime(lines: list[str]) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every line of `python -X importtime` output."""
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        imports.append((fields[2].rstrip(), int(fields[0]), int(fields[1])))
+    return imports
+
+def print_imports(title: str, imports: list[tuple[str, int, int]], limit: int):
+    print(f"{title} ({sum(i[1] for i in imports) / 1000:.1f} ms)")
+    print(f"  {'self ms':>9} {'total ms':>9}  module")
+    # top level entries (no indentation) show what a single import statement costs
+    for module, self_us, cumulative_us in sorted(imports, key=lambda i: i[2], reverse=True)[:limit]:
+        print(f"  {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}")
+    print()
+
+class ImportTimer:
+    """Times import statements in process by wrapping __import__, in the format of parse_importtime.
+
+    Stands in for -X importtime in a compiled build, where sys.executable is the app itself.
+    """
+
+    def __init__(self):
+        self.imports: list[tuple[str, int, int]] = []
+        self._children: list[int] = []
+        self._original = builtins.__import__
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        depth = len(self._children)
+        self._children.append(0)
+        start = time.perf_counter_ns()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = (time.perf_counter_ns() - start) // 1000
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += cumulative
+            self.imports.append(("  " * depth + name, cumulative - children, cumulative))
+
+    def __enter__(self) -> "ImportTimer":
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        builtins.__import__ = self._original
+        return False
+
+def profile_in_process(preload: Callable[[], None], limit: int) -> int:
+    """The part of the profile a compiled build can measure: what runs after startup, timed in this process."""
+    from codingagent.config import BUILTIN_TOOLS
+
+    print("Import timing of the startup path needs a Python interpreter, this build only times what follows it")
+    print()
+    with ImportTimer() as timer:
+        start = time.perf_counter()
+        from codingagent.packages.tool_client.builtin_mcp_client import BuiltinMCPClient
+        BuiltinMCPClient(BUILTIN_TOOLS)
+        ready = time.perf_counter()
+        schemas = len(timer.imports)
+        preload()
+        deferred = time.perf_counter()
+
+    print_imports("Imports of the builtin tool schemas", timer.imports[:schemas], limit)
+    print_imports("Imports deferred until after the first prompt", timer.imports[schemas:], limit)
+    print("Startup steps")
+    print(f"  {(ready - start) * 1000:9.1f} ms  builtin tool schemas")
+    print(f"  {(deferred - ready) * 1000:9.1f} ms  deferred imports")
+    return 0
+
+def profile_startup(preload: Callable[[], None], limit: int = 25) -> int:
+    """Reports where cold start time goes, per import, by re-running startup under -X importtime."""
+    # Nuitka sets __compiled__ in compiled modules, there sys.executable is the app and has no -X
+    if "__compiled__" in globals():
+        return profile_in_process(preload, limit)
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        return proc.returncode
+
+    lines = proc.stderr.splitlines()
+    marker = lines.index("--- deferred ---") if "--- deferred ---" in lines else len(lines)
+    print_imports("Imports before the first prompt", parse_importtime(lines[:marker]), limit)
+    print_imports("Imports deferred until after the first prompt", parse_importtime(lines[marker + 1:]), limit)
+
+    steps = json.loads(proc.stdout.strip().splitlines()[-1])
+    print("Startup steps")
+    for step, seconds in steps.items():
+        print(f"  {seconds * 1000:9.1f} ms  {step}")
+    return 0
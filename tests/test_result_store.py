@@ -0,0 +1,49 @@
+import pytest
+
+from codingagent.packages.context.result_store import ResultStore
+
+LINES = [f"line {i}" for i in range(1, 101)]
+
+@pytest.fixture(params=["memory", "spilled"])
+def store(request):
+    # a zero memory budget spills every result to disk, so reads go through mmap
+    return ResultStore(memory_bytes=1 << 20 if request.param == "memory" else 0)
+
+def test_read_lines_pages_through_result(store):
+    handle = store.put("bash", "\n".join(LINES) + "\n").handle
+
+    assert store.read_lines(handle, 0, 3) == (["line 1", "line 2", "line 3"], True)
+    assert store.read_lines(handle, 98, 5) == (["line 99", "line 100"], False)
+    assert store.read_lines(handle, 100, 5) == ([], False)
+
+def test_read_lines_only_splits_on_newline(store):
+    handle = store.put("bash", "a\rb\x0cc\r\nd").handle
+    assert store.read_lines(handle, 0, 10) == (["a\rb\x0cc", "d"], False)
+
+def test_search_reports_line_numbers(store):
+    handle = store.put("bash", "\n".join(LINES)).handle
+
+    assert store.search(handle, r"line 1\d$", 50) == ([(n, f"line {n}") for n in range(10, 20)], False)
+    assert store.search(handle, r"line 5", 2) == ([(5, "line 5"), (50, "line 50")], True)
+    assert store.search(handle, r"missing", 10) == ([], False)
+
+def test_search_match_spanning_newline_is_not_reported(store):
+    handle = store.put("bash", "foo\nbar\nfoo bar\n").handle
+    assert store.search(handle, r"foo\s+bar", 10) == ([(3, "foo bar")], False)
+
+def test_search_empty_match_after_final_newline(store):
+    handle = store.put("bash", "a\nb\n").handle
+    assert store.search(handle, r"^", 10) == ([(1, "a"), (2, "b")], False)
+    assert store.search(handle, r"$", 10) == ([(1, "a"), (2, "b")], False)
+
+def test_search_empty_result(store):
+    handle = store.put("bash", "").handle
+    assert store.search(handle, r"^", 10) == ([], False)
+
+def test_compact_stores_large_results(store):
+    text = "\n".join(LINES)
+    assert store.compact("bash", text, inline_limit=len(text)) == text
+
+    preview = store.compact("bash", text, inline_limit=100)
+    assert preview.startswith("[output of bash stored as result-1: 100 lines")
+    assert store.read_lines("result-1", 0, 1) == (["line 1"], True)
@@ -0,0 +1,86 @@
+import asyncio
+import os
+
+from codingagent.packages.tool_client.scheduler import ToolScheduler, tool_call_path
+
+READ_ONLY = {"read_file", "grep"}
+
+class FakeClient:
+    """Records when each call starts and finishes, calls take `delay` seconds."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.events: list[tuple[str, str]] = []
+
+    def is_read_only(self, tool_name: str) -> bool:
+        return tool_name in READ_ONLY
+
+    async def call_tool(self, name: str, args: dict):
+        label = args["label"]
+        self.events.append(("start", label))
+        await asyncio.sleep(self.delay)
+        self.events.append(("end", label))
+        if args.get("fail"):
+            raise RuntimeError(label)
+        return label
+
+def run_calls(calls: list[tuple[str, dict]]) -> tuple[list, list]:
+    client = FakeClient()
+
+    async def main():
+        scheduler = ToolScheduler({name: client for name in ("read_file", "grep", "write_file", "bash")})
+        for name, args in calls:
+            scheduler.submit({"name": name, "args": args})
+        return await scheduler.join()
+
+    return asyncio.run(main()), client.events
+
+def test_tool_call_path_is_absolute():
+    assert tool_call_path({"file_path": "src/../a.py"}) == os.path.join(os.getcwd(), "a.py")
+    assert tool_call_path({"path": "."}) == os.getcwd()
+    assert tool_call_path({"command": "ls"}) is None
+
+def test_readers_run_in_parallel():
+    _, events = run_calls([("read_file", {"label": "a", "file_path": "a.py"}), ("grep", {"label": "b", "path": "."})])
+    assert events[:2] == [("start", "a"), ("start", "b")]
+
+def test_write_waits_for_earlier_reader_of_same_path():
+    _, events = run_calls([
+        ("read_file", {"label": "read", "file_path": "a.py"}),
+        ("write_file", {"label": "write", "file_path": "./a.py"}),
+    ])
+    assert events == [("start", "read"), ("end", "read"), ("start", "write"), ("end", "write")]
+
+def test_reader_waits_for_earlier_write_to_parent_directory():
+    _, events = run_calls([
+        ("write_file", {"label": "write", "file_path": "pkg"}),
+        ("read_file", {"label": "read", "file_path": "pkg/a.py"}),
+    ])
+    assert events.index(("end", "write")) < events.index(("start", "read"))
+
+def test_writes_to_unrelated_paths_run_in_parallel():
+    _, events = run_calls([
+        ("write_file", {"label": "a", "file_path": "a.py"}),
+        ("write_file", {"label": "b", "file_path": "b.py"}),
+    ])
+    assert events[:2] == [("start", "a"), ("start", "b")]
+
+def test_call_without_path_is_a_barrier():
+    _, events = run_calls([
+        ("read_file", {"label": "read", "file_path": "a.py"}),
+        ("bash", {"label": "bash"}),
+        ("read_file", {"label": "after", "file_path": "b.py"}),
+    ])
+    assert [label for kind, label in events if kind == "start"] == ["read", "bash", "after"]
+    assert events.index(("end", "read")) < events.index(("start", "bash"))
+    assert events.index(("end", "bash")) < events.index(("start", "after"))
+
+def test_join_returns_results_in_submission_order():
+    results, _ = run_calls([
+        ("write_file", {"label": "first", "file_path": "a.py"}),
+        ("read_file", {"label": "second", "file_path": "b.py"}),
+        ("write_file", {"label": "third", "file_path": "a.py", "fail": True}),
+    ])
+    assert [call["args"]["label"] for call, _ in results] == ["first", "second", "third"]
+    assert results[0][1] == "first" and results[1][1] == "second"
+    assert isinstance(results[2][1], RuntimeError)
@@ -0,0 +1,96 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+
+from codingagent.packages.semantic.vector_index import VectorIndex
+
+DIM = 8
+
+def path_hash(path: str) -> bytes:
+    return hashlib.blake2b(path.encode("utf-8"), digest_size=16).digest()
+
+def path_vector(path: str) -> np.ndarray:
+    return np.random.default_rng(int.from_bytes(path_hash(path)[:8], "little")).standard_normal(DIM).astype(np.float32)
+
+def add_files(index: VectorIndex, paths: list[str], chunks: int = 2):
+    entries = [(path, chunk, chunk + 1, path_hash(path)) for path in paths for chunk in range(chunks)]
+    index.append(np.stack([path_vector(path) for path, _, _, _ in entries]), entries)
+
+def append_files(directory: str, worker: int, batches: int):
+    index = VectorIndex(directory)
+    for batch in range(batches):
+        add_files(index, [f"w{worker}/b{batch}/f{i}.py" for i in range(3)])
+
+def check_rows_match_paths(index: VectorIndex):
+    for row, vector in zip(index.rows, index.vectors):
+        path = index.paths[row["path"]]
+        assert bytes(row["hash"]) == path_hash(path)
+        expected = path_vector(path)
+        assert np.allclose(vector, expected / np.linalg.norm(expected), atol=1e-6)
+
+def test_append_and_search(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    add_files(index, ["a.py", "pkg/b.py", "pkg2/c.py"])
+
+    assert len(index) == 6
+    assert index.entries("pkg/b.py") == [(0, 1, path_hash("pkg/b.py")), (1, 2, path_hash("pkg/b.py"))]
+    score, path, _, _ = index.search(path_vector("pkg/b.py"), 1)[0]
+    assert path == "pkg/b.py" and score > 0.999
+    assert {path for _, path, _, _ in index.search(path_vector("a.py"), 10, "pkg")} == {"pkg/b.py"}
+
+    reopened = VectorIndex(str(tmp_path))
+    assert reopened.paths == ["a.py", "pkg/b.py", "pkg2/c.py"]
+    check_rows_match_paths(reopened)
+
+def test_compact_keeps_live_rows(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    paths = [f"f{i}.py" for i in range(10)]
+    add_files(index, paths)
+
+    assert index.delete_paths(paths[:4]) == 8
+    assert not index.compact()
+    assert index.delete_paths(paths[4:6]) == 4
+    assert index.compact()
+
+    assert len(index) == index.alive_count() == 8
+    assert index.paths == paths[6:]
+    assert index.entries("f0.py") == []
+    check_rows_match_paths(index)
+    assert index.search(path_vector("f7.py"), 1)[0][1] == "f7.py"
+
+    reopened = VectorIndex(str(tmp_path))
+    assert reopened.generation == index.generation
+    assert reopened.paths == paths[6:]
+    check_rows_match_paths(reopened)
+
+def test_append_after_compaction_by_another_instance(tmp_path):
+    first = VectorIndex(str(tmp_path))
+    second = VectorIndex(str(tmp_path))
+    add_files(first, ["a.py", "b.py"])
+    first.delete_paths(["a.py"])
+    first.compact(force=True)
+
+    # the second instance still has the state from before, it picks up the new generation first
+    add_files(second, ["c.py"])
+    assert second.paths == ["b.py", "c.py"]
+    assert second.delete_paths(["b.py"]) == 2
+
+    reopened = VectorIndex(str(tmp_path))
+    assert reopened.paths == ["b.py", "c.py"]
+    assert reopened.alive_count() == 2
+    check_rows_match_paths(reopened)
+
+def test_concurrent_appends_from_two_processes(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=append_files, args=(str(tmp_path), worker, 40)) for worker in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    index = VectorIndex(str(tmp_path))
+    assert len(index.paths) == len(set(index.paths)) == 2 * 40 * 3
+    assert len(index) == 2 * 40 * 3 * 2
+    check_rows_match_paths(index)
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from codingagent.packages.tool_client.worker_pool import WorkerPool
+
+def nap(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+def test_process_timeout_does_not_break_other_calls():
+    pool = WorkerPool(max_processes=2, process_tools=["stuck", "nap"], tool_timeouts={"stuck": 0.5, "nap": 30})
+
+    async def main():
+        stuck = asyncio.create_task(pool.run("stuck", nap, {"seconds": 60}))
+        other = asyncio.create_task(pool.run("nap", nap, {"seconds": 1.5}))
+        with pytest.raises(TimeoutError):
+            await stuck
+
+        # the timed out call's pool is retired but keeps running the other call
+        assert pool.processes is None
+        retired = pool.retired[0]
+        assert len(retired.workers) == 2
+
+        # new calls go to a fresh pool right away
+        fresh_pid = await pool.run("nap", nap, {"seconds": 0})
+        assert pool.processes is not None and pool.processes is not retired
+
+        old_pid = await other
+        assert old_pid in [process.pid for process in retired.workers]
+        assert fresh_pid not in [process.pid for process in retired.workers]
+
+        # once the other call finished the workers of the retired pool are killed
+        for _ in range(50):
+            if not any(process.is_alive() for process in retired.workers):
+                break
+            await asyncio.sleep(0.1)
+        assert not any(process.is_alive() for process in retired.workers)
+        assert pool.retired == []
+
+    try:
+        asyncio.run(main())
+        assert pool.metrics()["processes"]["timed_out"] == 1
+        assert pool.metrics()["processes"]["completed"] == 2
+    finally:
+        pool.shutdown()
+
+def test_process_timeout_without_other_calls_kills_worker_right_away():
+    pool = WorkerPool(max_processes=1, process_tools=["stuck"], tool_timeouts={"stuck": 0.5})
+
+    async def main():
+        with pytest.raises(TimeoutError):
+            await pool.run("stuck", nap, {"seconds": 60})
+
+    try:
+        asyncio.run(main())
+        assert pool.retired == []
+        assert pool.processes is None
+    finally:
+        pool.shutdown()
+
+def test_thread_timeout_does_not_affect_other_calls():
+    pool = WorkerPool(max_threads=2, tool_timeouts={"stuck": 0.2})
+
+    async def main():
+        stuck = asyncio.create_task(pool.run("stuck", nap, {"seconds": 0.6}))
+        other = asyncio.create_task(pool.run("nap", nap, {"seconds": 0.4}))
+        with pytest.raises(TimeoutError):
+            await stuck
+        assert await other == os.getpid()
+
+    try:
+        asyncio.run(main())
+        assert pool.metrics()["threads"]["timed_out"] == 1
+    finally:
+        pool.shutdown()